@@ -1,8 +1,13 @@
-from flask import Flask, render_template, request, jsonify
-import asyncio
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
+import json
+import queue
 import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 import logging
-from main import WebVision  # Import your WebVision class
+from serving import get_agent_loop
+from supervisor import get_supervisor
+from metrics import get_metrics
+from constants import QUERY_TIMEOUT, SSE_KEEPALIVE_INTERVAL, WORKER_PROCESSES
 import os
 # Configure logging
 logging.basicConfig(
@@ -13,6 +18,13 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+def get_runner():
+    """
+    Returns the object agent runs are submitted to: the worker supervisor when
+    WEBVISION_WORKER_PROCESSES > 0, otherwise this process's own agent loop.
+    """
+    return get_supervisor() if WORKER_PROCESSES > 0 else get_agent_loop()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -20,6 +32,7 @@ def index():
 @app.route('/query', methods=['POST'])
 def process_query():
     query = request.form.get('query', '')
+    mode = request.form.get('mode') or None
     
     if not query.strip():
         return jsonify({'error': 'Please enter a query'})
@@ -28,15 +41,17 @@ def process_query():
     main_start_time = time.perf_counter()
     
     try:
-        # Initialize WebVision with your credentials and callback functions
-        web_vision = WebVision("1234", "123", lambda a: a, lambda b: b)
-        
-        # Run the query
-        result = asyncio.run(web_vision.run(query))
+        # Run the query on the shared event loop / least-loaded worker process
+        future = get_runner().submit(query, "1234", "123", lambda a: a, lambda b: b, mode)
+        try:
+            result = future.result(timeout=QUERY_TIMEOUT)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
         
-        # Get response (assuming get_response is part of your module)
-        from shared_state import get_response 
-        final_response = get_response()
+        final_response = result.answer
+        if final_response is None and result.errors:
+            return jsonify({'error': f"An error occurred: {result.errors}"})
         
         logger.debug(f"[MAIN] Result: {final_response}")
         
@@ -46,6 +61,8 @@ def process_query():
         
         return jsonify({
             'response': final_response,
+            'errors': result.errors,
+            'steps': result.steps,
             'execution_time': f"{execution_time:.2f}"
         })
     
@@ -53,6 +70,75 @@ def process_query():
         logger.error(f"Error processing query: {str(e)}")
         return jsonify({'error': f"An error occurred: {str(e)}"})
 
+def format_sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.route('/stream', methods=['GET'])
+def stream_query():
+    query = request.args.get('query', '')
+    mode = request.args.get('mode') or None
+
+    if not query.strip():
+        return jsonify({'error': 'Please enter a query'})
+
+    logger.debug("[STREAM] Starting WebVision execution")
+    main_start_time = time.perf_counter()
+
+    # push_update is called on the agent loop thread; the queue hands events to this request
+    events = queue.Queue()
+    future = get_runner().submit(query, "1234", "123", lambda a: a, events.put, mode)
+    future.add_done_callback(lambda f: events.put(None))
+
+    def generate():
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=SSE_KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    if time.perf_counter() - main_start_time > QUERY_TIMEOUT:
+                        future.cancel()
+                        yield format_sse('done', {'error': 'Query timed out'})
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if event is not None:
+                    yield format_sse(event.pop('event', 'message'), event)
+                    continue
+
+                execution_time = time.perf_counter() - main_start_time
+                try:
+                    result = future.result()
+                    payload = {
+                        'response': result.answer,
+                        'errors': result.errors,
+                        'steps': result.steps,
+                        'execution_time': f"{execution_time:.2f}",
+                    }
+                except Exception as e:
+                    logger.error(f"Error processing streamed query: {str(e)}")
+                    payload = {'error': f"An error occurred: {str(e)}"}
+                logger.debug(f"[STREAM] Total execution time: {execution_time:.4f} seconds")
+                yield format_sse('done', payload)
+                return
+        except GeneratorExit:
+            # Client disconnected, stop the agent run
+            future.cancel()
+            raise
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify({
+        'worker': get_runner().stats(),
+        'metrics': get_metrics().snapshot(),
+    })
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5445))
-    app.run(host="0.0.0.0", port=port)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=port, threaded=True)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import re
+from typing import Any, Dict, List, Tuple
+
+from constants import BBOX_LABEL_MAX_CHARS, BBOX_TOKEN_BUDGET, CHARS_PER_TOKEN
+from state import BBox, task_as_text
+
+# Element types the agent acts on most; ranked ahead of plain links and containers
+INPUT_TYPES = {"input", "textarea", "select", "button"}
+
+TABLE_HEADER = "Labeled elements (id | type | label | x,y):"
+
+_WORD = re.compile(r"\w+")
+
+
+def element_label(bbox: BBox, max_chars: int = BBOX_LABEL_MAX_CHARS) -> str:
+    """
+    Returns a short, single-line label for an element.
+
+    Prefers the accessible label over the text content, folds whitespace and
+    truncates to `max_chars` characters.
+
+    Args:
+        bbox (BBox): The element.
+        max_chars (int): Maximum label length.
+
+    Returns:
+        str: The label, possibly empty.
+    """
+    label = bbox.get("ariaLabel") or bbox.get("text") or ""
+    label = " ".join(label.split()).replace("|", "/")
+    if len(label) > max_chars:
+        label = label[: max_chars - 1].rstrip() + "…"
+    return label
+
+
+def _relevance(bbox: BBox, label: str, task_words: set) -> Tuple:
+    """
+    Sort key: elements sharing words with the task first, then inputs and buttons,
+    then elements nearer the top of the screen.
+    """
+    overlap = len(task_words & set(_WORD.findall(label.lower())))
+    return (-overlap, bbox.get("type") not in INPUT_TYPES, bbox.get("y", 0), bbox.get("x", 0))
+
+
+def format_bboxes(
+    bboxes: List[BBox],
+    task: Any = None,
+    max_label_chars: int = BBOX_LABEL_MAX_CHARS,
+    token_budget: int = BBOX_TOKEN_BUDGET,
+) -> str:
+    """
+    Serializes the labeled elements as a compact table for the prompt.
+
+    Each row keeps the element's numerical label from the screenshot, so rows can be
+    reordered freely: rows are ranked by relevance to the task, and once the token
+    budget is spent the remaining (least relevant) rows are dropped. Elements with
+    the same type and label are merged into one row listing all their ids.
+
+    Args:
+        bboxes (List[BBox]): Elements returned by `mark_page`, indexed by label.
+        task (Any): The task, as text or as the state's list of messages; used to rank elements.
+        max_label_chars (int): Maximum label length per element.
+        token_budget (int): Approximate token budget for the table; 0 disables it.
+
+    Returns:
+        str: The table.
+    """
+    if not bboxes:
+        return "No labeled elements on the page."
+
+    task_words = set(_WORD.findall(task_as_text(task).lower()))
+
+    rows: Dict[Tuple[str, str], dict] = {}
+    for index, bbox in enumerate(bboxes):
+        label = element_label(bbox, max_label_chars)
+        key = (bbox.get("type", ""), label)
+        if key in rows:
+            rows[key]["ids"].append(index)
+        else:
+            rows[key] = {"ids": [index], "bbox": bbox, "label": label}
+
+    ranked = sorted(rows.values(), key=lambda row: _relevance(row["bbox"], row["label"], task_words))
+
+    lines = [TABLE_HEADER]
+    used = len(TABLE_HEADER)
+    budget = token_budget * CHARS_PER_TOKEN if token_budget > 0 else None
+    omitted = 0
+    for row in ranked:
+        bbox = row["bbox"]
+        if len(row["ids"]) == 1:
+            line = f"{row['ids'][0]} | {bbox.get('type', '')} | {row['label']} | {round(bbox.get('x', 0))},{round(bbox.get('y', 0))}"
+        else:
+            # Coordinates differ per id and are not needed to pick one of identical elements
+            line = f"{','.join(map(str, row['ids']))} | {bbox.get('type', '')} | {row['label']}"
+
+        if budget is not None and used + len(line) + 1 > budget:
+            omitted += len(row["ids"])
+            continue
+        lines.append(line)
+        used += len(line) + 1
+
+    if omitted:
+        lines.append(f"({omitted} less relevant elements omitted; they are still labeled in the screenshot)")
+    return "\n".join(lines)
@@ -0,0 +1,124 @@
+"""
+Import-time and cold-start benchmark of a WebVision worker.
+
+Each run starts a fresh Python process and measures, in order:
+    import: importing the modules a worker loads (serving imports everything)
+    warm: loading the process runtime (script, compiled graph, node chains)
+    setup: constructing WebVision for consecutive queries (per-query setup)
+
+    python benchmarks/cold_start.py --runs 5 --output cold_start.json
+
+No browser is launched and no model is called. Compare the JSON of two commits to
+keep worker boot and per-query setup time low.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+# Runs in the fresh process; prints one JSON line of timings
+PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+timings = {{}}
+
+start = time.perf_counter()
+import serving
+timings["import"] = time.perf_counter() - start
+
+from runtime import get_runtime
+start = time.perf_counter()
+timings["warm_resources"] = get_runtime().warm()
+timings["warm"] = time.perf_counter() - start
+
+from main import WebVision
+setups = []
+for _ in range({queries}):
+    start = time.perf_counter()
+    WebVision("benchmark", "benchmark", None, None)
+    setups.append(time.perf_counter() - start)
+timings["setup"] = setups
+
+print(json.dumps(timings))
+"""
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(values) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": round(statistics.mean(values), 4),
+        "p50": round(values[len(values) // 2], 4),
+        "max": round(values[-1], 4),
+    }
+
+
+def probe(queries: int) -> dict:
+    env = dict(os.environ)
+    env.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1:9")
+    env.setdefault("AZURE_OPENAI_API_KEY", "offline-benchmark")
+    env.setdefault("OPENAI_API_VERSION", "2024-05-01-preview")
+    # A different working directory checks that nothing is resolved relative to it
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE.format(root=ROOT_DIR, queries=queries)],
+        cwd=BENCHMARKS_DIR,
+        env=env,
+        text=True,
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(args) -> dict:
+    runs = []
+    for run in range(args.runs):
+        started = time.perf_counter()
+        runs.append(probe(args.queries))
+        print(f"run {run + 1}: {time.perf_counter() - started:.2f}s", file=sys.stderr)
+
+    resources = sorted({name for run in runs for name in run["warm_resources"]})
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {"runs": args.runs, "queries": args.queries},
+        "import": summarize([run["import"] for run in runs]),
+        "warm": summarize([run["warm"] for run in runs]),
+        "warm_resources": {
+            name: summarize([run["warm_resources"][name] for run in runs]) for name in resources
+        },
+        "first_setup": summarize([run["setup"][0] for run in runs]),
+        "setup": summarize([value for run in runs for value in run["setup"][1:]] or [0.0]),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="WebVision import-time and cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to measure")
+    parser.add_argument("--queries", type=int, default=20, help="WebVision constructions per process")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    report = main(arguments)
+    encoded = json.dumps(report, indent=2)
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            f.write(encoded)
+    else:
+        print(encoded)
@@ -0,0 +1,52 @@
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """
+    Serves the benchmark fixture pages on a local port from a background thread.
+
+    Attributes:
+        directory (str): Directory of the fixture pages.
+        host (str): Interface to bind.
+        port (int): Bound port; 0 picks a free port on start.
+    """
+
+    def __init__(self, directory: str = FIXTURES_DIR, host: str = "127.0.0.1", port: int = 0):
+        self.directory = directory
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self) -> "FixtureServer":
+        handler = functools.partial(_QuietHandler, directory=self.directory)
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def url(self, path: str = "/") -> str:
+        return f"http://{self.host}:{self.port}/{path.lstrip('/')}"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
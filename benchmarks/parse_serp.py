@@ -0,0 +1,47 @@
+"""
+Parses the saved results page fixtures with the search fast path parser and prints
+the structured results, to inspect the engine selectors after updating a fixture:
+
+    python benchmarks/parse_serp.py
+    python benchmarks/parse_serp.py serp_bing.html=bing
+
+The expected results of each fixture are asserted in tests/test_parse_serp.py.
+"""
+import asyncio
+import json
+import os
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from playwright.async_api import async_playwright  # noqa: E402
+
+from search import parse_serp  # noqa: E402
+
+from fixture_server import FixtureServer  # noqa: E402
+
+# Fixture page and the engine whose selectors it was saved from
+FIXTURES = {
+    "serp_duckduckgo.html": "duckduckgo",
+    "serp_bing.html": "bing",
+    "serp.html": "fixture",
+}
+
+
+async def main(fixtures: dict) -> dict:
+    parsed = {}
+    with FixtureServer() as server:
+        async with async_playwright() as playwright:
+            browser = await playwright.chromium.launch()
+            page = await browser.new_page()
+            for name, engine in fixtures.items():
+                await page.goto(server.url(name), wait_until="domcontentloaded")
+                parsed[name] = {"engine": engine, **await parse_serp(page, engine)}
+            await browser.close()
+    return parsed
+
+
+if __name__ == "__main__":
+    selected = dict(argument.split("=", 1) for argument in sys.argv[1:]) or FIXTURES
+    print(json.dumps(asyncio.run(main(selected)), indent=2, ensure_ascii=False))
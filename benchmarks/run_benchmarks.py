@@ -0,0 +1,264 @@
+"""
+Offline end-to-end benchmark of WebVision sessions.
+
+Runs full VisionGraph sessions against local fixture pages with a scripted stub model,
+so no Azure credentials or network access are needed, and writes per-node and
+per-phase timings as JSON:
+
+    python benchmarks/run_benchmarks.py --runs 3 --output bench.json
+    python benchmarks/run_benchmarks.py --scenario serp --mode text --latency 0.5
+
+Compare the JSON of two commits to spot step latency regressions. Model time in the
+report is the stub's simulated latency; everything else is measured for real.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+# The Azure clients need an endpoint and key to be built; neither is ever used with the
+# stub model
+sys.path.insert(0, ROOT_DIR)
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "http://127.0.0.1:9")
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "offline-benchmark")
+os.environ.setdefault("OPENAI_API_VERSION", "2024-05-01-preview")
+# Runs start from the local results page instead of a live search engine
+os.environ.setdefault("WEBVISION_SEARCH_ENGINE", "fixture")
+
+import nodes  # noqa: E402
+import search  # noqa: E402
+from main import WebVision, create_browser_pool  # noqa: E402
+from metrics import get_metrics  # noqa: E402
+
+from fixture_server import FixtureServer  # noqa: E402
+from stub_model import StubChatModel  # noqa: E402
+
+metrics = get_metrics()
+
+# Scripted sessions; "{base}" is replaced with the fixture server URL. "expect" gives
+# the minimum value per run of metric counters, checked after the runs. A scenario
+# fails when any run reports errors or an expectation is not met.
+SCENARIOS = {
+    # Starts on the results page opened by the search fast path
+    "search": {
+        "task": "What is the weather in Paris?",
+        "script": [
+            {"tool": "Click", "label": "Weather forecast for Paris"},
+        ],
+        "answer": "Partly cloudy, 18°C.",
+    },
+    # Answered from the results page by the pre-flight check, without the agent loop
+    "direct": {
+        "task": "What is the weather in Paris?",
+        "script": [],
+        "answer": "Partly cloudy, 18°C.",
+        "direct": True,
+    },
+    # Reads the top results of the seeded search in parallel pages
+    "research": {
+        "task": "Compare the Paris weather forecasts",
+        "script": [
+            {"tool": "ReadTopResults", "count": 4},
+        ],
+        "answer": "All sources report partly cloudy weather around 18°C.",
+    },
+    "serp": {
+        "task": "What is the weather in Paris?",
+        "script": [
+            {"tool": "NavigateURL", "url": "{base}/serp.html?q=weather+in+paris"},
+            {"tool": "Click", "label": "Weather forecast for Paris"},
+        ],
+        "answer": "Partly cloudy, 18°C.",
+    },
+    "article": {
+        "task": "Summarise the Paris weather article",
+        "script": [
+            {"tool": "NavigateURL", "url": "{base}/article.html"},
+            {"tool": "Scroll", "direction": 2, "target": "WINDOW"},
+        ],
+        "answer": "Partly cloudy with a high of 18°C.",
+    },
+    # Scrolling up at the top of a page has no effect; change detection must say so
+    "no_effect": {
+        "task": "Summarise the Paris weather article",
+        "script": [
+            {"tool": "NavigateURL", "url": "{base}/article.html"},
+            {"tool": "Scroll", "direction": 1, "target": "WINDOW"},
+        ],
+        "answer": "Partly cloudy with a high of 18°C.",
+        "expect": {"change_detection.unchanged": 1},
+    },
+    "form": {
+        "task": "Find flights to Lisbon",
+        "script": [
+            {"tool": "NavigateURL", "url": "{base}/form.html"},
+            {"tool": "TypeText", "label": "To", "text": "Lisbon"},
+            {"tool": "Click", "label": "Search flights"},
+        ],
+        "answer": "Flight 100 to Lisbon for €89.",
+    },
+    "infinite_scroll": {
+        "task": "Find post 25 in the feed",
+        "script": [
+            {"tool": "NavigateURL", "url": "{base}/infinite_scroll.html"},
+            {"tool": "Scroll", "direction": 2, "target": "WINDOW"},
+            {"tool": "Scroll", "direction": 2, "target": "WINDOW"},
+        ],
+        "answer": "Post 25 is further down the feed.",
+    },
+    "large_dom": {
+        "task": "Find the price of product 42",
+        "script": [
+            {"tool": "NavigateURL", "url": "{base}/large_dom.html"},
+            {"tool": "Scroll", "direction": 2, "target": "WINDOW"},
+        ],
+        "answer": "Product 42 costs €299.71.",
+    },
+}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def summarize(values) -> dict:
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean": round(statistics.mean(values), 4),
+        "p50": round(values[len(values) // 2], 4),
+        "max": round(values[-1], 4),
+    }
+
+
+def fill(value, base: str):
+    return value.replace("{base}", base) if isinstance(value, str) else value
+
+
+async def run_scenario(name: str, scenario: dict, runs: int, mode: str, pool, stub: StubChatModel, base: str) -> dict:
+    """
+    Runs one scripted scenario `runs` times and collects its timings.
+    """
+    metrics.reset()
+    wall_times, steps, errors, calls = [], [], [], []
+
+    for _ in range(runs):
+        script = [{key: fill(value, base) for key, value in action.items()} for action in scenario["script"]]
+        stub.reset(script, scenario["answer"], scenario.get("direct", False))
+
+        web_vision = WebVision("benchmark", "benchmark", None, None, browser_pool=pool, observation_mode=mode)
+        result = await web_vision.run(scenario["task"])
+
+        wall_times.append(result.execution_time)
+        steps.append(result.steps)
+        calls.append(dict(stub.calls))
+        if result.errors:
+            errors.append(result.errors)
+
+    snapshot = metrics.snapshot()
+    timings = snapshot["timings"]
+    failures = [f"run reported errors: {error}" for error in errors]
+    failures += [
+        f"{counter} was {snapshot['counters'].get(counter, 0)}, expected at least {minimum * runs}"
+        for counter, minimum in scenario.get("expect", {}).items()
+        if snapshot["counters"].get(counter, 0) < minimum * runs
+    ]
+    return {
+        "scenario": name,
+        "runs": runs,
+        "wall_time": summarize(wall_times),
+        "steps": summarize(steps),
+        "errors": errors,
+        "failures": failures,
+        "model_calls": calls[-1] if calls else {},
+        "nodes": {key[len("graph."):]: value for key, value in timings.items() if key.startswith("graph.")},
+        "phases": {key: value for key, value in timings.items() if not key.startswith("graph.")},
+        "counters": snapshot["counters"],
+        "models": nodes.router.stats(),
+    }
+
+
+async def main(args) -> dict:
+    stub = StubChatModel(latency=args.latency)
+    nodes.use_model(stub)
+
+    names = args.scenario or list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+    with FixtureServer() as server:
+        base = server.url("").rstrip("/")
+        # No engine selectors: results are parsed from the heading links of serp.html
+        search.register_engine("fixture", {
+            "url": base + "/serp.html?q={query}",
+            "result": "",
+            "title": "",
+            "snippet": "",
+            "answer": "",
+        })
+        pool = create_browser_pool(size=1, warm_contexts=1, start_url=server.url("index.html"))
+        await pool.start()
+        try:
+            results = []
+            for name in names:
+                started = time.perf_counter()
+                result = await run_scenario(name, SCENARIOS[name], args.runs, args.mode, pool, stub, base)
+                print(
+                    f"{name}: {result['wall_time']['mean']:.3f}s per run, "
+                    f"{time.perf_counter() - started:.1f}s total, {len(result['errors'])} error(s)",
+                    file=sys.stderr,
+                )
+                for failure in result["failures"]:
+                    print(f"{name}: FAILED: {failure}", file=sys.stderr)
+                results.append(result)
+        finally:
+            await pool.close()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "config": {
+            "runs": args.runs,
+            "mode": args.mode,
+            "latency": args.latency,
+            "browser": pool.browser_type,
+        },
+        "scenarios": results,
+        "failed": [result["scenario"] for result in results if result["failures"]],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline WebVision benchmark")
+    parser.add_argument("--scenario", action="append", help="Scenario to run (repeatable); default: all")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per scenario")
+    parser.add_argument("--mode", choices=["vision", "text"], default="vision", help="Observation mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated model latency per call, seconds")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    report = asyncio.run(main(arguments))
+    encoded = json.dumps(report, indent=2, ensure_ascii=False)
+    if arguments.output:
+        with open(arguments.output, "w") as f:
+            f.write(encoded)
+    else:
+        print(encoded)
+    if report["failed"]:
+        sys.exit(f"Failed scenario(s): {', '.join(report['failed'])}")
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Rows of the labeled element table ("12 | a | Read more | 40,200") and of the text
+# outline ("[12] a: Read more")
+TABLE_ROW = re.compile(r"^([\d,]+) \| (\w+) \| (.*?)(?: \| [-\d]+,[-\d]+)?$", re.MULTILINE)
+OUTLINE_ROW = re.compile(r"^\[(\d+)\] (\w+): (.*)$", re.MULTILINE)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Deterministic chat model for offline benchmarks.
+
+    Each node call is recognised by the tools bound to it:
+        main chain (navigation tools): returns the next scripted action, then
+            MarkTaskComplete once the script is exhausted.
+        tool chain (MarkTaskComplete, LogVisitedWebsiteInput, Response): no tool calls.
+        answer chain (Response only): a Response call with the scripted answer.
+        preflight (Preflight only): answerable when the session is scripted as direct.
+        insights (no tools): a short summary of the page text it was given.
+        summarize (no tools, memory prompt): the older memory entries, shortened.
+
+    Script actions are dicts with a tool name and its arguments, e.g.
+    {"tool": "NavigateURL", "url": "..."}. Instead of a `bbox_id`, an action may
+    give a `label`; the id is then looked up in the element table or outline of the
+    prompt, so scripts keep working when element numbering changes. A label missing
+    from the prompt fails the call.
+
+    Attributes:
+        script (List[dict]): Actions returned by consecutive main chain calls.
+        answer (str): Final answer returned by the answer chain.
+        direct (bool): Whether the pre-flight check reports the task as answerable.
+        latency (float): Simulated model latency per call, in seconds.
+    """
+
+    script: List[dict] = []
+    answer: str = "Benchmark answer"
+    direct: bool = False
+    latency: float = 0.0
+    calls: Dict[str, int] = {}
+    position: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "webvision-stub"
+
+    def bind_tools(self, tools: List[Any], tool_choice: Optional[str] = None, **kwargs):
+        names = [convert_to_openai_tool(tool)["function"]["name"] for tool in tools]
+        return self.bind(tools=names, tool_choice=tool_choice, **kwargs)
+
+    def reset(self, script: List[dict], answer: str, direct: bool = False):
+        """
+        Starts a new scripted session.
+        """
+        self.script = list(script)
+        self.answer = answer
+        self.direct = direct
+        self.position = 0
+        self.calls = {}
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools") or [])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, kwargs.get("tools") or [])
+
+    def _respond(self, messages: List[BaseMessage], tools: List[str]) -> ChatResult:
+        if tools == ["Response"]:
+            kind = "answer"
+            message = self._tool_message("", "Response", {"final_answer": self.answer, "errors": None})
+        elif tools == ["Preflight"]:
+            kind = "preflight"
+            message = self._tool_message("", "Preflight", {"answerable": self.direct, "reason": "Scripted"})
+        elif "Click" in tools:
+            kind = "main"
+            message = self._next_action(messages)
+        elif tools:
+            kind = "tool_chain"
+            message = AIMessage(content="Nothing to record.")
+        else:
+            kind = "summarize" if "working memory" in str(messages[0].content) else "insights"
+            text = " ".join(str(message.content) for message in messages[1:])
+            prefix = "Summary" if kind == "summarize" else "Insight"
+            message = AIMessage(content=f"{prefix}: {' '.join(text.split())[:200]}")
+
+        self.calls[kind] = self.calls.get(kind, 0) + 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _next_action(self, messages: List[BaseMessage]) -> AIMessage:
+        if self.position >= len(self.script):
+            return self._tool_message("The task is complete.", "MarkTaskComplete", {})
+
+        action = dict(self.script[self.position])
+        self.position += 1
+        tool = action.pop("tool")
+        if "label" in action:
+            action["bbox_id"] = self._find_element(messages, action.pop("label"))
+        return self._tool_message(f"Scripted step {self.position}: {tool}", tool, action)
+
+    @staticmethod
+    def _find_element(messages: List[BaseMessage], label: str) -> int:
+        prompt = "\n".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for message in messages
+            for part in (message.content if isinstance(message.content, list) else [message.content])
+        )
+        rows = [match for pattern in (TABLE_ROW, OUTLINE_ROW) for match in pattern.finditer(prompt)]
+        # Exact label matches win over substring matches
+        for matches in (
+            lambda text: text == label.lower(),
+            lambda text: label.lower() in text,
+        ):
+            for row in rows:
+                if matches(row.group(3).strip().lower()):
+                    return int(row.group(1).split(",")[0])
+        # Acting on an arbitrary element would let a broken observation pass unnoticed
+        raise ValueError(f"No element labeled '{label}' in the prompt")
+
+    def _tool_message(self, content: str, name: str, args: dict) -> AIMessage:
+        call_id = f"call_{name}_{sum(self.calls.values())}"
+        return AIMessage(
+            content=content,
+            additional_kwargs={
+                "tool_calls": [
+                    {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+                ]
+            },
+            tool_calls=[{"id": call_id, "name": name, "args": args}],
+        )
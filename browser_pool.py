@@ -0,0 +1,279 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+
+from constants import (
+    BROWSER_TYPE,
+    HEADLESS_MODE,
+    BROWSER_START_URL,
+    BROWSER_POOL_SIZE,
+    BROWSER_POOL_WARM_CONTEXTS,
+    BROWSER_POOL_CHECKOUT_TIMEOUT,
+    REQUEST_FILTER_ENABLED,
+)
+from request_filter import RequestFilter, get_request_filter
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+
+class BrowserPool:
+    """
+    Long-lived pool of launched browsers handing out isolated, pre-warmed browser contexts.
+
+    Each browser keeps `warm_contexts` contexts ready with the start URL already loaded.
+    A checked-out context is closed when returned and a fresh one is warmed in the
+    background, so no cookies or storage leak between runs.
+
+    Attributes:
+        size (int): Number of launched browsers.
+        warm_contexts (int): Number of pre-warmed contexts kept per browser.
+        browser_type (str): Playwright browser type ("firefox" or "chromium").
+        headless (bool): Whether browsers run headless.
+        start_url (str): URL loaded in every warm context.
+        init_scripts (List[str]): Scripts registered on every context before navigation.
+        checkout_timeout (float): Maximum seconds to wait for a context.
+        filter_requests (bool): Whether to install a RequestFilter on every context.
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        warm_contexts: int = BROWSER_POOL_WARM_CONTEXTS,
+        browser_type: str = BROWSER_TYPE,
+        headless: bool = HEADLESS_MODE,
+        start_url: str = BROWSER_START_URL,
+        init_scripts: Optional[List[str]] = None,
+        checkout_timeout: float = BROWSER_POOL_CHECKOUT_TIMEOUT,
+        filter_requests: bool = REQUEST_FILTER_ENABLED,
+    ):
+        self.size = max(1, size)
+        self.warm_contexts = max(0, warm_contexts)
+        self.browser_type = browser_type
+        self.headless = headless
+        self.start_url = start_url
+        self.init_scripts = init_scripts or []
+        self.checkout_timeout = checkout_timeout
+        self.filter_requests = filter_requests
+
+        self._playwright = None
+        self._browsers: List[Optional[Browser]] = []
+        self._warm: asyncio.Queue = None
+        self._in_use: List[int] = []
+        self._available: List[int] = []
+        self._warming: List[int] = []
+        self._tasks = set()
+        self._lock: asyncio.Lock = None
+        self._started = False
+        self._closed = False
+        self._checkouts = 0
+        self._warm_hits = 0
+        self._cold_starts = 0
+
+    async def start(self):
+        """
+        Starts Playwright, launches the browsers and warms the initial contexts.
+        """
+        if self._started:
+            return
+
+        start_time = time.perf_counter()
+        self._lock = asyncio.Lock()
+        self._warm = asyncio.Queue()
+        self._playwright = await async_playwright().start()
+        self._browsers = list(await asyncio.gather(*(self._launch() for _ in range(self.size))))
+        self._in_use = [0] * self.size
+        self._available = [0] * self.size
+        self._warming = [0] * self.size
+        self._started = True
+
+        await asyncio.gather(
+            *(self._replenish(index) for index in range(self.size)),
+            return_exceptions=True,
+        )
+
+        elapsed = time.perf_counter() - start_time
+        metrics.observe("browser_pool.start", elapsed)
+        logger.debug(
+            f"[POOL] Started {self.size} {self.browser_type} browser(s) with "
+            f"{self._warm.qsize()} warm context(s) in {elapsed:.4f} seconds"
+        )
+
+    async def close(self):
+        """
+        Closes all warm contexts, browsers and the Playwright driver.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        for task in list(self._tasks):
+            task.cancel()
+
+        while self._warm is not None and not self._warm.empty():
+            _, context, _ = self._warm.get_nowait()
+            await self._close_context(context)
+
+        for browser in self._browsers:
+            if browser is None:
+                continue
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning(f"[POOL] Error while closing browser: {e}")
+
+        if self._playwright:
+            await self._playwright.stop()
+        logger.debug("[POOL] Browser pool closed")
+
+    @asynccontextmanager
+    async def checkout(self):
+        """
+        Checks out an isolated, pre-warmed page for the duration of a run.
+
+        Yields:
+            Page: A page in a fresh browser context, already on the start URL.
+        """
+        if not self._started:
+            await self.start()
+
+        checkout_start = time.perf_counter()
+        index, context, page = await asyncio.wait_for(
+            self._acquire(), timeout=self.checkout_timeout
+        )
+        latency = time.perf_counter() - checkout_start
+        self._checkouts += 1
+        self._in_use[index] += 1
+        metrics.observe("browser_pool.checkout", latency)
+        logger.debug(f"[POOL] Checked out context from browser {index} in {latency:.4f} seconds")
+
+        try:
+            yield page
+        finally:
+            self._in_use[index] -= 1
+            request_filter = get_request_filter(page)
+            if request_filter:
+                logger.debug(f"[POOL] Request filter stats for run: {request_filter.page_stats()}")
+            await self._close_context(context)
+            self._schedule_replenish(index)
+
+    def stats(self) -> dict:
+        """
+        Reports pool configuration, occupancy and checkout latency.
+
+        Returns:
+            dict: Pool statistics.
+        """
+        timings = metrics.snapshot()["timings"]
+        return {
+            "size": self.size,
+            "warm_contexts": self.warm_contexts,
+            "warm_available": self._warm.qsize() if self._warm else 0,
+            "in_use": sum(self._in_use),
+            "checkouts": self._checkouts,
+            "warm_hits": self._warm_hits,
+            "cold_starts": self._cold_starts,
+            "checkout_latency": timings.get("browser_pool.checkout"),
+            "warm_latency": timings.get("browser_pool.warm"),
+        }
+
+    async def _acquire(self):
+        """
+        Returns a healthy warm context, or creates one on demand if none is ready.
+        """
+        while not self._warm.empty():
+            index, context, page = self._warm.get_nowait()
+            self._available[index] -= 1
+            browser = self._browsers[index]
+            if browser and browser.is_connected() and not page.is_closed():
+                self._warm_hits += 1
+                self._schedule_replenish(index)
+                return index, context, page
+            await self._close_context(context)
+            self._schedule_replenish(index)
+
+        self._cold_starts += 1
+        index = self._least_loaded()
+        context, page = await self._create_context(index)
+        return index, context, page
+
+    def _least_loaded(self) -> int:
+        return min(range(self.size), key=lambda i: self._in_use[i] + self._warming[i])
+
+    async def _launch(self) -> Browser:
+        launcher = getattr(self._playwright, self.browser_type)
+        return await launcher.launch(headless=self.headless)
+
+    async def _create_context(self, index: int):
+        """
+        Creates a context on the given browser and loads the start URL into it.
+        Relaunches the browser first if it has crashed or disconnected.
+        """
+        async with self._lock:
+            browser = self._browsers[index]
+            if browser is None or not browser.is_connected():
+                logger.warning(f"[POOL] Browser {index} disconnected, relaunching")
+                browser = await self._launch()
+                self._browsers[index] = browser
+
+        warm_start = time.perf_counter()
+        context: BrowserContext = await browser.new_context()
+        try:
+            for script in self.init_scripts:
+                await context.add_init_script(script)
+            if self.filter_requests:
+                await RequestFilter().install(context)
+            page: Page = await context.new_page()
+
+            try:
+                await page.goto(self.start_url, wait_until="domcontentloaded")
+            except Exception as e:
+                logger.warning(f"[POOL] Could not load {self.start_url} while warming: {e}")
+        except BaseException:
+            # A checkout timing out mid-creation cancels us here; the half-created
+            # context would otherwise never be returned to the pool or closed
+            await asyncio.shield(self._close_context(context))
+            raise
+
+        metrics.observe("browser_pool.warm", time.perf_counter() - warm_start)
+        return context, page
+
+    async def _replenish(self, index: int):
+        """
+        Tops up the warm contexts of one browser to the configured depth.
+        """
+        while not self._closed:
+            if self._available[index] + self._warming[index] >= self.warm_contexts:
+                return
+            self._warming[index] += 1
+            try:
+                context, page = await self._create_context(index)
+                if self._closed:
+                    await self._close_context(context)
+                    return
+                self._warm.put_nowait((index, context, page))
+                self._available[index] += 1
+            except Exception as e:
+                logger.error(f"[POOL] Failed to warm context on browser {index}: {e}", exc_info=True)
+                return
+            finally:
+                self._warming[index] -= 1
+
+    def _schedule_replenish(self, index: int):
+        if self._closed:
+            return
+        task = asyncio.create_task(self._replenish(index))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _close_context(context: BrowserContext):
+        try:
+            await context.close()
+        except Exception as e:
+            logger.warning(f"[POOL] Context already closed or connection lost: {e}")
@@ -0,0 +1,161 @@
+import base64
+import hashlib
+import io
+from typing import Any, FrozenSet, List, Optional, TypedDict
+
+import numpy as np
+
+from constants import (
+    CHANGE_DETECTION_GRID,
+    CHANGE_DETECTION_PIXEL_THRESHOLD,
+    CHANGE_DETECTION_MIN_CHANGED,
+)
+from state import BBox
+from metrics import get_metrics
+from logger import get_logger
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow screenshots are compared byte for byte
+    Image = None
+
+logger = get_logger()
+metrics = get_metrics()
+
+
+class PageSnapshot(TypedDict):
+    """
+    Compact summary of one observed page, kept in state to compare with the next step.
+
+    Attributes:
+        url (str): Page URL.
+        pixels (Optional[np.ndarray]): Downsampled grayscale screenshot (grid x grid).
+        digest (str): Hash of the encoded screenshot (or outline), compared when no pixels are available.
+        bboxes (FrozenSet[tuple]): Signature of the marked elements.
+    """
+    url: str
+    pixels: Optional[Any]
+    digest: str
+    bboxes: FrozenSet[tuple]
+
+
+class PageChange(TypedDict):
+    """
+    Difference between two consecutive page snapshots.
+
+    Attributes:
+        changed (bool): Whether the page changed in any way.
+        url_changed (bool): Whether the URL changed.
+        bboxes_changed (bool): Whether the set of marked elements changed.
+        changed_fraction (float): Fraction of downsampled cells whose brightness changed.
+        region (Optional[dict]): Bounding box of the changed cells as fractions of the
+            screenshot ("x", "y", "width", "height"), or None if no pixels changed.
+    """
+    changed: bool
+    url_changed: bool
+    bboxes_changed: bool
+    changed_fraction: float
+    region: Optional[dict]
+
+
+def take_snapshot(
+    url: str,
+    img: Optional[str],
+    bboxes: List[BBox],
+    outline: Optional[str] = None,
+    grid: int = CHANGE_DETECTION_GRID,
+) -> PageSnapshot:
+    """
+    Builds a snapshot of the current page from the encoded screenshot and marked elements.
+
+    Args:
+        url (str): Page URL.
+        img (Optional[str]): Base64-encoded screenshot.
+        bboxes (List[BBox]): Marked elements.
+        outline (Optional[str]): Text outline of the page, for text-only observations.
+        grid (int): Side of the downsampled image.
+
+    Returns:
+        PageSnapshot: The snapshot.
+    """
+    pixels = None
+    if img and Image is not None:
+        image = Image.open(io.BytesIO(base64.b64decode(img))).convert("L")
+        # Box filtering averages every source pixel, so anti-aliasing and caret blinks
+        # barely move a cell while real content changes do
+        pixels = np.asarray(image.resize((grid, grid), Image.BOX), dtype=np.int16)
+
+    return {
+        "url": url,
+        "pixels": pixels,
+        "digest": hashlib.sha1((img or outline or "").encode()).hexdigest(),
+        "bboxes": frozenset(
+            (bbox.get("type"), (bbox.get("text") or "")[:80], round(bbox.get("x", 0)), round(bbox.get("y", 0)))
+            for bbox in bboxes
+        ),
+    }
+
+
+def compare_snapshots(
+    previous: PageSnapshot,
+    current: PageSnapshot,
+    pixel_threshold: int = CHANGE_DETECTION_PIXEL_THRESHOLD,
+    min_changed: float = CHANGE_DETECTION_MIN_CHANGED,
+) -> PageChange:
+    """
+    Compares two snapshots of consecutive steps.
+
+    Args:
+        previous (PageSnapshot): Snapshot of the previous step.
+        current (PageSnapshot): Snapshot of the current step.
+        pixel_threshold (int): Brightness difference (0-255) above which a cell counts as changed.
+        min_changed (float): Fraction of changed cells below which the image counts as unchanged.
+
+    Returns:
+        PageChange: The detected change.
+    """
+    url_changed = previous["url"] != current["url"]
+    bboxes_changed = previous["bboxes"] != current["bboxes"]
+
+    region = None
+    if previous["pixels"] is not None and current["pixels"] is not None \
+            and previous["pixels"].shape == current["pixels"].shape:
+        changed_cells = np.abs(current["pixels"] - previous["pixels"]) > pixel_threshold
+        changed_fraction = float(changed_cells.mean())
+        if changed_cells.any():
+            rows = np.flatnonzero(changed_cells.any(axis=1))
+            cols = np.flatnonzero(changed_cells.any(axis=0))
+            grid_h, grid_w = changed_cells.shape
+            region = {
+                "x": cols[0] / grid_w,
+                "y": rows[0] / grid_h,
+                "width": (cols[-1] + 1 - cols[0]) / grid_w,
+                "height": (rows[-1] + 1 - rows[0]) / grid_h,
+            }
+    else:
+        changed_fraction = 0.0 if previous["digest"] == current["digest"] else 1.0
+
+    changed = url_changed or bboxes_changed or changed_fraction >= min_changed
+    metrics.increment("change_detection.changed" if changed else "change_detection.unchanged")
+    return {
+        "changed": changed,
+        "url_changed": url_changed,
+        "bboxes_changed": bboxes_changed,
+        "changed_fraction": changed_fraction,
+        "region": region,
+    }
+
+
+def describe_region(region: Optional[dict]) -> str:
+    """
+    Describes a changed region in words for the model, e.g. "top-right (40% of the screen)".
+    """
+    if not region:
+        return "nowhere"
+
+    center_x = region["x"] + region["width"] / 2
+    center_y = region["y"] + region["height"] / 2
+    vertical = "top" if center_y < 1 / 3 else "bottom" if center_y > 2 / 3 else "middle"
+    horizontal = "left" if center_x < 1 / 3 else "right" if center_x > 2 / 3 else "center"
+    area = region["width"] * region["height"]
+    return f"{vertical}-{horizontal} ({area:.0%} of the screen)"
@@ -1,2 +1,129 @@
+import os
+
 RECURSION_LIMIT = 5
 GRAPH_RECURSION_LIMIT = 150
+
+# Browser pool
+BROWSER_TYPE = os.getenv("WEBVISION_BROWSER_TYPE", "firefox")  # "firefox" or "chromium"
+HEADLESS_MODE = os.getenv("WEBVISION_HEADLESS", "true").lower() == "true"
+BROWSER_START_URL = os.getenv("WEBVISION_START_URL", "https://duckduckgo.com/")
+BROWSER_POOL_SIZE = int(os.getenv("WEBVISION_BROWSER_POOL_SIZE", "1"))  # launched browsers
+BROWSER_POOL_WARM_CONTEXTS = int(os.getenv("WEBVISION_BROWSER_POOL_WARM_CONTEXTS", "2"))  # per browser
+BROWSER_POOL_CHECKOUT_TIMEOUT = float(os.getenv("WEBVISION_BROWSER_POOL_CHECKOUT_TIMEOUT", "30"))
+
+# Serving
+MAX_CONCURRENT_SESSIONS = int(os.getenv("WEBVISION_MAX_CONCURRENT_SESSIONS", "8"))  # per worker process
+QUERY_TIMEOUT = float(os.getenv("WEBVISION_QUERY_TIMEOUT", "600"))
+SSE_KEEPALIVE_INTERVAL = float(os.getenv("WEBVISION_SSE_KEEPALIVE_INTERVAL", "15"))
+
+# Multi-process workers (0 runs agents in the web process itself)
+WORKER_PROCESSES = int(os.getenv("WEBVISION_WORKER_PROCESSES", "0"))
+WORKER_START_METHOD = os.getenv("WEBVISION_WORKER_START_METHOD", "spawn")
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WEBVISION_WORKER_HEARTBEAT_INTERVAL", "5"))
+WORKER_HEARTBEAT_TIMEOUT = float(os.getenv("WEBVISION_WORKER_HEARTBEAT_TIMEOUT", "30"))
+WORKER_STARTUP_TIMEOUT = float(os.getenv("WEBVISION_WORKER_STARTUP_TIMEOUT", "120"))
+
+# Request filtering on agent pages
+REQUEST_FILTER_ENABLED = os.getenv("WEBVISION_REQUEST_FILTER", "true").lower() == "true"
+REQUEST_FILTER_BLOCK_TYPES = [
+    t.strip() for t in os.getenv("WEBVISION_REQUEST_FILTER_BLOCK_TYPES", "media,font").split(",") if t.strip()
+]
+REQUEST_FILTER_IMAGES = os.getenv("WEBVISION_REQUEST_FILTER_IMAGES", "allow")  # "allow", "placeholder" or "block"
+REQUEST_FILTER_BLOCK_TRACKERS = os.getenv("WEBVISION_REQUEST_FILTER_BLOCK_TRACKERS", "true").lower() == "true"
+REQUEST_FILTER_EXTRA_HOSTS = [
+    h.strip() for h in os.getenv("WEBVISION_REQUEST_FILTER_EXTRA_HOSTS", "").split(",") if h.strip()
+]
+
+# Screenshot encoding for the vision prompt
+SCREENSHOT_FORMAT = os.getenv("WEBVISION_SCREENSHOT_FORMAT", "jpeg")  # "png", "jpeg" or "webp"
+SCREENSHOT_QUALITY = int(os.getenv("WEBVISION_SCREENSHOT_QUALITY", "70"))  # jpeg/webp only
+SCREENSHOT_MAX_WIDTH = int(os.getenv("WEBVISION_SCREENSHOT_MAX_WIDTH", "1280"))  # 0 disables downscaling
+SCREENSHOT_MAX_HEIGHT = int(os.getenv("WEBVISION_SCREENSHOT_MAX_HEIGHT", "1280"))
+SCREENSHOT_SCALE = os.getenv("WEBVISION_SCREENSHOT_SCALE", "css")  # "css" or "device"
+SCREENSHOT_GRAYSCALE = os.getenv("WEBVISION_SCREENSHOT_GRAYSCALE", "false").lower() == "true"
+SCREENSHOT_CLIP_VIEWPORT = os.getenv("WEBVISION_SCREENSHOT_CLIP_VIEWPORT", "true").lower() == "true"
+
+# Change detection between consecutive steps
+CHANGE_DETECTION_ENABLED = os.getenv("WEBVISION_CHANGE_DETECTION", "true").lower() == "true"
+CHANGE_DETECTION_GRID = int(os.getenv("WEBVISION_CHANGE_DETECTION_GRID", "64"))  # downsampled image side
+CHANGE_DETECTION_PIXEL_THRESHOLD = int(os.getenv("WEBVISION_CHANGE_DETECTION_PIXEL_THRESHOLD", "16"))  # 0-255
+CHANGE_DETECTION_MIN_CHANGED = float(os.getenv("WEBVISION_CHANGE_DETECTION_MIN_CHANGED", "0.002"))  # cell fraction
+
+# Rough size of a token, used by every prompt token budget; exact counts are not
+# worth a tokenizer call per step
+CHARS_PER_TOKEN = 4
+
+# Labeled element table in prompts
+BBOX_LABEL_MAX_CHARS = int(os.getenv("WEBVISION_BBOX_LABEL_MAX_CHARS", "60"))
+BBOX_TOKEN_BUDGET = int(os.getenv("WEBVISION_BBOX_TOKEN_BUDGET", "1500"))  # 0 disables the budget
+
+# Text shipped per marked element by the marking runtime
+MARK_PAGE_MAX_TEXT_CHARS = int(os.getenv("WEBVISION_MARK_PAGE_MAX_TEXT_CHARS", "200"))
+
+# Observation mode: "vision" sends a labeled screenshot, "text" a page outline without images
+OBSERVATION_MODE = os.getenv("WEBVISION_OBSERVATION_MODE", "vision")
+OUTLINE_MAX_CHARS = int(os.getenv("WEBVISION_OUTLINE_MAX_CHARS", "6000"))
+OUTLINE_MIN_CHARS = int(os.getenv("WEBVISION_OUTLINE_MIN_CHARS", "200"))  # below this, fall back to vision
+
+# Model calls
+LLM_MAX_IN_FLIGHT = int(os.getenv("WEBVISION_LLM_MAX_IN_FLIGHT", "64"))  # per process
+LLM_MAX_CONNECTIONS = int(os.getenv("WEBVISION_LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("WEBVISION_LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_TIMEOUT = float(os.getenv("WEBVISION_LLM_TIMEOUT", "120"))
+
+# Model response cache: "passthrough" (off), "record" (serve hits, store misses) or "replay" (hits only)
+LLM_CACHE_MODE = os.getenv("WEBVISION_LLM_CACHE_MODE", "passthrough")
+LLM_CACHE_DIR = os.getenv("WEBVISION_LLM_CACHE_DIR", os.path.join(".cache", "llm"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("WEBVISION_LLM_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+LLM_CACHE_MAX_AGE = float(os.getenv("WEBVISION_LLM_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # seconds
+
+# Agent memory: approximate token budget per field, entries kept verbatim before summarizing
+MEMORY_TOKEN_BUDGETS = {
+    "history": int(os.getenv("WEBVISION_MEMORY_HISTORY_TOKENS", "400")),
+    "thoughts": int(os.getenv("WEBVISION_MEMORY_THOUGHTS_TOKENS", "800")),
+    "insights": int(os.getenv("WEBVISION_MEMORY_INSIGHTS_TOKENS", "1500")),
+}
+MEMORY_RECENT_ENTRIES = int(os.getenv("WEBVISION_MEMORY_RECENT_ENTRIES", "2"))
+
+# Page text for the insights call: chunks ranked against the task, sent within a token budget
+PAGE_TEXT_TOKEN_BUDGET = int(os.getenv("WEBVISION_PAGE_TEXT_TOKEN_BUDGET", "2500"))  # 0 sends the whole text
+PAGE_TEXT_CHUNK_TOKENS = int(os.getenv("WEBVISION_PAGE_TEXT_CHUNK_TOKENS", "150"))
+PAGE_TEXT_MIN_MAIN_CHARS = int(os.getenv("WEBVISION_PAGE_TEXT_MIN_MAIN_CHARS", "500"))  # below this, use the body
+
+# Model routing: Azure deployment per tier, and tier, max output tokens and timeout per node role
+MODEL_DEPLOYMENTS = {
+    "large": os.getenv("WEBVISION_MODEL_LARGE", "pinewheel-4o"),
+    # Defaults to the large deployment until a smaller one is configured
+    "small": os.getenv("WEBVISION_MODEL_SMALL", os.getenv("WEBVISION_MODEL_LARGE", "pinewheel-4o")),
+}
+MODEL_ESCALATION_TIER = os.getenv("WEBVISION_MODEL_ESCALATION_TIER", "large")  # retried on invalid output
+MODEL_ROUTES = {
+    role: {
+        "tier": os.getenv(f"WEBVISION_MODEL_{role.upper()}_TIER", tier),
+        "max_tokens": int(os.getenv(f"WEBVISION_MODEL_{role.upper()}_MAX_TOKENS", str(max_tokens))),
+        "timeout": float(os.getenv(f"WEBVISION_MODEL_{role.upper()}_TIMEOUT", str(timeout))),
+    }
+    for role, tier, max_tokens, timeout in [
+        ("main", "large", 1024, 60),
+        ("tool_chain", "small", 256, 30),
+        ("insights", "small", 800, 45),
+        ("summarize", "small", 400, 45),
+        ("answer", "large", 1500, 90),
+        ("preflight", "small", 200, 20),
+    ]
+}
+
+# Search fast path: open the results page for the task before the first step and parse it
+SEARCH_FAST_PATH = os.getenv("WEBVISION_SEARCH_FAST_PATH", "true").lower() == "true"
+SEARCH_ENGINE = os.getenv("WEBVISION_SEARCH_ENGINE", "duckduckgo")  # key of search.SEARCH_ENGINES
+SEARCH_MAX_RESULTS = int(os.getenv("WEBVISION_SEARCH_MAX_RESULTS", "8"))
+SEARCH_SNIPPET_MAX_CHARS = int(os.getenv("WEBVISION_SEARCH_SNIPPET_MAX_CHARS", "200"))
+
+# Pre-flight: ask once whether the search results page already answers the task
+PREFLIGHT_ENABLED = os.getenv("WEBVISION_PREFLIGHT_ENABLED", "true").lower() == "true"
+
+# Fan-out: read the top search results in parallel pages of the run's browser context
+FANOUT_MAX_SOURCES = int(os.getenv("WEBVISION_FANOUT_MAX_SOURCES", "4"))  # K
+FANOUT_CONCURRENCY = int(os.getenv("WEBVISION_FANOUT_CONCURRENCY", "4"))  # open pages per run
+FANOUT_PAGE_TIMEOUT = float(os.getenv("WEBVISION_FANOUT_PAGE_TIMEOUT", "20"))  # load and extract, seconds
+FANOUT_SOURCE_TIMEOUT = float(os.getenv("WEBVISION_FANOUT_SOURCE_TIMEOUT", "60"))  # including the insight
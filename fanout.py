@@ -0,0 +1,163 @@
+import asyncio
+import datetime
+import json
+import time
+from typing import Awaitable, Callable, List, Optional, TypedDict
+
+from constants import (
+    FANOUT_MAX_SOURCES,
+    FANOUT_CONCURRENCY,
+    FANOUT_PAGE_TIMEOUT,
+    FANOUT_SOURCE_TIMEOUT,
+)
+from memory import remember
+from page_text import get_relevant_text
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+# Produces the insight of one source from (url, title, page text)
+InsightFn = Callable[[str, str, str], Awaitable[str]]
+
+
+class SourceInsight(TypedDict):
+    """
+    Result of reading one source.
+
+    Attributes:
+        url (str): Requested URL.
+        title (str): Page title, or the search result title.
+        insight (str): Insight generated from the page text, or "".
+        error (Optional[str]): Why the source could not be read.
+        elapsed (float): Time spent on the source, in seconds.
+    """
+    url: str
+    title: str
+    insight: str
+    error: Optional[str]
+    elapsed: float
+
+
+def top_result_urls(state, count: int = FANOUT_MAX_SOURCES) -> List[dict]:
+    """
+    Returns the top search results of the run not visited yet, as {"url", "title"}.
+
+    Args:
+        state (AgentState): The current agent state.
+        count (int): Maximum number of results (K).
+
+    Returns:
+        List[dict]: The results to read.
+    """
+    try:
+        visited = {entry.get("url") for entry in json.loads(state.get("VISITED_WEBSITES") or "[]")}
+    except (json.JSONDecodeError, AttributeError):
+        visited = set()
+    results = (state.get("search") or {}).get("results") or []
+    return [
+        {"url": result["url"], "title": result["title"]}
+        for result in results
+        if result["url"].startswith(("http://", "https://")) and result["url"] not in visited
+    ][:max(0, min(count, FANOUT_MAX_SOURCES))]
+
+
+async def _read_source(context, source: dict, task: str, insight_fn: InsightFn, limiter: asyncio.Semaphore) -> SourceInsight:
+    started = time.perf_counter()
+    url, title = source["url"], source.get("title", "")
+    async with limiter:
+        page = await context.new_page()
+        try:
+            async def load_and_extract():
+                await page.goto(url, timeout=FANOUT_PAGE_TIMEOUT * 1000, wait_until="domcontentloaded")
+                return await get_relevant_text(page, task)
+
+            page_text = await asyncio.wait_for(load_and_extract(), timeout=FANOUT_PAGE_TIMEOUT)
+            title = (await page.title()) or title
+        finally:
+            await page.close()
+
+    # The page is closed before the model call so it does not hold a concurrency slot
+    insight = await insight_fn(url, title, page_text["text"])
+    return {"url": url, "title": title, "insight": insight, "error": None, "elapsed": time.perf_counter() - started}
+
+
+async def fan_out(state, sources: List[dict], task: str, insight_fn: InsightFn) -> List[SourceInsight]:
+    """
+    Reads several sources at once in new pages of the run's browser context.
+
+    Each source is loaded, its relevant text extracted and an insight generated from
+    it, concurrently with the other sources. At most FANOUT_CONCURRENCY pages are open
+    at a time; page loading and extraction are limited to FANOUT_PAGE_TIMEOUT and a
+    whole source to FANOUT_SOURCE_TIMEOUT. A failing source is reported with its error
+    and does not affect the others.
+
+    Args:
+        state (AgentState): The current agent state; its page's context is used.
+        sources (List[dict]): Sources to read, as {"url", "title"}.
+        task (str): The task, used to select the relevant text of each source.
+        insight_fn (InsightFn): Generates the insight of one source.
+
+    Returns:
+        List[SourceInsight]: One result per source, in the order of `sources`.
+    """
+    context = state["page"].context
+    limiter = asyncio.Semaphore(max(1, FANOUT_CONCURRENCY))
+    round_start = time.perf_counter()
+
+    async def read(source: dict) -> SourceInsight:
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(
+                _read_source(context, source, task, insight_fn, limiter),
+                timeout=FANOUT_SOURCE_TIMEOUT,
+            )
+        except Exception as e:
+            reason = "timed out" if isinstance(e, asyncio.TimeoutError) else f"{type(e).__name__}: {e}"
+            logger.warning(f"[FANOUT] Could not read {source['url']}: {reason}")
+            metrics.increment("fanout.source_errors")
+            return {
+                "url": source["url"],
+                "title": source.get("title", ""),
+                "insight": "",
+                "error": reason,
+                "elapsed": time.perf_counter() - started,
+            }
+
+    results = await asyncio.gather(*(read(source) for source in sources))
+    metrics.observe("fanout.round", time.perf_counter() - round_start)
+    metrics.increment("fanout.sources", len(sources))
+    logger.info(
+        f"[FANOUT] Read {sum(not result['error'] for result in results)} of {len(sources)} sources "
+        f"in {time.perf_counter() - round_start:.2f}s"
+    )
+    return results
+
+
+def merge_insights(state, results: List[SourceInsight]):
+    """
+    Adds the per-source insights to the state's insights and VISITED_WEBSITES.
+
+    Args:
+        state (AgentState): The current agent state.
+        results (List[SourceInsight]): Results of `fan_out`.
+    """
+    try:
+        visited = json.loads(state.get("VISITED_WEBSITES") or "[]")
+    except json.JSONDecodeError:
+        visited = []
+
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+    for result in results:
+        if result["error"]:
+            continue
+        remember(state, "insights", f"Source: {result['title']} ({result['url']})\n{result['insight']}")
+        visited.append({
+            "url": result["url"],
+            "title": result["title"],
+            "summary": " ".join(result["insight"].split())[:300],
+            "timestamp": timestamp,
+        })
+
+    state["VISITED_WEBSITES"] = json.dumps(visited, indent=2)
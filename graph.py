@@ -1,7 +1,7 @@
 from langgraph.graph import StateGraph, END
 from state import AgentState
-from nodes import browser_node, execution_node, answer_node
-from constants import RECURSION_LIMIT
+from nodes import browser_node, execution_node, answer_node, preflight_node
+from constants import RECURSION_LIMIT, PREFLIGHT_ENABLED
 import os, sys
 
 
@@ -47,6 +47,26 @@ class VisionGraph:
             logger.error(f"Unexpected error in __continue method: {e}")
             return "end"
 
+    def __entry(self, state):
+        """
+        Starts with the pre-flight check when the run was seeded with search results.
+
+        Args:
+            state (dict): The initial state of the graph execution.
+
+        Returns:
+            str: "preflight" or "browse".
+        """
+        if PREFLIGHT_ENABLED and state.get("search"):
+            return "preflight"
+        return "browse"
+
+    def __after_preflight(self, state):
+        """
+        Goes straight to the answer when the results page already answers the task.
+        """
+        return "answer" if state.get("direct_answer") else "browse"
+
     def __setup_nodes(self):
         """
         Sets up the nodes for the VisionGraph.
@@ -55,8 +75,12 @@ class VisionGraph:
             self.graph.add_node("browser_node", browser_node)
             self.graph.add_node("execution_node", execution_node)
             self.graph.add_node("answer_node", answer_node)
+            self.graph.add_node("preflight_node", preflight_node)
 
-            self.graph.set_entry_point("browser_node")
+            self.graph.set_conditional_entry_point(
+                self.__entry,
+                {"preflight": "preflight_node", "browse": "browser_node"},
+            )
         except Exception as e:
             logger.error(f"Error setting up nodes: {e}")
 
@@ -71,6 +95,12 @@ class VisionGraph:
                 {"end": END, "continue": "browser_node", "answer": "answer_node"},
             )
 
+            self.graph.add_conditional_edges(
+                "preflight_node",
+                self.__after_preflight,
+                {"answer": "answer_node", "browse": "browser_node"},
+            )
+
             # Remove the direct connection from execution_node to END
             self.graph.add_edge("browser_node", "execution_node")
             self.graph.add_edge("answer_node", END)  # Only transition to END from the answer_node
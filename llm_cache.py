@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+from langchain_core.load import dumpd, load
+from langchain_core.messages import BaseMessage, messages_to_dict
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableSequence
+
+from constants import LLM_CACHE_MODE, LLM_CACHE_DIR, LLM_CACHE_MAX_BYTES, LLM_CACHE_MAX_AGE
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+MODES = ("passthrough", "record", "replay")
+
+# Entries written between two eviction passes
+EVICTION_INTERVAL = 100
+
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a model call has no recorded response."""
+
+
+class LLMCache:
+    """
+    Content-addressed on-disk cache of model responses.
+
+    Entries are keyed on a hash of the call name, the model and the fully rendered
+    messages, so the screenshot bytes, history and tool schemas in the prompt are all
+    part of the key. Each entry is one JSON file under `directory`.
+
+    Modes:
+        passthrough: The cache is neither read nor written.
+        record: Hits are served from disk; misses call the model and are stored.
+        replay: Hits are served from disk; misses raise CacheMissError, so a run can
+            be repeated fully offline.
+
+    Attributes:
+        mode (str): "passthrough", "record" or "replay".
+        directory (str): Cache directory.
+        max_bytes (int): Total size above which the least recently used entries are evicted.
+        max_age (float): Seconds after an entry was written after which it expires,
+            however often it is read.
+
+    Each entry's file modification time is its write time, which `max_age` applies
+    to; its access time is refreshed on every hit and orders size-based eviction.
+    """
+
+    def __init__(
+        self,
+        mode: str = LLM_CACHE_MODE,
+        directory: str = LLM_CACHE_DIR,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        max_age: float = LLM_CACHE_MAX_AGE,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Unknown LLM cache mode: {mode}")
+        self.mode = mode
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._evicting = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "passthrough"
+
+    def key(self, name: str, runnable: Runnable, inputs: Any, model: str = "") -> str:
+        """
+        Computes the cache key of a call from its rendered messages.
+
+        Args:
+            name (str): Call name (e.g. "main"); distinguishes chains with different tools.
+            runnable (Runnable): The chain or model being called.
+            inputs (Any): Input of the runnable.
+            model (str): Model or deployment name.
+
+        Returns:
+            str: Hex digest identifying the call.
+        """
+        payload = {"name": name, "model": model, "input": _rendered_input(runnable, inputs)}
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Looks up a response.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            Tuple[bool, Any]: Whether the key was found, and the cached response.
+        """
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            metrics.increment("llm_cache.miss")
+            return False, None
+
+        if time.time() - entry.get("created", 0) > self.max_age:
+            self._remove(path)
+            metrics.increment("llm_cache.miss")
+            return False, None
+
+        # Access time drives least-recently-used eviction; the modification time is kept
+        # as the write time so that max_age still applies to entries that are read often
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+        metrics.increment("llm_cache.hit")
+        return True, load(entry["value"])
+
+    def put(self, key: str, value: Any):
+        """
+        Stores a response. Every EVICTION_INTERVAL writes, an eviction pass is started
+        in a background thread, so the caller does not wait for the directory walk.
+
+        Args:
+            key (str): Cache key.
+            value (Any): Response of the model call (messages, dicts or primitives).
+        """
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"created": time.time(), "value": dumpd(value)}, f)
+        os.replace(temp_path, path)
+        metrics.increment("llm_cache.store")
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % EVICTION_INTERVAL == 1 and not self._evicting
+            if due:
+                self._evicting = True
+        if due:
+            threading.Thread(target=self._evict_in_background, name="llm-cache-evict", daemon=True).start()
+
+    def _evict_in_background(self):
+        try:
+            self.evict()
+        except Exception as e:
+            logger.warning(f"[CACHE] LLM cache eviction failed: {e}")
+        finally:
+            with self._lock:
+                self._evicting = False
+
+    def evict(self):
+        """
+        Removes entries written more than `max_age` ago, then the least recently used
+        entries until the cache fits in `max_bytes`.
+        """
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for file in files:
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if now - stat.st_mtime > self.max_age:
+                    self._remove(path)
+                else:
+                    entries.append((stat.st_atime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+            evicted += 1
+        if evicted:
+            metrics.increment("llm_cache.evicted", evicted)
+            logger.debug(f"[CACHE] Evicted {evicted} LLM cache entries, {total} bytes left")
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _rendered_input(runnable: Runnable, inputs: Any) -> Any:
+    """
+    Returns the messages a call sends to the model: chains starting with a prompt are
+    rendered, message lists are serialized as they are.
+    """
+    if isinstance(runnable, RunnableSequence) and isinstance(runnable.first, BasePromptTemplate):
+        return messages_to_dict(runnable.first.invoke(inputs).to_messages())
+    if isinstance(inputs, list) and all(isinstance(message, BaseMessage) for message in inputs):
+        return messages_to_dict(inputs)
+    return inputs
+
+
+_cache: Optional[LLMCache] = None
+
+
+def get_llm_cache() -> LLMCache:
+    """
+    Returns the process-wide LLM cache built from the configured constants.
+    """
+    global _cache
+    if _cache is None:
+        _cache = LLMCache()
+        if _cache.enabled:
+            logger.info(f"[CACHE] LLM cache in {_cache.mode} mode at {_cache.directory}")
+    return _cache
@@ -0,0 +1,235 @@
+import asyncio
+import time
+import weakref
+from typing import Any, AsyncIterator, Optional
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable, RunnableBinding, RunnableSequence
+
+from constants import (
+    LLM_MAX_IN_FLIGHT,
+    LLM_MAX_CONNECTIONS,
+    LLM_MAX_KEEPALIVE_CONNECTIONS,
+    LLM_TIMEOUT,
+)
+from llm_cache import CacheMissError, get_llm_cache
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+_http_async_client: Optional[httpx.AsyncClient] = None
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+class _LoopLocalTransport(httpx.AsyncBaseTransport):
+    """
+    Sends each request through a connection pool of the running event loop.
+
+    Pooled connections belong to the loop that opened them, and reusing them from
+    another loop fails; with one pool per loop the shared client works from any loop
+    (the AgentLoop thread, each asyncio.run of main.py, tests or notebooks).
+    """
+
+    def __init__(self, limits: httpx.Limits):
+        self._limits = limits
+        self._transports: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncHTTPTransport]" = weakref.WeakKeyDictionary()
+
+    def _transport(self) -> httpx.AsyncHTTPTransport:
+        loop = asyncio.get_running_loop()
+        transport = self._transports.get(loop)
+        if transport is None:
+            transport = self._transports[loop] = httpx.AsyncHTTPTransport(limits=self._limits)
+            metrics.increment("llm.http_pools")
+        return transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await self._transport().handle_async_request(request)
+
+    async def aclose(self):
+        transport = self._transports.pop(asyncio.get_running_loop(), None)
+        if transport is not None:
+            await transport.aclose()
+
+
+def get_http_async_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide HTTP client shared by all async model calls.
+
+    Connections are pooled per event loop, each pool within the configured limits.
+
+    Returns:
+        httpx.AsyncClient: The shared client.
+    """
+    global _http_async_client
+    if _http_async_client is None:
+        _http_async_client = httpx.AsyncClient(
+            transport=_LoopLocalTransport(httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+            )),
+            timeout=LLM_TIMEOUT,
+        )
+    return _http_async_client
+
+
+def _limiter() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _limiters.get(loop)
+    if semaphore is None:
+        semaphore = _limiters[loop] = asyncio.Semaphore(LLM_MAX_IN_FLIGHT)
+    return semaphore
+
+
+async def _acquire(name: str) -> asyncio.Semaphore:
+    semaphore = _limiter()
+    wait_start = time.perf_counter()
+    await semaphore.acquire()
+    metrics.observe("llm.queue_wait", time.perf_counter() - wait_start)
+    metrics.increment(f"llm.{name}.calls")
+    return semaphore
+
+
+class _UsageRecorder(BaseCallbackHandler):
+    """
+    Records the token usage reported by each model call of a chain.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        input_tokens, output_tokens = usage.get("prompt_tokens"), usage.get("completion_tokens")
+        if input_tokens is None:
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if metadata:
+                        input_tokens, output_tokens = metadata["input_tokens"], metadata["output_tokens"]
+        if input_tokens is not None:
+            metrics.observe(f"llm.{self.name}.input_tokens", input_tokens)
+            metrics.observe(f"llm.{self.name}.output_tokens", output_tokens or 0)
+
+
+def _model_name(runnable: Runnable) -> str:
+    steps = runnable.steps if isinstance(runnable, RunnableSequence) else [runnable]
+    for step in steps:
+        while isinstance(step, RunnableBinding):
+            step = step.bound
+        name = getattr(step, "deployment_name", None) or getattr(step, "model_name", None)
+        if name:
+            return name
+    return ""
+
+
+async def _cache_lookup(name: str, runnable: Runnable, inputs: Any):
+    """
+    Returns (key, hit, value) for a call; key is None when the cache is off. The
+    entry is read off the event loop.
+    """
+    cache = get_llm_cache()
+    if not cache.enabled:
+        return None, False, None
+    key = cache.key(name, runnable, inputs, _model_name(runnable))
+    hit, value = await asyncio.to_thread(cache.get, key)
+    if not hit and cache.mode == "replay":
+        raise CacheMissError(f"No recorded response for '{name}' call {key[:12]}")
+    return key, hit, value
+
+
+async def ainvoke(name: str, runnable: Runnable, inputs: Any) -> Any:
+    """
+    Invokes a chain or model asynchronously under the process-wide in-flight limit.
+
+    Responses are served from and recorded to the LLM cache according to its mode.
+    Token usage reported by the model is recorded per call name.
+
+    Args:
+        name (str): Call name used in metrics (e.g. "main", "insights").
+        runnable (Runnable): Chain or chat model to invoke.
+        inputs (Any): Input of the runnable.
+
+    Returns:
+        Any: The runnable's output.
+    """
+    key, hit, value = await _cache_lookup(name, runnable, inputs)
+    if hit:
+        return value
+
+    semaphore = await _acquire(name)
+    call_start = time.perf_counter()
+    try:
+        value = await runnable.ainvoke(inputs, config={"callbacks": [_UsageRecorder(name)]})
+        if key:
+            await asyncio.to_thread(get_llm_cache().put, key, value)
+        return value
+    except Exception:
+        metrics.increment(f"llm.{name}.errors")
+        raise
+    finally:
+        semaphore.release()
+        metrics.observe(f"llm.{name}.model_time", time.perf_counter() - call_start)
+
+
+async def astream(name: str, runnable: Runnable, inputs: Any) -> AsyncIterator[Any]:
+    """
+    Streams a chain or model under the process-wide in-flight limit.
+
+    Records the time to the first chunk as well as the total model time. Cached
+    responses are replayed as a single chunk holding the final output, so this is only
+    suitable for runnables whose chunks are cumulative (e.g. JSON output parsers).
+
+    Args:
+        name (str): Call name used in metrics.
+        runnable (Runnable): Chain or chat model to stream.
+        inputs (Any): Input of the runnable.
+
+    Yields:
+        Any: The chunks produced by the runnable.
+    """
+    key, hit, value = await _cache_lookup(name, runnable, inputs)
+    if hit:
+        yield value
+        return
+
+    semaphore = await _acquire(name)
+    call_start = time.perf_counter()
+    first_chunk = True
+    chunk = None
+    try:
+        async for chunk in runnable.astream(inputs, config={"callbacks": [_UsageRecorder(name)]}):
+            if first_chunk:
+                metrics.observe(f"llm.{name}.first_chunk", time.perf_counter() - call_start)
+                first_chunk = False
+            yield chunk
+        if key and chunk is not None:
+            await asyncio.to_thread(get_llm_cache().put, key, chunk)
+    except Exception:
+        metrics.increment(f"llm.{name}.errors")
+        raise
+    finally:
+        semaphore.release()
+        metrics.observe(f"llm.{name}.model_time", time.perf_counter() - call_start)
+
+
+def in_flight_stats() -> dict:
+    """
+    Reports the in-flight limit and the queue-wait and model-time distributions.
+
+    Returns:
+        dict: Model call statistics.
+    """
+    snapshot = metrics.snapshot()
+    return {
+        "max_in_flight": LLM_MAX_IN_FLIGHT,
+        "queue_wait": snapshot["timings"].get("llm.queue_wait"),
+        "model_time": {
+            name[len("llm."):-len(".model_time")]: timing
+            for name, timing in snapshot["timings"].items()
+            if name.startswith("llm.") and name.endswith(".model_time")
+        },
+    }
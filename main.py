@@ -1,33 +1,36 @@
 import asyncio
-from typing import Any
+from typing import Any, Optional
 from langchain_core.messages import HumanMessage
-from playwright.async_api import async_playwright
 from langgraph.errors import GraphRecursionError
-import os, sys, uuid
-from graph import VisionGraph
-from constants import GRAPH_RECURSION_LIMIT
+import sys, uuid
+from runtime import get_runtime
+from constants import GRAPH_RECURSION_LIMIT, OBSERVATION_MODE, SEARCH_FAST_PATH
 import time
-from playwright.async_api import Error
-from shared_state import get_response
+from browser_pool import BrowserPool
+from state import RunResult
+from search import search, should_search
+from metrics import get_metrics
 
 
-BROWSER_TYPE = "chromium"  # Experiment with "chromium" or "firefox"
-HEADLESS_MODE = True  # Use headless for faster execution
+from logger import get_logger
 
+logger = get_logger()
+metrics = get_metrics()
 
 
-from logger import get_logger
+def create_browser_pool(**kwargs) -> BrowserPool:
+    """
+    Creates a browser pool whose contexts have the marking script pre-registered.
 
-logger = get_logger()
+    Args:
+        **kwargs: Overrides for the BrowserPool configuration.
 
-current_dir = os.getcwd()
+    Returns:
+        BrowserPool: The (not yet started) browser pool.
+    """
+    return BrowserPool(init_scripts=[get_runtime().mark_page_script], **kwargs)
 
-# Build the path to the mark_page.js script
-script_path = os.path.join(current_dir, "mark_page.js")
 
-# Open and read the script
-with open(script_path) as f:
-    mark_page_script = f.read()
 class WebVision:
     """
     WebVision class for managing Playwright sessions and executing tasks using a vision graph.
@@ -37,11 +40,16 @@ class WebVision:
         customer_id (str): Customer identifier.
         session_dao (Any): Session data access object.
         nonce (str): Unique identifier for the execution run.
-        graph (VisionGraph): Compiled vision graph for processing tasks.
+        graph (CompiledGraph): Compiled vision graph, shared by all runs of the process.
         answer (Any): The final answer obtained from executing the task.
+        result (RunResult): Result object of the most recent run.
+        browser_pool (Optional[BrowserPool]): Shared pool the run checks its page out of.
+        observation_mode (str): "vision" (labeled screenshots) or "text" (page outlines,
+            falling back to screenshots when an outline is insufficient).
     """
     
-    def __init__(self, session_id: str, customer_id: str, session_dao: Any, push_update: Any):
+    def __init__(self, session_id: str, customer_id: str, session_dao: Any, push_update: Any,
+                 browser_pool: Optional[BrowserPool] = None, observation_mode: Optional[str] = None):
         """
         Initializes the WebVision instance.
 
@@ -50,17 +58,26 @@ class WebVision:
             customer_id (str): Unique customer identifier.
             session_dao (Any): Data access object for managing session data.
             push_update (Any): Mechanism to push updates.
+            browser_pool (Optional[BrowserPool]): Shared browser pool. When omitted, the run
+                launches a private single-browser pool and closes it afterwards.
+            observation_mode (Optional[str]): "vision" or "text"; defaults to OBSERVATION_MODE.
         """
         start_time = time.perf_counter()
         logger.debug("[INIT] Initializing WebVision")
         
         try:
-            self.graph = VisionGraph().compile_graph()
+            # Compiled once per process and shared by every run
+            self.graph = get_runtime().graph
             self.answer = None
+            self.result = None
             self.session_id = session_id
             self.nonce = uuid.uuid4().hex  # Unique identifier for this run
             self.session_dao = session_dao
             self.push_update = push_update
+            self.browser_pool = browser_pool
+            self.observation_mode = observation_mode or OBSERVATION_MODE
+            if self.observation_mode not in ("vision", "text"):
+                raise ValueError(f"Unknown observation mode: {self.observation_mode}")
         except Exception as e:
             logger.error(f"[INIT] Error during initialization: {e}", exc_info=True)
             raise
@@ -68,12 +85,13 @@ class WebVision:
         end_time = time.perf_counter()
         logger.debug(f"[INIT] WebVision initialized in {end_time - start_time:.4f} seconds")
 
-    async def __run(self, task: str):
+    async def __run(self, task: str, result: RunResult):
         """
         Executes the given task using the compiled vision graph.
 
         Args:
             task (str): The task description to be processed.
+            result (RunResult): Result object of this run, filled in from the final graph state.
         """
         logger.debug(f"[TASK] Starting __run for task: {task}")
         task_start_time = time.perf_counter()
@@ -85,103 +103,125 @@ class WebVision:
             "session_dao": self.session_dao,
             "push_update": self.push_update,
             "steps": 1,
+            "observation_mode": self.observation_mode,
         }
-        
+
+        if SEARCH_FAST_PATH and should_search(task):
+            inputs["search"] = await self.__search_first(task, result)
+
+        cur_state = None
         try:
-            cur_state = None
+            step_start = time.perf_counter()
             async for output in self.graph.with_config(
                 {"run_name": "LLM with Tools", "recursion_limit": GRAPH_RECURSION_LIMIT}
             ).astream(inputs):
-                step_time = time.perf_counter()
+                step_time = time.perf_counter() - step_start
                 for key, value in output.items():
                     truncated_value = str(value)[:500] + '...' if len(str(value)) > 500 else str(value)
                     logger.debug(f"[GRAPH] Output from node '{key}' (truncated): {truncated_value}")
+                    metrics.observe(f"graph.{key}", step_time)
                     cur_state = value
-                logger.debug(f"[GRAPH] Step execution time: {time.perf_counter() - step_time:.4f} seconds")
+                logger.debug(f"[GRAPH] Step execution time: {step_time:.4f} seconds")
+                step_start = time.perf_counter()
             
             logger.debug("[GRAPH] Graph execution completed")
-            self.answer = cur_state.get("answer")
             
         except GraphRecursionError:
             logger.error("[ERROR] Graph recursion depth reached, terminating execution")
             if cur_state:
                 logger.error(f"[HISTORY] History till now: {cur_state.get('history')}")
-            
-            recursion_fix_time = time.perf_counter()
-            cur_state = self.graph.run_step("answer_node")
-            logger.debug(f"[RECOVERY] Recursion fix execution time: {time.perf_counter() - recursion_fix_time:.4f} seconds")
-            
-            self.answer = cur_state.get("answer")
+            result.errors = "Graph recursion depth reached before an answer was produced"
             
         except Exception as e:
             logger.error(f"[ERROR] Unexpected error in agent graph: {e}", exc_info=True)
-            self.answer = None
+            result.errors = f"Unexpected error in agent graph: {e}"
+
+        if cur_state:
+            result.answer = cur_state.get("answer")
+            result.errors = cur_state.get("errors") or result.errors
+            result.steps = cur_state.get("steps", 0)
+            result.visited_websites = cur_state.get("VISITED_WEBSITES")
+        self.answer = result.answer
             
         task_end_time = time.perf_counter()
+        result.metadata["graph_time"] = task_end_time - task_start_time
+
+        # Run time per path, compared to report the latency saved by direct answers
+        if inputs.get("search"):
+            path = "direct" if cur_state and cur_state.get("direct_answer") else "browse"
+            result.metadata["path"] = path
+            metrics.observe(f"run.{path}", task_end_time - task_start_time + result.metadata.get("search_time", 0))
         logger.debug(f"[TASK] __run execution time: {task_end_time - task_start_time:.4f} seconds")
 
-    async def run(self, task: str):
+    async def __search_first(self, task: str, result: RunResult) -> Optional[dict]:
         """
-        Starts a Playwright session and executes the specified task.
+        Opens the results page for the task before the first graph step and parses it,
+        so the agent starts from structured results instead of typing the query into
+        a search box and submitting it over two steps.
 
         Args:
-            task (str): The task description to be executed.
+            task (str): The task, used as the search query.
+            result (RunResult): Result object of this run; receives the search time.
 
         Returns:
-            Any: The answer obtained from executing the task.
+            Optional[dict]: The parsed results page, or None if the search failed.
         """
-        logger.debug("[SESSION] Starting Playwright session")
-        session_start_time = time.perf_counter()
-        
+        search_start = time.perf_counter()
         try:
-            async with async_playwright() as playwright:
-                browser_start_time = time.perf_counter()
-                
-                # Ensure Playwright initializes correctly
-                if not playwright:
-                    raise RuntimeError("[PLAYWRIGHT] Failed to initialize Playwright.")
+            outcome = await search(self.page, task.strip()[:200])
+            metrics.increment("search.fast_path")
+            return outcome
+        except Exception as e:
+            logger.warning(f"[SEARCH] Search fast path failed, starting from the current page: {e}")
+            metrics.increment("search.fast_path_failed")
+            return None
+        finally:
+            result.metadata["search_time"] = time.perf_counter() - search_start
 
-                # Launch browser with error handling
-                try:
-                    self.browser = await playwright.firefox.launch(headless=False)
-                except Exception as e:
-                    logger.error(f"[BROWSER] Failed to launch Firefox: {e}")
-                    return None
+    async def run(self, task: str) -> RunResult:
+        """
+        Checks out a pre-warmed page from the browser pool and executes the specified task.
 
-                logger.debug(f"[BROWSER] Launch time: {time.perf_counter() - browser_start_time:.4f} seconds")
+        Args:
+            task (str): The task description to be executed.
 
-                self.page = await self.browser.new_page()
+        Returns:
+            RunResult: The answer, errors and metadata of this run.
+        """
+        logger.debug("[SESSION] Starting Playwright session")
+        session_start_time = time.perf_counter()
+        result = RunResult(
+            nonce=self.nonce,
+            task=task,
+            metadata={"session_id": self.session_id, "observation_mode": self.observation_mode},
+        )
 
-                # Inject script before navigation
-                await self.page.add_init_script(mark_page_script)
+        owns_pool = self.browser_pool is None
+        pool = self.browser_pool or create_browser_pool(size=1, warm_contexts=0)
 
-                page_nav_start_time = time.perf_counter()
-                await self.page.goto("https://duckduckgo.com/")
-                # await self.page.goto("https://www.google.com")
-                logger.debug(f"[NAVIGATION] Page navigation time: {time.perf_counter() - page_nav_start_time:.4f} seconds")
+        try:
+            async with pool.checkout() as page:
+                self.page = page
+                result.metadata["page_ready_time"] = time.perf_counter() - session_start_time
+                logger.debug(f"[BROWSER] Page ready after {result.metadata['page_ready_time']:.4f} seconds")
 
                 # Execute the task
-                self.answer = await self.__run(task)
+                await self.__run(task, result)
 
         except Exception as e:
             logger.error(f"[SESSION] Error during Playwright execution: {e}", exc_info=True)
-            self.answer = None
+            result.errors = f"Error during Playwright execution: {e}"
 
         finally:
-            # Ensure browser cleanup
-            if self.browser:
-                try:
-                    await self.browser.close()
-                    logger.debug("[BROWSER] Successfully closed.")
-                except Error as e:
-                    logger.warning(f"[BROWSER] Browser already closed or connection lost: {e}")
-                except Exception as close_error:
-                    logger.warning(f"[BROWSER] Unexpected error while closing: {close_error}", exc_info=True)
+            if owns_pool:
+                await pool.close()
 
             session_end_time = time.perf_counter()
-            logger.debug(f"[SESSION] Total Playwright session time: {session_end_time - session_start_time:.4f} seconds")
+            result.execution_time = session_end_time - session_start_time
+            logger.debug(f"[SESSION] Total Playwright session time: {result.execution_time:.4f} seconds")
 
-        return self.answer
+        self.result = result
+        return result
 
 
 
@@ -196,8 +236,6 @@ if __name__ == "__main__":
     
         )
     )
-    final_response=get_response()
-    logger.debug(f"[MAIN] Result: {final_response}")
-    logger.debug("[MAIN] Starting WebVision execution")
+    logger.debug(f"[MAIN] Result: {result.answer}")
     main_end_time = time.perf_counter()
-    logger.debug(f"[MAIN] Total execution time: {main_end_time - main_start_time:.4f} seconds")
\ No newline at end of file
+    logger.debug(f"[MAIN] Total execution time: {main_end_time - main_start_time:.4f} seconds")
@@ -1,133 +1,549 @@
-const customCSS = `
-    ::-webkit-scrollbar {
-        width: 10px;
+// Idempotent install: the script is registered once per context as an init script and
+// may also be evaluated directly into pages created outside the pool. Bump the version
+// whenever the marking runtime changes so stale copies are replaced.
+(function () {
+    const MARK_PAGE_VERSION = "8";
+    if (window.__webvisionMarkPageVersion === MARK_PAGE_VERSION) return;
+    window.__webvisionMarkPageVersion = MARK_PAGE_VERSION;
+
+    const customCSS = `
+        ::-webkit-scrollbar {
+            width: 10px;
+        }
+        ::-webkit-scrollbar-track {
+            background: #27272a;
+        }
+        ::-webkit-scrollbar-thumb {
+            background: #888;
+            border-radius: 0.375rem;
+        }
+        ::-webkit-scrollbar-thumb:hover {
+            background: #555;
+        }
+    `;
+
+    const styleTag = document.createElement("style");
+    styleTag.textContent = customCSS;
+
+    function appendStyleTag() {
+        if (document.head) {
+            document.head.append(styleTag);
+        } else {
+            console.error("document.head is null, retrying...");
+            setTimeout(appendStyleTag, 100);
+        }
     }
-    ::-webkit-scrollbar-track {
-        background: #27272a;
+
+    if (document.readyState === "loading") {
+        document.addEventListener("DOMContentLoaded", appendStyleTag);
+    } else {
+        appendStyleTag();
     }
-    ::-webkit-scrollbar-thumb {
-        background: #888;
-        border-radius: 0.375rem;
+
+    // Elements that are interactive regardless of styling
+    const interactiveTags = new Set(["INPUT", "TEXTAREA", "SELECT", "BUTTON", "A", "IFRAME", "VIDEO"]);
+    const interactiveSelector = [
+        "summary",
+        "[onclick]",
+        "[role='button']",
+        "[role='link']",
+        "[role='checkbox']",
+        "[role='radio']",
+        "[role='tab']",
+        "[role='menuitem']",
+        "[role='option']",
+        "[role='switch']",
+        "[contenteditable='true']",
+    ].join(",");
+
+    // Subtrees that never render anything worth marking
+    const skippedTags = new Set(["SCRIPT", "STYLE", "NOSCRIPT", "TEMPLATE", "LINK", "META"]);
+
+    // Attribute changes that can change whether or how an element is marked
+    const observedAttributes = [
+        "class", "style", "hidden", "disabled", "role", "onclick", "href",
+        "aria-label", "aria-hidden", "contenteditable", "type", "value",
+    ];
+
+    // Extra screens above/below (and left/right of) the viewport classified per scan,
+    // so small scrolls do not need a new scan
+    const BAND_MARGIN = 1;
+    // Above this many changed subtrees a full rescan is cheaper than incremental work
+    const MAX_DIRTY_ROOTS = 200;
+    const OWN_ATTRIBUTE = "data-webvision-mark";
+
+    let labels = [];
+
+    // Persistent index of interactive elements. Map iteration follows insertion order, which keeps element numbering stable
+    // across steps for elements that did not change.
+    const index = new Map();
+    let covered = null;          // document-coordinate band already classified
+    let lastViewport = null;     // viewport size at the last scan
+    let needsFullScan = true;
+    const dirtyRoots = new Set();
+    let lastStats = null;
+    // Elements of the last markPage() call, in label order
+    let lastElements = [];
+
+    window.unmarkPage=function () {
+        labels.forEach(label => label.remove());
+        labels = [];
+    }
+
+    // Marks are only needed for the screenshot; the agent's next input removes them,
+    // which saves a separate unmark round trip from Python
+    ["pointerdown", "keydown", "wheel"].forEach(type =>
+        window.addEventListener(type, () => labels.length && unmarkPage(), { capture: true, passive: true })
+    );
+
+    function isOwnNode(node) {
+        return node.nodeType === Node.ELEMENT_NODE && node.hasAttribute(OWN_ATTRIBUTE);
     }
-    ::-webkit-scrollbar-thumb:hover {
-        background: #555;
+
+    function markDirty(node) {
+        if (needsFullScan) return;
+        const element = node.nodeType === Node.ELEMENT_NODE ? node : node.parentElement;
+        if (!element || isOwnNode(element)) return;
+        dirtyRoots.add(element);
+        if (dirtyRoots.size > MAX_DIRTY_ROOTS) {
+            needsFullScan = true;
+            dirtyRoots.clear();
+        }
     }
-`;
 
-const styleTag = document.createElement("style");
-styleTag.textContent = customCSS;
+    const observer = new MutationObserver(records => {
+        for (const record of records) {
+            if (record.type === "childList") {
+                const added = [...record.addedNodes].filter(node => !isOwnNode(node));
+                const removed = [...record.removedNodes].filter(node => !isOwnNode(node));
+                added.forEach(markDirty);
+                // Removed elements are dropped lazily (isConnected check); the parent is
+                // re-classified in case its own interactivity depended on them
+                if (removed.length) markDirty(record.target);
+            } else {
+                markDirty(record.target);
+            }
+        }
+    });
+    observer.observe(document, {
+        childList: true,
+        subtree: true,
+        characterData: true,
+        attributes: true,
+        attributeFilter: observedAttributes,
+    });
 
-function appendStyleTag() {
-    if (document.head) {
-        document.head.append(styleTag);
-    } else {
-        console.error("document.head is null, retrying...");
-        setTimeout(appendStyleTag, 100);
+    window.addEventListener("resize", () => { needsFullScan = true; }, { passive: true });
+    // Scrolling the window is handled by the band check; scrolling an inner container
+    // reveals elements that may never have been classified
+    document.addEventListener("scroll", event => {
+        if (event.target !== document && event.target.nodeType === Node.ELEMENT_NODE) markDirty(event.target);
+    }, { capture: true, passive: true });
+
+    function isInteractive(element) {
+        if (interactiveTags.has(element.tagName) || element.onclick) return true;
+        if (element.matches(interactiveSelector)) return true;
+        // Style lookup is the expensive check, so it runs last and only for elements near the viewport
+        return window.getComputedStyle(element).cursor === "pointer";
     }
-}
 
-document.addEventListener("DOMContentLoaded", appendStyleTag);
+    const DEFAULT_MAX_TEXT_CHARS = 200;
+    let maxTextChars = DEFAULT_MAX_TEXT_CHARS;
 
-let labels = [];
+    function foldText(text) {
+        return text.replace(/\s+/g, " ").trim();
+    }
 
-window.unmarkPage=function () {
-    labels.forEach(label => label.remove());
-    labels = [];
-}
+    function capText(text) {
+        return text.length > maxTextChars ? text.slice(0, maxTextChars - 1) + "…" : text;
+    }
 
-window.markPage = function () {
-    unmarkPage();
-    
-    const bodyRect = document.body.getBoundingClientRect();
-    const vw = Math.max(document.documentElement.clientWidth, window.innerWidth);
-    const vh = Math.max(document.documentElement.clientHeight, window.innerHeight);
-    const interactiveTags = new Set(["INPUT", "TEXTAREA", "SELECT", "BUTTON", "A", "IFRAME", "VIDEO"]);
-    
-    let items = Array.from(document.querySelectorAll("*"))
-        .map(element => {
-            const tagName = element.tagName;
-            const rects = [...element.getClientRects()]
-                .filter(bb => {
-                    const centerX = bb.left + bb.width / 2;
-                    const centerY = bb.top + bb.height / 2;
-                    const elAtCenter = document.elementFromPoint(centerX, centerY);
-                    return elAtCenter === element || element.contains(elAtCenter);
-                })
-                .map(bb => ({
-                    left: Math.max(0, bb.left),
-                    top: Math.max(0, bb.top),
-                    width: Math.min(vw, bb.right) - Math.max(0, bb.left),
-                    height: Math.min(vh, bb.bottom) - Math.max(0, bb.top)
-                }))
-                .filter(bb => bb.width * bb.height >= 20);
-
-            if (!rects.length) return null;
-
-            const computedStyle = window.getComputedStyle(element);
-            const isInteractive = interactiveTags.has(tagName) || element.onclick || computedStyle.cursor === "pointer";
-            if (!isInteractive) return null;
+    function isTextVisible(parent) {
+        if (parent.checkVisibility) return parent.checkVisibility({ visibilityProperty: true });
+        return parent.getClientRects().length > 0;
+    }
 
-            return {
-                element,
-                rects,
-                text: element.textContent.trim().replace(/\s{2,}/g, " "),
-                type: tagName.toLowerCase(),
-                ariaLabel: element.getAttribute("aria-label") || ""
+    // Visible text of the subtree, stopping as soon as the cap is reached so large
+    // containers never materialize their full textContent
+    function boundedVisibleText(element) {
+        const walker = document.createTreeWalker(element, NodeFilter.SHOW_TEXT);
+        const parts = [];
+        let length = 0;
+        for (let node = walker.nextNode(); node && length <= maxTextChars; node = walker.nextNode()) {
+            const parent = node.parentElement;
+            if (!parent || skippedTags.has(parent.tagName) || isOwnNode(parent)) continue;
+            const text = foldText(node.nodeValue.slice(0, maxTextChars + 1));
+            if (!text || !isTextVisible(parent)) continue;
+            parts.push(text);
+            length += text.length + 1;
+        }
+        return parts.join(" ");
+    }
+
+    // Short label for an element: its own text first, then the attributes that name
+    // it, and only then the visible text of its descendants
+    function elementText(element) {
+        let own = "";
+        for (const child of element.childNodes) {
+            if (child.nodeType === Node.TEXT_NODE) own += child.nodeValue;
+            if (own.length > maxTextChars) break;
+        }
+        own = foldText(own);
+        if (own) return capText(own);
+
+        for (const attribute of ["aria-label", "title", "alt", "placeholder"]) {
+            const value = element.getAttribute(attribute);
+            if (value && value.trim()) return capText(foldText(value));
+        }
+        if (element.tagName === "INPUT" && element.value && element.type !== "password") {
+            return capText(foldText(element.value));
+        }
+        return capText(boundedVisibleText(element));
+    }
+
+    function describe(element) {
+        return {
+            text: elementText(element),
+            type: element.tagName.toLowerCase(),
+            ariaLabel: capText(foldText(element.getAttribute("aria-label") || ""))
+        };
+    }
+
+    function currentBand(vw, vh) {
+        return {
+            top: window.scrollY - vh * BAND_MARGIN,
+            bottom: window.scrollY + vh * (1 + BAND_MARGIN),
+            left: window.scrollX - vw * BAND_MARGIN,
+            right: window.scrollX + vw * (1 + BAND_MARGIN),
+        };
+    }
+
+    function viewportCovered(vw, vh) {
+        return covered
+            && window.scrollY >= covered.top && window.scrollY + vh <= covered.bottom
+            && window.scrollX >= covered.left && window.scrollX + vw <= covered.right;
+    }
+
+    // Classifies every element of the subtree that lies inside the band, adding new
+    // interactive elements to the index and dropping elements that stopped being interactive.
+    // Elements outside the band are not classified, but their children are still visited
+    // since positioned descendants can be inside it.
+    function scanSubtree(root, band) {
+        let scanned = 0;
+        const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT, {
+            acceptNode: node => skippedTags.has(node.tagName) || isOwnNode(node)
+                ? NodeFilter.FILTER_REJECT
+                : NodeFilter.FILTER_ACCEPT
+        });
+
+        let node = skippedTags.has(root.tagName) || isOwnNode(root) ? null : root;
+        if (!node) return scanned;
+
+        for (; node; node = walker.nextNode()) {
+            const box = node.getBoundingClientRect();
+            const top = box.top + window.scrollY;
+            const left = box.left + window.scrollX;
+            if (top + box.height <= band.top || top >= band.bottom || left + box.width <= band.left || left >= band.right) {
+                continue;
+            }
+
+            scanned++;
+            if (isInteractive(node)) {
+                if (!index.has(node)) index.set(node, true);
+            } else {
+                index.delete(node);
+            }
+        }
+        return scanned;
+    }
+
+    function updateIndex(vw, vh) {
+        const stats = { mode: "incremental", scanned: 0, dirtyRoots: dirtyRoots.size };
+        const resized = !lastViewport || lastViewport.vw !== vw || lastViewport.vh !== vh;
+        const band = currentBand(vw, vh);
+
+        if (needsFullScan || resized) {
+            // Keep existing entries (and so their numbering) for elements that are still
+            // interactive; the scan re-classifies everything inside the band
+            stats.mode = "full";
+            stats.scanned = scanSubtree(document.body, band);
+            covered = band;
+        } else {
+            if (!viewportCovered(vw, vh)) {
+                stats.mode = "viewport";
+                stats.scanned += scanSubtree(document.body, band);
+                const overlaps = covered && band.top <= covered.bottom && band.bottom >= covered.top
+                    && band.left === covered.left && band.right === covered.right;
+                covered = overlaps
+                    ? { ...band, top: Math.min(band.top, covered.top), bottom: Math.max(band.bottom, covered.bottom) }
+                    : band;
+            }
+
+            // Only the outermost connected dirty roots need to be scanned. They are scanned
+            // across the whole covered area, not just the band: dirty roots are cleared
+            // below, and a covered area is not rescanned when it is scrolled back into view
+            const roots = [...dirtyRoots].filter(root =>
+                root.isConnected && ![...dirtyRoots].some(other => other !== root && other.contains(root))
+            );
+            roots.forEach(root => { stats.scanned += scanSubtree(root, covered); });
+        }
+
+        dirtyRoots.clear();
+        needsFullScan = false;
+        lastViewport = { vw, vh };
+        stats.indexed = index.size;
+        return stats;
+    }
+
+    function visibleRects(element, vw, vh) {
+        // Cheap viewport cull before the per-rect hit tests
+        const box = element.getBoundingClientRect();
+        if (box.bottom <= 0 || box.right <= 0 || box.top >= vh || box.left >= vw) return [];
+
+        const rects = [];
+        for (const bb of element.getClientRects()) {
+            const centerX = bb.left + bb.width / 2;
+            const centerY = bb.top + bb.height / 2;
+            const elAtCenter = document.elementFromPoint(centerX, centerY);
+            if (!(elAtCenter === element || element.contains(elAtCenter))) continue;
+
+            const rect = {
+                left: Math.max(0, bb.left),
+                top: Math.max(0, bb.top),
+                width: Math.min(vw, bb.right) - Math.max(0, bb.left),
+                height: Math.min(vh, bb.bottom) - Math.max(0, bb.top)
             };
-        })
-        .filter(Boolean);
+            if (rect.width * rect.height >= 20) rects.push(rect);
+        }
+        return rects;
+    }
 
-    items = items.filter(item => 
-        !items.some(other => other !== item && other.element.contains(item.element))
-    );
+    function collectItems(vw, vh) {
+        // Rects are computed at most once per element; ancestors are looked up through
+        // the same cache, so nested duplicates are removed without comparing item pairs
+        const rectCache = new Map();
+        const rectsOf = element => {
+            if (!rectCache.has(element)) rectCache.set(element, visibleRects(element, vw, vh));
+            return rectCache.get(element);
+        };
+        const hasMarkedAncestor = element => {
+            for (let ancestor = element.parentElement; ancestor; ancestor = ancestor.parentElement) {
+                if (index.has(ancestor) && rectsOf(ancestor).length) return true;
+            }
+            return false;
+        };
 
-    function getRandomColor() {
-        return `#${Math.floor(Math.random() * 16777215).toString(16).padStart(6, "0")}`;
-    }
-
-    items.forEach((item, index) => {
-        const borderColor = getRandomColor();
-
-        item.rects.forEach(({ left, top, width, height }) => {
-            let newElement = document.createElement("div");
-            Object.assign(newElement.style, {
-                outline: `2px dashed ${borderColor}`,
-                position: "fixed",
-                left: `${left}px`,
-                top: `${top}px`,
-                width: `${width}px`,
-                height: `${height}px`,
-                pointerEvents: "none",
-                boxSizing: "border-box",
-                zIndex: 2147483647
-            });
+        const items = [];
+        for (const element of index.keys()) {
+            if (!element.isConnected) {
+                index.delete(element);
+                continue;
+            }
+            const rects = rectsOf(element);
+            if (!rects.length || hasMarkedAncestor(element)) continue;
+            // Described at output time so text edits below an indexed element are picked up
+            items.push({ element, rects, ...describe(element) });
+        }
+        return items;
+    }
+
+    // Derived from the label so that an unchanged page renders identical screenshots
+    // from step to step; the golden angle keeps neighbouring labels distinguishable
+    function getLabelColor(index) {
+        return `hsl(${Math.round((index * 137.508) % 360)}, 85%, 40%)`;
+    }
+
+    function drawLabels(items) {
+        const fragment = document.createDocumentFragment();
 
-            let label = document.createElement("span");
-            label.textContent = index;
-            Object.assign(label.style, {
-                position: "absolute",
-                top: "-19px",
-                left: "0px",
-                background: borderColor,
-                color: "white",
-                padding: "2px 4px",
-                fontSize: "12px",
-                borderRadius: "2px"
+        items.forEach((item, index) => {
+            const borderColor = getLabelColor(index);
+
+            item.rects.forEach(({ left, top, width, height }) => {
+                let newElement = document.createElement("div");
+                newElement.setAttribute(OWN_ATTRIBUTE, "");
+                Object.assign(newElement.style, {
+                    outline: `2px dashed ${borderColor}`,
+                    position: "fixed",
+                    left: `${left}px`,
+                    top: `${top}px`,
+                    width: `${width}px`,
+                    height: `${height}px`,
+                    pointerEvents: "none",
+                    boxSizing: "border-box",
+                    zIndex: 2147483647
+                });
+
+                let label = document.createElement("span");
+                label.textContent = index;
+                Object.assign(label.style, {
+                    position: "absolute",
+                    top: "-19px",
+                    left: "0px",
+                    background: borderColor,
+                    color: "white",
+                    padding: "2px 4px",
+                    fontSize: "12px",
+                    borderRadius: "2px"
+                });
+
+                newElement.appendChild(label);
+                fragment.appendChild(newElement);
+                labels.push(newElement);
             });
+        });
 
-            newElement.appendChild(label);
-            document.body.appendChild(newElement);
-            labels.push(newElement);
+        // Single DOM write after all layout reads are done
+        document.body.appendChild(fragment);
+    }
+
+    // Options: maxTextChars caps the text and aria label shipped per element;
+    // draw: false numbers the elements without drawing labels (text observations)
+    window.markPage = function (options = {}) {
+        unmarkPage();
+        if (!document.body) return [];
+
+        maxTextChars = options.maxTextChars || DEFAULT_MAX_TEXT_CHARS;
+        const started = performance.now();
+        const vw = Math.max(document.documentElement.clientWidth, window.innerWidth);
+        const vh = Math.max(document.documentElement.clientHeight, window.innerHeight);
+
+        // Read phase: index maintenance and all layout queries happen before any DOM writes
+        const stats = updateIndex(vw, vh);
+        const items = collectItems(vw, vh);
+
+        // Write phase
+        if (options.draw !== false) drawLabels(items);
+        lastElements = items.map(item => item.element);
+
+        lastStats = { ...stats, marked: items.length, ms: Math.round(performance.now() - started) };
+
+        // One entry per element, matching the drawn label numbers; every rect of an element
+        // carries the same label, and the largest one is used as its click target
+        return items.map(item => {
+            const { left, top, width, height } = item.rects.reduce((a, b) =>
+                a.width * a.height >= b.width * b.height ? a : b
+            );
+            return {
+                x: left + width / 2,
+                y: top + height / 2,
+                type: item.type,
+                text: item.text,
+                ariaLabel: item.ariaLabel
+            };
         });
-    });
+    };
 
-    return items.flatMap(item =>
-        item.rects.map(({ left, top, width, height }) => ({
-            x: (left + left + width) / 2,
-            y: (top + top + height) / 2,
-            type: item.type,
-            text: item.text,
-            ariaLabel: item.ariaLabel
-        }))
-    );
-};
\ No newline at end of file
+    // Advances the walker past the subtree of its current node
+    function nextOutsideSubtree(walker) {
+        let node = walker.currentNode;
+        while (node) {
+            const sibling = walker.nextSibling();
+            if (sibling) return sibling;
+            node = walker.parentNode();
+        }
+        return null;
+    }
+
+    const HEADING_TAGS = new Set(["H1", "H2", "H3", "H4", "H5", "H6"]);
+    const BLOCK_TAGS = new Set([
+        "P", "DIV", "LI", "UL", "OL", "TR", "TD", "TH", "TABLE", "SECTION", "ARTICLE", "HEADER",
+        "FOOTER", "NAV", "MAIN", "ASIDE", "FORM", "FIELDSET", "BLOCKQUOTE", "PRE", "DL", "DT", "DD",
+        "FIGURE", "FIGCAPTION", "BR", "HR",
+    ]);
+
+    // Text outline of the visible part of the page for text-only observations. Elements
+    // numbered by the last markPage() call appear as "[id] type: label" and their subtree
+    // is not repeated, also inside headings; headings, visible text blocks and image alt
+    // texts are kept in document order. The result is cut at maxChars.
+    window.outlinePage = function (options = {}) {
+        if (!document.body) return "";
+        const maxChars = options.maxChars || 6000;
+        const vw = Math.max(document.documentElement.clientWidth, window.innerWidth);
+        const vh = Math.max(document.documentElement.clientHeight, window.innerHeight);
+        const ids = new Map(lastElements.map((element, id) => [element, id]));
+        const inViewport = new Map();
+        const isInViewport = element => {
+            if (!inViewport.has(element)) {
+                const box = element.getBoundingClientRect();
+                inViewport.set(element, box.width > 0 && box.height > 0
+                    && box.bottom > 0 && box.right > 0 && box.top < vh && box.left < vw);
+            }
+            return inViewport.get(element);
+        };
+
+        const lines = [];
+        let length = 0;
+        let buffer = [];
+        const push = line => {
+            if (line && length < maxChars) {
+                lines.push(line);
+                length += line.length + 1;
+            }
+        };
+        const flush = () => {
+            push(foldText(buffer.join(" ")));
+            buffer = [];
+        };
+
+        const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT, {
+            acceptNode: node => node.nodeType === Node.ELEMENT_NODE
+                && (skippedTags.has(node.tagName) || isOwnNode(node))
+                ? NodeFilter.FILTER_REJECT
+                : NodeFilter.FILTER_ACCEPT
+        });
+
+        let node = walker.nextNode();
+        while (node && length < maxChars) {
+            if (node.nodeType === Node.TEXT_NODE) {
+                const parent = node.parentElement;
+                if (parent && node.nodeValue.trim() && isInViewport(parent) && isTextVisible(parent)) {
+                    buffer.push(node.nodeValue);
+                }
+                node = walker.nextNode();
+                continue;
+            }
+
+            if (ids.has(node)) {
+                flush();
+                const { type, text } = describe(node);
+                push(`[${ids.get(node)}] ${type}: ${text}`);
+                node = nextOutsideSubtree(walker);
+                continue;
+            }
+            if (HEADING_TAGS.has(node.tagName)) {
+                flush();
+                const heading = node;
+                if (isInViewport(heading)) push(`${"#".repeat(Number(heading.tagName[1]))} ${capText(boundedVisibleText(heading))}`);
+                // The heading line carries its text; numbered elements inside it (e.g. the
+                // title links of search results) still get their own rows to act on
+                node = walker.nextNode();
+                while (node && heading.contains(node)) {
+                    if (node.nodeType === Node.ELEMENT_NODE && ids.has(node)) {
+                        const { type, text } = describe(node);
+                        push(`[${ids.get(node)}] ${type}: ${text}`);
+                        node = nextOutsideSubtree(walker);
+                    } else {
+                        node = walker.nextNode();
+                    }
+                }
+                continue;
+            }
+            if (node.tagName === "IMG" && node.alt && isInViewport(node)) {
+                buffer.push(`[image: ${capText(foldText(node.alt))}]`);
+            } else if (BLOCK_TAGS.has(node.tagName)) {
+                flush();
+            }
+            node = walker.nextNode();
+        }
+        flush();
+
+        const outline = lines.join("\n");
+        return outline.length > maxChars ? outline.slice(0, maxChars - 1) + "…" : outline;
+    };
+
+    // Statistics of the last markPage() call (scan mode, elements scanned, index size)
+    window.markPageStats = function () {
+        return lastStats;
+    };
+})();
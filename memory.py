@@ -0,0 +1,153 @@
+from typing import Awaitable, Callable, Dict, List, Optional, TypedDict
+
+from constants import CHARS_PER_TOKEN, MEMORY_TOKEN_BUDGETS, MEMORY_RECENT_ENTRIES
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+# Separators between entries, as they appeared in the unbounded state strings
+SEPARATORS = {
+    "history": "\n",
+    "thoughts": "\n\n----- Final Thought from Main Chain -----\n\n",
+    "insights": "\n\n===== Next Insight =====\n\n",
+}
+
+SUMMARY_HEADERS = {
+    "history": "Earlier actions (summary): ",
+    "thoughts": "Earlier thoughts (summary): ",
+    "insights": "Earlier insights (summary): ",
+}
+
+# Summarizes (field, current summary, entries to fold, max words) into a new summary
+Summarizer = Callable[[str, str, List[str], int], Awaitable[str]]
+
+
+class MemoryField(TypedDict):
+    """
+    Bounded memory of one state field.
+
+    Attributes:
+        summary (str): Summary of all entries folded so far.
+        entries (List[str]): Recent entries, kept verbatim.
+        folded (int): Number of entries folded into the summary.
+    """
+    summary: str
+    entries: List[str]
+    folded: int
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def _field(state, field: str) -> MemoryField:
+    memory = state.get("memory")
+    if memory is None:
+        memory = state["memory"] = {}
+    if field not in memory:
+        memory[field] = {"summary": "", "entries": [], "folded": 0}
+    return memory[field]
+
+
+def render_memory(state, field: str) -> str:
+    """
+    Renders a memory field as the text sent to the model: the summary of older
+    entries followed by the recent entries verbatim.
+
+    Args:
+        state (AgentState): The current agent state.
+        field (str): "history", "thoughts" or "insights".
+
+    Returns:
+        str: The rendered field.
+    """
+    memory = _field(state, field)
+    parts = []
+    if memory["summary"]:
+        parts.append(SUMMARY_HEADERS[field] + memory["summary"])
+    parts.extend(memory["entries"])
+    return SEPARATORS[field].join(parts)
+
+
+def remember(state, field: str, content: str):
+    """
+    Appends an entry to a memory field and refreshes the rendered state field.
+
+    Only content is stored: callers pass message text, not message reprs.
+
+    Args:
+        state (AgentState): The current agent state.
+        field (str): "history", "thoughts" or "insights".
+        content (str): The entry.
+    """
+    content = (content or "").strip()
+    if not content:
+        return
+    _field(state, field)["entries"].append(content)
+    state[field] = render_memory(state, field)
+
+
+def _over_budget(state, field: str, budgets: Dict[str, int]) -> bool:
+    return estimate_tokens(render_memory(state, field)) > budgets.get(field, 0) > 0
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    return text if len(text) <= max_chars else text[: max_chars - 1].rstrip() + "…"
+
+
+async def compact_memory(
+    state,
+    summarize: Optional[Summarizer],
+    budgets: Dict[str, int] = MEMORY_TOKEN_BUDGETS,
+    recent: int = MEMORY_RECENT_ENTRIES,
+):
+    """
+    Keeps every memory field within its token budget.
+
+    When a field is over budget, all but the `recent` newest entries are folded into
+    its summary with one `summarize` call. Folding targets half the budget, so a field
+    is summarized every few steps rather than on every step. If the recent entries
+    alone do not fit, the oldest of them are truncated. Without a summarizer, or if it
+    fails, folded entries are truncated into the summary instead.
+
+    Args:
+        state (AgentState): The current agent state.
+        summarize (Optional[Summarizer]): Model-backed summarizer.
+        budgets (Dict[str, int]): Approximate token budget per field.
+        recent (int): Number of newest entries always kept verbatim.
+    """
+    for field, budget in budgets.items():
+        if not _over_budget(state, field, budgets):
+            continue
+
+        memory = _field(state, field)
+        to_fold = memory["entries"][:-recent] if recent else list(memory["entries"])
+        if to_fold:
+            memory["entries"] = memory["entries"][len(to_fold):]
+            max_words = max(20, budget * CHARS_PER_TOKEN // 2 // 6)
+            summary = None
+            if summarize:
+                try:
+                    summary = await summarize(field, memory["summary"], to_fold, max_words)
+                    metrics.increment(f"memory.{field}.summarized")
+                except Exception as e:
+                    logger.warning(f"[MEMORY] Could not summarize {field}, truncating instead: {e}")
+            if not summary:
+                summary = " ".join(filter(None, [memory["summary"], *to_fold]))
+            memory["summary"] = _truncate(" ".join(summary.split()), budget // 2)
+            memory["folded"] += len(to_fold)
+            logger.debug(f"[MEMORY] Folded {len(to_fold)} {field} entries into the summary")
+
+        # Recent entries alone can still exceed the budget (e.g. one very long insight)
+        index = 0
+        while _over_budget(state, field, budgets) and index < len(memory["entries"]):
+            overhead = estimate_tokens(SUMMARY_HEADERS[field] + memory["summary"] + SEPARATORS[field] * len(memory["entries"]))
+            share = max(1, (budget - overhead) // len(memory["entries"]))
+            memory["entries"][index] = _truncate(memory["entries"][index], share)
+            index += 1
+
+        state[field] = render_memory(state, field)
+        metrics.observe(f"memory.{field}.tokens", estimate_tokens(state[field]))
@@ -0,0 +1,87 @@
+import threading
+from collections import defaultdict, deque
+from typing import Dict
+
+
+# Number of recent observations kept per metric for percentile estimates
+WINDOW_SIZE = 1000
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry for timings and counters.
+
+    Observations are kept in a bounded window per metric name so that
+    percentiles reflect recent behaviour without unbounded memory growth.
+    """
+
+    def __init__(self, window_size: int = WINDOW_SIZE):
+        self._lock = threading.Lock()
+        self._window_size = window_size
+        self._observations = defaultdict(lambda: deque(maxlen=self._window_size))
+        self._totals: Dict[str, float] = defaultdict(float)
+        self._counts: Dict[str, int] = defaultdict(int)
+        self._counters: Dict[str, int] = defaultdict(int)
+
+    def observe(self, name: str, value: float):
+        """
+        Records a single observation (typically a duration in seconds).
+
+        Args:
+            name (str): Metric name.
+            value (float): Observed value.
+        """
+        with self._lock:
+            self._observations[name].append(value)
+            self._totals[name] += value
+            self._counts[name] += 1
+
+    def increment(self, name: str, amount: int = 1):
+        """
+        Increments a counter.
+
+        Args:
+            name (str): Counter name.
+            amount (int): Amount to add.
+        """
+        with self._lock:
+            self._counters[name] += amount
+
+    def snapshot(self) -> dict:
+        """
+        Returns a JSON-serializable summary of all metrics.
+
+        Returns:
+            dict: Counters and per-metric count/mean/p50/p95/max.
+        """
+        with self._lock:
+            timings = {}
+            for name, window in self._observations.items():
+                values = sorted(window)
+                if not values:
+                    continue
+                timings[name] = {
+                    "count": self._counts[name],
+                    "mean": round(self._totals[name] / self._counts[name], 4),
+                    "p50": round(values[len(values) // 2], 4),
+                    "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 4),
+                    "max": round(values[-1], 4),
+                }
+            return {"counters": dict(self._counters), "timings": timings}
+
+    def reset(self):
+        """
+        Clears all recorded metrics.
+        """
+        with self._lock:
+            self._observations.clear()
+            self._totals.clear()
+            self._counts.clear()
+            self._counters.clear()
+
+
+metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return metrics
@@ -0,0 +1,271 @@
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, TypedDict
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.runnables import Runnable
+
+from constants import MODEL_DEPLOYMENTS, MODEL_ESCALATION_TIER, MODEL_ROUTES
+from llm_cache import CacheMissError
+from llm_runtime import ainvoke, astream
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+
+class ModelRoute(TypedDict):
+    """
+    Model settings of a node role.
+
+    Attributes:
+        tier (str): Model tier ("large" or "small").
+        max_tokens (int): Maximum output tokens.
+        timeout (float): Request timeout in seconds.
+    """
+    tier: str
+    max_tokens: int
+    timeout: float
+
+
+# Returns why an output is invalid, or None if it is valid
+Validator = Callable[[Any], Optional[str]]
+
+
+def valid_text(output: Any) -> Optional[str]:
+    """
+    Validates a plain text response (insights, summaries).
+    """
+    if not output or not str(getattr(output, "content", "")).strip():
+        return "empty response"
+    return None
+
+
+def valid_tool_calls(tools: Iterable[str], required: bool = False) -> Validator:
+    """
+    Builds a validator for responses of tool-calling chains.
+
+    Args:
+        tools (Iterable[str]): Names of the tools bound to the chain.
+        required (bool): Whether the response must call at least one tool.
+
+    Returns:
+        Validator: The validator.
+    """
+    allowed = set(tools)
+
+    def validate(output: Any) -> Optional[str]:
+        if output is None:
+            return "empty response"
+        if getattr(output, "invalid_tool_calls", None):
+            return f"malformed tool call: {output.invalid_tool_calls[0].get('name')}"
+        calls = getattr(output, "tool_calls", None) or []
+        unknown = [call["name"] for call in calls if call["name"] not in allowed]
+        if unknown:
+            return f"unknown tool: {unknown[0]}"
+        if required and not calls:
+            return "no tool call"
+        return None
+
+    return validate
+
+
+def valid_answer(output: Any) -> Optional[str]:
+    """
+    Validates the parsed `Response` of the answer chain.
+    """
+    if not isinstance(output, dict) or not str(output.get("final_answer") or "").strip():
+        return "missing final answer"
+    return None
+
+
+def valid_preflight(output: Any) -> Optional[str]:
+    """
+    Validates the parsed `Preflight` decision.
+    """
+    if not isinstance(output, dict) or not isinstance(output.get("answerable"), bool):
+        return "missing decision"
+    return None
+
+
+class ModelRouter:
+    """
+    Assigns a model tier, max output tokens and timeout to each node role.
+
+    Light roles can run on a small, fast deployment; when its output fails the role's
+    validation (or the call fails), the call is retried once on the escalation tier.
+
+    Attributes:
+        routes (Dict[str, ModelRoute]): Settings per role.
+        escalation_tier (str): Tier used to retry invalid outputs.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[str], BaseChatModel],
+        routes: Dict[str, ModelRoute] = MODEL_ROUTES,
+        deployments: Dict[str, str] = MODEL_DEPLOYMENTS,
+        escalation_tier: str = MODEL_ESCALATION_TIER,
+    ):
+        self.routes = routes
+        self.escalation_tier = escalation_tier
+        self._factory = factory
+        self._deployments = deployments
+        self._models: Dict[str, BaseChatModel] = {}
+
+    def route(self, role: str) -> ModelRoute:
+        return self.routes.get(role) or self.routes["main"]
+
+    def model(self, tier: str) -> BaseChatModel:
+        """
+        Returns the chat model of a tier; tiers sharing a deployment share the model.
+        """
+        deployment = self._deployments.get(tier) or self._deployments[self.escalation_tier]
+        if deployment not in self._models:
+            self._models[deployment] = self._factory(deployment)
+        return self._models[deployment]
+
+    def use_model(self, chat_model: BaseChatModel):
+        """
+        Serves every tier with one chat model, e.g. a scripted stub model for offline benchmarks.
+        """
+        self._factory = lambda deployment: chat_model
+        self._models = {}
+
+    def bind(
+        self,
+        role: str,
+        tools: Optional[List[Any]] = None,
+        tool_choice: Optional[str] = None,
+        tier: Optional[str] = None,
+    ) -> Runnable:
+        """
+        Returns the model of a role, with its tools and output limits bound.
+
+        Args:
+            role (str): Node role (e.g. "main", "insights").
+            tools (Optional[List[Any]]): Tools to bind.
+            tool_choice (Optional[str]): Tool the model must call.
+            tier (Optional[str]): Tier overriding the role's configured tier.
+
+        Returns:
+            Runnable: The bound model.
+        """
+        route = self.route(role)
+        model = self.model(tier or route["tier"])
+        runnable = model.bind_tools(tools, tool_choice=tool_choice) if tools else model
+        return runnable.bind(max_tokens=route["max_tokens"], timeout=route["timeout"])
+
+    def escalates(self, role: str) -> bool:
+        route = self.route(role)
+        return self._deployments.get(route["tier"]) != self._deployments.get(self.escalation_tier)
+
+    async def invoke(
+        self,
+        role: str,
+        build: Callable[[Optional[str]], Runnable],
+        inputs: Any,
+        validate: Optional[Validator] = None,
+    ) -> Any:
+        """
+        Invokes the chain of a role, escalating to the large tier on invalid output.
+
+        Args:
+            role (str): Node role; also the call name in metrics.
+            build (Callable[[Optional[str]], Runnable]): Builds the role's chain for a
+                tier (None selects the configured tier).
+            inputs (Any): Input of the chain.
+            validate (Optional[Validator]): Validation of the output.
+
+        Returns:
+            Any: The chain's output; an invalid output is returned as is when the role
+                does not escalate, leaving its handling to the node.
+        """
+        tier = self.route(role)["tier"]
+        metrics.increment(f"llm.{role}.tier.{tier}")
+        try:
+            output = await ainvoke(role, build(None), inputs)
+            reason = validate(output) if validate else None
+        except CacheMissError:
+            raise
+        except Exception as e:
+            if not self.escalates(role):
+                raise
+            output, reason = None, f"{type(e).__name__}: {e}"
+
+        if reason is None:
+            return output
+        if not self.escalates(role):
+            logger.warning(f"[ROUTER] Invalid {role} output: {reason}")
+            metrics.increment(f"llm.{role}.invalid")
+            return output
+        return await self.escalate(role, build, inputs, validate, reason)
+
+    async def escalate(
+        self,
+        role: str,
+        build: Callable[[Optional[str]], Runnable],
+        inputs: Any,
+        validate: Optional[Validator],
+        reason: str,
+    ) -> Any:
+        """
+        Retries a call whose output was invalid on the escalation tier.
+
+        Args:
+            role (str): Node role.
+            build (Callable[[Optional[str]], Runnable]): Builds the role's chain for a tier.
+            inputs (Any): Input of the chain.
+            validate (Optional[Validator]): Validation of the output.
+            reason (str): Why the first output was invalid.
+
+        Returns:
+            Any: The escalated chain's output, even if it is still invalid.
+        """
+        logger.info(f"[ROUTER] Escalating {role} from {self.route(role)['tier']} to {self.escalation_tier}: {reason}")
+        metrics.increment(f"llm.{role}.escalations")
+        metrics.increment(f"llm.{role}.tier.{self.escalation_tier}")
+        output = await ainvoke(role, build(self.escalation_tier), inputs)
+        reason = validate(output) if validate else None
+        if reason:
+            logger.warning(f"[ROUTER] Invalid {role} output after escalation: {reason}")
+            metrics.increment(f"llm.{role}.invalid")
+        return output
+
+    async def stream(self, role: str, build: Callable[[Optional[str]], Runnable], inputs: Any) -> AsyncIterator[Any]:
+        """
+        Streams the chain of a role on its configured tier. Streamed output is not
+        escalated; callers validate the final chunk and call `escalate` if needed.
+        """
+        metrics.increment(f"llm.{role}.tier.{self.route(role)['tier']}")
+        async for chunk in astream(role, build(None), inputs):
+            yield chunk
+
+    def stats(self) -> dict:
+        """
+        Reports, per role, its route, calls per tier, escalations, latency and tokens.
+
+        Returns:
+            dict: Routing statistics.
+        """
+        snapshot = metrics.snapshot()
+        counters, timings = snapshot["counters"], snapshot["timings"]
+        report = {}
+        for role, route in self.routes.items():
+            prefix = f"llm.{role}."
+            report[role] = {
+                **route,
+                "deployment": self._deployments.get(route["tier"]),
+                "calls": counters.get(prefix + "calls", 0),
+                "tiers": {
+                    name[len(prefix + "tier."):]: count
+                    for name, count in counters.items()
+                    if name.startswith(prefix + "tier.")
+                },
+                "escalations": counters.get(prefix + "escalations", 0),
+                "invalid": counters.get(prefix + "invalid", 0),
+                "errors": counters.get(prefix + "errors", 0),
+                "model_time": timings.get(prefix + "model_time"),
+                "input_tokens": timings.get(prefix + "input_tokens"),
+                "output_tokens": timings.get(prefix + "output_tokens"),
+            }
+        return report
@@ -2,32 +2,60 @@ from langchain_openai import AzureChatOpenAI
 from pydantic import BaseModel, Field
 from tools import combined_tools, other_tools
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.output_parsers.openai_tools import JsonOutputKeyToolsParser
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
 import asyncio
+import functools
+import hashlib
 import os
 import sys
+import time
 from dotenv import load_dotenv
 import datetime
-from shared_state import set_response
 
-from state import AgentState
-from utils import mark_page, process_tools
-from prompt import chat_prompt_template, answer_prompt_template, tools_prompt_template, insights_template
+from state import AgentState, task_as_text
+from utils import mark_page, process_tools, push_update
+from page_text import get_relevant_text
+from bbox_format import format_bboxes
+from llm_runtime import get_http_async_client
+from model_router import ModelRouter, valid_answer, valid_preflight, valid_text, valid_tool_calls
+from change_detection import take_snapshot, compare_snapshots, describe_region
+from memory import remember, compact_memory
+from search import format_search
+from fanout import fan_out, merge_insights
+from constants import CHANGE_DETECTION_ENABLED, OBSERVATION_MODE, OUTLINE_MIN_CHARS
+from metrics import get_metrics
+from prompt import (
+    chat_prompt_template,
+    answer_prompt_template,
+    tools_prompt_template,
+    insights_template,
+    memory_summary_template,
+    preflight_template,
+    text_chat_prompt_template,
+    text_answer_prompt_template,
+    text_tools_prompt_template,
+)
 from logger import get_logger
 
 # Initialize logger
 logger = get_logger()
+metrics = get_metrics()
 
 # Set up environment paths
 AZURE_OPENAI_ENDPOINT = os.getenv("AZURE_OPENAI_ENDPOINT")
 
-# Initialize Azure OpenAI LLM instance
-llm = AzureChatOpenAI(
-    azure_deployment="pinewheel-4o",
+# Azure OpenAI models per deployment; each node role is routed to a model tier
+router = ModelRouter(lambda deployment: AzureChatOpenAI(
+    azure_deployment=deployment,
     api_version="2024-05-01-preview",
     temperature=0,
     max_retries=2,
-    azure_endpoint=AZURE_OPENAI_ENDPOINT
-)
+    azure_endpoint=AZURE_OPENAI_ENDPOINT,
+    # Node calls go through the async client path, sharing one pooled connection set
+    http_async_client=get_http_async_client(),
+))
 
 from typing import Optional
 from pydantic import BaseModel, Field
@@ -49,18 +77,202 @@ class Response(BaseModel):
     )
 
 
+class Preflight(BaseModel):
+    """
+    Decision whether the search results page alone answers the task.
+
+    Attributes:
+        answerable (bool): Whether the answer box or snippets fully answer the task.
+        reason (str): One-sentence justification.
+    """
+    answerable: bool = Field(description="True only if the results page states the complete answer to the task")
+    reason: str = Field(description="One-sentence justification of the decision")
+
+
 # Append Response tool to the tools list
 combined_tools.append(Response)
 other_tools.append(Response)
-# Bind tools to the model
-model = chat_prompt_template | llm.bind_tools(combined_tools)
+# Tool names of each chain, checked when validating its output
+ACTION_TOOLS = [convert_to_openai_tool(tool)["function"]["name"] for tool in combined_tools]
+BOOKKEEPING_TOOLS = [convert_to_openai_tool(tool)["function"]["name"] for tool in other_tools]
+
+VALIDATORS = {
+    "main": valid_tool_calls(ACTION_TOOLS),
+    "tool_chain": valid_tool_calls(BOOKKEEPING_TOOLS),
+    "insights": valid_text,
+    "summarize": valid_text,
+    "answer": valid_answer,
+    "preflight": valid_preflight,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def build_chain(role: str, text: bool = False, tier: Optional[str] = None) -> Runnable:
+    """
+    Builds the chain of a node role on the model tier the router assigns to it.
+
+    Args:
+        role (str): "main", "tool_chain", "answer", "preflight", "insights" or "summarize".
+        text (bool): Whether the page is observed as an outline instead of a screenshot.
+        tier (Optional[str]): Tier overriding the role's configured tier.
+
+    Returns:
+        Runnable: The chain; "preflight", "insights" and "summarize" take a list of messages.
+    """
+    if role == "main":
+        prompt = text_chat_prompt_template if text else chat_prompt_template
+        return prompt | router.bind("main", combined_tools, tier=tier)
+    if role == "tool_chain":
+        prompt = text_tools_prompt_template if text else tools_prompt_template
+        return prompt | router.bind("tool_chain", other_tools, tier=tier)
+    if role == "answer":
+        # Forces a `Response` tool call; parsed incrementally so the final answer can be
+        # streamed token by token while it is being generated
+        prompt = text_answer_prompt_template if text else answer_prompt_template
+        return (
+            prompt
+            | router.bind("answer", [Response], tool_choice="Response", tier=tier)
+            | JsonOutputKeyToolsParser(key_name="Response", first_tool_only=True)
+        )
+    if role == "preflight":
+        return (
+            router.bind("preflight", [Preflight], tool_choice="Preflight", tier=tier)
+            | JsonOutputKeyToolsParser(key_name="Preflight", first_tool_only=True)
+        )
+    return router.bind(role, tier=tier)
 
-# Define execution chain
-chain =  chat_prompt_template | llm.bind_tools(combined_tools)
 
-tool_model = tools_prompt_template | llm.bind_tools(other_tools)
+async def call_model(role: str, inputs, text: bool = False):
+    """
+    Calls the chain of a node role, escalating to the large tier on invalid output.
+    """
+    return await router.invoke(
+        role,
+        lambda tier: build_chain(role, text, tier),
+        inputs,
+        VALIDATORS.get(role),
+    )
+
+
+def use_model(chat_model):
+    """
+    Rebinds every node chain to another chat model, e.g. a scripted stub model for
+    offline benchmarks. The model must support `bind_tools`.
+
+    Args:
+        chat_model (BaseChatModel): The model used for all node calls from now on.
+    """
+    router.use_model(chat_model)
+    build_chain.cache_clear()
+
 
-tool_chain = tools_prompt_template | llm.bind_tools(other_tools)
+async def preflight_node(state: AgentState) -> AgentState:
+    """
+    Asks the model once whether the search results page seeded before the run already
+    answers the task. If it does, the graph goes straight to `answer_node`, which
+    answers from the listed results as a text observation; otherwise the agent loop
+    starts as usual.
+
+    Args:
+        state (AgentState): The current agent state, with `search` set.
+
+    Returns:
+        AgentState: Updated state with `direct_answer` set.
+    """
+    check_start = time.perf_counter()
+    state["direct_answer"] = False
+    try:
+        results = format_search(state.get("search"))
+        messages = [
+            SystemMessage(content=preflight_template.strip()),
+            HumanMessage(content=f"Task: {task_text(state)}\n\n{results}"),
+        ]
+        decision = await call_model("preflight", messages) or {}
+        logger.debug(f"Preflight decision: {decision}")
+
+        if decision.get("answerable") is True:
+            state.update({
+                "direct_answer": True,
+                "observation": "text",
+                # The results themselves reach the answer prompt with the history
+                "outline": f"Search results page: {state['search']['url']}",
+                "bboxes": [],
+                "img": "",
+            })
+        await push_update(
+            state,
+            "preflight",
+            direct=state["direct_answer"],
+            reason=decision.get("reason"),
+        )
+    except Exception as e:
+        logger.warning(f"Preflight check failed, starting the agent loop: {e}")
+        metrics.increment("preflight.errors")
+    finally:
+        metrics.observe("preflight.check", time.perf_counter() - check_start)
+        metrics.increment("preflight.direct" if state["direct_answer"] else "preflight.browse")
+
+    return state
+
+
+def preflight_stats() -> dict:
+    """
+    Reports the share of checked queries answered directly from the results page and
+    the latency saved by them: the mean time of runs that browsed minus the mean time
+    of runs answered directly.
+
+    Returns:
+        dict: Pre-flight statistics.
+    """
+    snapshot = metrics.snapshot()
+    counters, timings = snapshot["counters"], snapshot["timings"]
+    direct, browse = counters.get("preflight.direct", 0), counters.get("preflight.browse", 0)
+    direct_time, browse_time = timings.get("run.direct"), timings.get("run.browse")
+    saved = None
+    if direct_time and browse_time:
+        saved = round(browse_time["mean"] - direct_time["mean"], 4)
+    return {
+        "checked": direct + browse,
+        "direct_share": round(direct / (direct + browse), 4) if direct + browse else None,
+        "check_time": timings.get("preflight.check"),
+        "direct_run_time": direct_time,
+        "browse_run_time": browse_time,
+        "saved_per_direct_run": saved,
+    }
+
+
+def task_text(state: AgentState) -> str:
+    """
+    Returns the task as plain text; the state holds it as a list of messages.
+    """
+    return task_as_text(state.get("task"))
+
+
+def observation_inputs(state: AgentState) -> dict:
+    """
+    Returns the prompt inputs describing the current page for the observation used this step.
+    """
+    if state.get("observation") == "text":
+        return {"img": "", "img_mime": "", "outline": state.get("outline") or "", "bboxes": ""}
+    return {
+        "img": state.get("img"),
+        "img_mime": state.get("img_mime") or "image/png",
+        "outline": "",
+        "bboxes": format_bboxes(state.get("bboxes", []), task_text(state)),
+    }
+
+
+def text_observation_insufficient(marked_data: dict, state: AgentState) -> Optional[str]:
+    """
+    Returns why a text observation cannot stand in for a screenshot, or None if it can.
+    """
+    if not marked_data.get("bboxes"):
+        return "no labeled elements"
+    if len(marked_data.get("outline") or "") < OUTLINE_MIN_CHARS:
+        return "outline too short"
+    if state.get("observation") == "text" and state.get("page_changed") is False:
+        return "previous text-only step had no effect"
+    return None
 
 
 async def browser_node(state: AgentState) -> AgentState:
@@ -88,13 +300,39 @@ async def browser_node(state: AgentState) -> AgentState:
         
 
 
-        # Extract and mark relevant page data asynchronously
-        marked_data = await mark_page(page)
+        # Extract and mark relevant page data asynchronously; text observations fall back
+        # to a screenshot when the outline does not describe the page well enough
+        observation = state.get("observation_mode") or OBSERVATION_MODE
+        marked_data = await mark_page(page, mode=observation)
+        if observation == "text":
+            reason = text_observation_insufficient(marked_data, state)
+            if reason:
+                logger.info(f"Falling back to a screenshot observation: {reason}")
+                metrics.increment("observation.fallback")
+                observation = "vision"
+                marked_data = await mark_page(page)
+        metrics.increment(f"observation.{observation}")
 
         state.update({
+            "observation": observation,
             "bboxes": marked_data.get("bboxes", []),
             "img": marked_data.get("img"),
+            "img_mime": marked_data.get("img_mime"),
+            "outline": marked_data.get("outline"),
         })
+        logger.debug(f"Page marking timings: {marked_data.get('timings')}")
+
+        if CHANGE_DETECTION_ENABLED:
+            await detect_page_change(state)
+
+        await push_update(
+            state,
+            "browser",
+            url=page.url,
+            elements=len(state["bboxes"]),
+            changed=state.get("page_changed", True),
+            observation=observation,
+        )
 
     except KeyError as e:
         logger.error(f"KeyError encountered: {e}", exc_info=True)
@@ -108,11 +346,117 @@ async def browser_node(state: AgentState) -> AgentState:
 
     return state
 
+async def detect_page_change(state: AgentState):
+    """
+    Compares the page with the previous step and records the result in the state.
+
+    Sets `page_changed` (False when screenshot, URL and marked elements are all
+    unchanged) and `changed_region`, and keeps the new snapshot for the next step.
+    """
+    try:
+        snapshot = await asyncio.to_thread(
+            take_snapshot,
+            state["page"].url,
+            state.get("img"),
+            state.get("bboxes", []),
+            state.get("outline"),
+        )
+    except Exception as e:
+        logger.warning(f"Could not take page snapshot for change detection: {e}")
+        state.update({"page_changed": True, "changed_region": None, "page_snapshot": None})
+        return
+
+    previous = state.get("page_snapshot")
+    if previous:
+        change = compare_snapshots(previous, snapshot)
+        logger.debug(f"Page change since last step: {change}")
+        state.update({"page_changed": change["changed"], "changed_region": change["region"]})
+    else:
+        state.update({"page_changed": True, "changed_region": None})
+    state["page_snapshot"] = snapshot
+
+
+def change_note(state: AgentState) -> str:
+    """
+    Describes the effect of the previous action for the model, or "" on the first step.
+    """
+    if state.get("page_changed") is False:
+        return (
+            "NOTE: Your previous action had no visible effect. The page, URL and labeled "
+            "elements are unchanged. Do not repeat it; choose a different action."
+        )
+    if state.get("changed_region") and state.get("page_snapshot"):
+        return f"NOTE: Your previous action changed the page in the {describe_region(state['changed_region'])} region."
+    return ""
+
+
+def describe_tool_call(call: dict) -> str:
+    """
+    Renders a tool call compactly for memory, e.g. "Click(bbox_id=3)".
+    """
+    args = ", ".join(f"{key}={value!r}" for key, value in call["args"].items())
+    return f"{call['name']}({args})"
+
+
+async def summarize_memory(state: AgentState, field: str, summary: str, entries: list, max_words: int) -> str:
+    """
+    Folds older memory entries into the running summary of a memory field.
+
+    Args:
+        state (AgentState): The current agent state.
+        field (str): Memory field being summarized.
+        summary (str): Current summary of the field.
+        entries (list): Entries to fold into the summary, oldest first.
+        max_words (int): Word limit of the new summary.
+
+    Returns:
+        str: The updated summary.
+    """
+    previous = summary or "(none yet)"
+    older = "\n\n".join(entries)
+    messages = [
+        SystemMessage(content=memory_summary_template.format(
+            field=field, task=task_text(state), max_words=max_words
+        ).strip()),
+        HumanMessage(content=f"Current summary:\n{previous}\n\nOlder entries:\n{older}"),
+    ]
+    result = await call_model("summarize", messages)
+    return result.content
+
+
+async def source_insight(state: AgentState, url: str, title: str, text: str) -> str:
+    """
+    Generates the insight of one source read by the fan-out.
+
+    Args:
+        state (AgentState): The current agent state.
+        url (str): URL of the source.
+        title (str): Title of the source.
+        text (str): Relevant text of the source.
+
+    Returns:
+        str: The insight.
+    """
+    messages = [
+        SystemMessage(content=insights_template.strip()),
+        HumanMessage(content=f"📝 **Task**: {task_text(state)}\n📄 **Extracted Page Text** ({title}, {url}):\n{text}"),
+    ]
+    insight = await call_model("insights", messages)
+    return insight.content
+
+
 async def execution_node(state: AgentState) -> AgentState:
     """
     Executes the AI model and processes results efficiently.
     Stores model response as thoughts in the state.
+
+    The step's model calls form a small dependency graph: the main chain and the tool
+    chain only need the observation taken before the action, so both start at once;
+    the insight needs the page text after the main chain's action. Results are merged
+    in a fixed order (main chain action, insight, tool chain tools) regardless of
+    which call finishes first.
     """
+    tool_task = None
     try:
         state["steps"] += 1
 
@@ -123,25 +467,28 @@ async def execution_node(state: AgentState) -> AgentState:
             logger.error("No task provided to execution_node")
             state["errors"] = "No task description was provided. Please specify what you want to accomplish on this page."
             return state
-        
+
+        history = "\n".join(filter(None, [format_search(state.get("search")), state.get("history", ""), change_note(state)]))
+
+        text_observation = state.get("observation") == "text"
         enhanced_task = {
-            "task": state.get("task"),
-            "img": state.get("img"),
-            "history": state.get("history", ""),
-            "bboxes": state.get("bboxes", []),
+            "task": task_text(state),
+            **observation_inputs(state),
+            "history": history,
             "profile_info": state.get("profile_info", "None"),
             "insights": state.get("insights", ""),
             "thoughts": state.get("thoughts", ""),
             "VISITED_WEBSITES": state.get("VISITED_WEBSITES", "")
         }
 
-        # Step 1: Run main chain after tool_chain
-        logger.debug("Calling main chain with enhanced task")
+        # The tool chain is independent of the main chain and the insight, so it runs
+        # alongside them and its tools are applied once they are done
+        logger.debug("Calling main chain and tool_chain with enhanced task")
+        tool_task = asyncio.create_task(call_model("tool_chain", enhanced_task, text_observation))
 
-        response = await asyncio.to_thread(
-            chain.invoke,
-            enhanced_task,
-        )
+        # Step 1: Run main chain
+
+        response = await call_model("main", enhanced_task, text_observation)
 
         if not response:
             logger.error("Empty response received from model")
@@ -150,67 +497,94 @@ async def execution_node(state: AgentState) -> AgentState:
 
         logger.debug(f"Main chain response: {response}")
 
-        if state["thoughts"]:
-            state["thoughts"] += "\n\n----- Final Thought from Main Chain -----\n\n"
+        tool_calls = [
+            {
+                "name": call["name"],
+                "args": {k: v for k, v in call["args"].items() if k != "state"},
+            }
+            for call in response.tool_calls
+        ]
+
+        # Only the content and the calls are kept, not the message repr with its metadata
+        actions = "; ".join(describe_tool_call(call) for call in tool_calls)
+        remember(state, "thoughts", f"{response.content}\nActions: {actions}" if actions else response.content)
+        remember(state, "history", f"Step {state['steps']}: {actions or 'no action'}")
 
-        state["thoughts"] += str(response)
+        await push_update(
+            state,
+            "action",
+            thought=response.content,
+            tool_calls=tool_calls,
+        )
 
         # Step 2: Process tools from main chain response
         state = await process_tools(response, state)
 
+        # Step 2b: Read the search results requested by ReadTopResults in parallel
+        sources = state.pop("fanout_sources", None)
+        if sources:
+            results = await fan_out(
+                state,
+                sources,
+                task_text(state),
+                lambda url, title, text: source_insight(state, url, title, text),
+            )
+            merge_insights(state, results)
+            await push_update(
+                state,
+                "fanout",
+                sources=[{"url": result["url"], "title": result["title"], "error": result["error"]} for result in results],
+            )
+
         # Step 3: Create a page observation
+        # Only the main content, and of long pages only the parts relevant to the task
         observation_text = ""
         try:
             await state["page"].wait_for_load_state("domcontentloaded")
-            raw_text = await state["page"].inner_text("body")
-            observation_text = raw_text.strip()
-            logger.debug(f"Full page text extracted (length {len(observation_text)} characters)")
+            page_text = await get_relevant_text(state["page"], task_text(state))
+            observation_text = page_text["text"]
+            observation_digest = page_text["digest"]
+            logger.debug(
+                f"Page text extracted ({page_text['selected']} of {page_text['chunks']} chunks, "
+                f"{len(observation_text)} characters)"
+            )
         except Exception as e:
             observation_text = "Could not extract page content due to: " + str(e)
+            observation_digest = hashlib.sha1(observation_text.encode()).hexdigest()
 
-        system_prompt = insights_template
+        # The insight would be identical if the action left the page text unchanged
+        if observation_digest == state.get("insights_source"):
+            logger.debug("Page text unchanged since the last insight, skipping insights call")
+            metrics.increment("execution.insights_skipped")
+        else:
+            system_prompt = insights_template
 
-        user_prompt = f"""📝 **Task**: {state.get("task")}
+            user_prompt = f"""📝 **Task**: {task_text(state)}
             📄 **Extracted Page Text**:
             {observation_text}
                     """
 
-        messages = [
-            SystemMessage(content=system_prompt.strip()),
-            HumanMessage(content=user_prompt.strip())
-        ]
-
-        # Generate insight
-        insight = await asyncio.to_thread(
-            llm.invoke, messages
-        )
-        logger.debug(f"Insight generated: {insight}")
-
-        if not insight:
-            logger.error("Model returned an empty response")
-            state["errors"] = "The model could not generate a response based on the page content."
-            return state
-
-        if "insights" not in state or not isinstance(state["insights"], str):
-            state["insights"] = ""
-
-        if state["insights"]:
-            state["insights"] += "\n\n===== Next Insight =====\n\n"
+            messages = [
+                SystemMessage(content=system_prompt.strip()),
+                HumanMessage(content=user_prompt.strip())
+            ]
 
-        state["insights"] += str(insight)
-        logger.debug("Insight added to state")
+            # Generate insight
+            insight = await call_model("insights", messages)
+            logger.debug(f"Insight generated: {insight}")
 
-        # Prepare enhanced task input for tool_chain and main chain
+            if not insight:
+                logger.error("Model returned an empty response")
+                state["errors"] = "The model could not generate a response based on the page content."
+                return state
 
+            remember(state, "insights", insight.content)
+            state["insights_source"] = observation_digest
+            logger.debug("Insight added to state")
+            await push_update(state, "insight", content=insight.content)
 
-        # Step 4: Run tool_chain first
-
-        logger.debug("Calling tool_chain with enhanced task and observation")
-
-        tool_response = await asyncio.to_thread(
-            tool_chain.invoke,
-            enhanced_task,
-        )
+        # Step 4: Apply the tool_chain result, started together with the main chain
+        tool_response = await tool_task
 
         logger.debug(f"Tool chain response: {tool_response}")
 
@@ -220,8 +594,8 @@ async def execution_node(state: AgentState) -> AgentState:
         else:
             logger.warning("Tool chain did not return a response")
 
-        
-
+        # Step 5: Keep history, thoughts and insights within their token budgets
+        await compact_memory(state, lambda *args: summarize_memory(state, *args))
 
     except KeyError as e:
         logger.error(f"KeyError encountered: {e}", exc_info=True)
@@ -235,6 +609,12 @@ async def execution_node(state: AgentState) -> AgentState:
     except Exception as e:
         logger.error(f"Unexpected error in execution_node: {e}", exc_info=True)
         state["errors"] = f"Unexpected error while executing task: {e}"
+    finally:
+        # Early returns and errors leave the tool chain result unused
+        if tool_task and not tool_task.done():
+            tool_task.cancel()
+        elif tool_task and not tool_task.cancelled():
+            tool_task.exception()  # Marks a failure of an unused result as retrieved
 
     return state
 
@@ -263,24 +643,33 @@ async def answer_node(state: AgentState) -> AgentState:
             return state
         
         
-        # Call LLM with structured output
-        response = await asyncio.to_thread(
-            (answer_prompt_template | llm.with_structured_output(Response)).invoke,
-            {
-                "task": state.get("task"),
-                "img": state.get("img"),
-                "history": state.get("history", ""),
-                "bboxes": state.get("bboxes", []),
-                "profile_info": state.get("profile_info", "None"),
-                "page_load_status": state.get("page_load_status", "unknown"),
-                "thoughts" : state.get("thoughts", ""),
-                "insights": state.get("insights", ""),
-                "VISITED_WEBSITES": state.get("VISITED_WEBSITES", ""),
-            }
-        )
+        # Call LLM with structured output, streaming the answer as it is generated
+        partial = {}
+        streamed = ""
+        text_observation = state.get("observation") == "text"
+        answer_inputs = {
+            "task": task_text(state),
+            **observation_inputs(state),
+            "history": "\n".join(filter(None, [format_search(state.get("search")), state.get("history", "")])),
+            "profile_info": state.get("profile_info", "None"),
+            "page_load_status": state.get("page_load_status", "unknown"),
+            "thoughts" : state.get("thoughts", ""),
+            "insights": state.get("insights", ""),
+            "VISITED_WEBSITES": state.get("VISITED_WEBSITES", ""),
+        }
+        build = lambda tier: build_chain("answer", text_observation, tier)
+        async for partial in router.stream("answer", build, answer_inputs):
+            text = (partial or {}).get("final_answer") or ""
+            if len(text) > len(streamed) and text.startswith(streamed):
+                await push_update(state, "answer_token", delta=text[len(streamed):])
+                streamed = text
+
+        reason = valid_answer(partial)
+        if reason and router.escalates("answer"):
+            partial = await router.escalate("answer", build, answer_inputs, valid_answer, reason)
+
+        response = Response(**(partial or {}))
 
-        set_response(response.final_answer)
-        
         logger.debug(f"Final response: {response}")
         
         state.update({
@@ -288,6 +677,8 @@ async def answer_node(state: AgentState) -> AgentState:
             "answer": response.final_answer,
             "errors": response.errors,
         })
+
+        await push_update(state, "answer", answer=response.final_answer, errors=response.errors)
         
     except KeyError as e:
         logger.error(f"KeyError encountered: {e}", exc_info=True)
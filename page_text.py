@@ -0,0 +1,301 @@
+import hashlib
+import math
+import re
+import time
+import weakref
+from collections import Counter
+from typing import Any, List, Optional, TypedDict
+
+from constants import CHARS_PER_TOKEN, PAGE_TEXT_TOKEN_BUDGET, PAGE_TEXT_CHUNK_TOKENS, PAGE_TEXT_MIN_MAIN_CHARS
+from state import task_as_text
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+# Removes leftover marks and returns the visible text of the main content as blocks
+# (paragraphs, list items, cells, headings) in document order. Navigation, headers,
+# footers, sidebars, dialogs and cookie banners are skipped. The main landmark is used
+# when it holds enough text; otherwise the whole body is read.
+CONTENT_BLOCKS_EXPRESSION = """(minMainChars) => {
+    if (window.unmarkPage) window.unmarkPage();
+    if (!document.body) return [];
+
+    const BOILERPLATE = [
+        "nav", "header", "footer", "aside", "dialog", "noscript", "script", "style", "template",
+        "[role=navigation]", "[role=banner]", "[role=contentinfo]", "[role=complementary]",
+        "[role=dialog]", "[role=alertdialog]", "[aria-modal=true]", "[aria-hidden=true]",
+        "[id*=cookie i]", "[class*=cookie i]", "[id*=consent i]", "[class*=consent i]",
+        "[id*=gdpr i]", "[class*=gdpr i]", "[data-webvision-mark]",
+    ].join(",");
+
+    const main = document.querySelector("main, [role=main], article");
+    const root = main && main.innerText.trim().length >= minMainChars ? main : document.body;
+
+    const blocks = new Map();
+    const displays = new Map();
+    const skipped = new Map();
+    const undisplayed = new Map();
+
+    // display:none hides the whole subtree, although descendants keep their own computed
+    // display (collapsed menus, hidden tabs, closed accordions), so ancestors are checked too
+    const isUndisplayed = (element) => {
+        if (!element) return false;
+        if (undisplayed.has(element)) return undisplayed.get(element);
+        const result = getComputedStyle(element).display === "none" || isUndisplayed(element.parentElement);
+        undisplayed.set(element, result);
+        return result;
+    };
+
+    const isSkipped = (element) => {
+        if (skipped.has(element)) return skipped.get(element);
+        // Landmarks inside the chosen main content belong to it (e.g. an article header)
+        const boilerplate = element.closest(BOILERPLATE);
+        let result = Boolean(boilerplate) && (root === document.body || !root.contains(boilerplate)
+            || boilerplate.matches("script, style, noscript, template, dialog, [aria-hidden=true], [data-webvision-mark]"));
+        // visibility is inherited, and a visible descendant of a hidden element is shown
+        result = result || getComputedStyle(element).visibility === "hidden" || isUndisplayed(element);
+        skipped.set(element, result);
+        return result;
+    };
+
+    const blockOf = (element) => {
+        let current = element;
+        while (current && current !== root) {
+            let display = displays.get(current);
+            if (display === undefined) {
+                display = getComputedStyle(current).display;
+                displays.set(current, display);
+            }
+            if (!display.startsWith("inline")) return current;
+            current = current.parentElement;
+        }
+        return root;
+    };
+
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT);
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        const parent = node.parentElement;
+        if (!parent || isSkipped(parent)) continue;
+        const text = node.textContent.replace(/\\s+/g, " ");
+        if (!text.trim()) continue;
+        const block = blockOf(parent);
+        blocks.set(block, (blocks.get(block) || "") + text);
+    }
+
+    return Array.from(blocks.values(), (text) => text.trim()).filter(Boolean);
+}"""
+
+_WORD = re.compile(r"\w+")
+
+# Words too common to tell chunks apart
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was "
+    "were will with what which who how when where why do does i me my you your we our".split()
+)
+
+
+class PageText(TypedDict):
+    """
+    Text of a page prepared for the insights call.
+
+    Attributes:
+        text (str): Selected text, within the token budget.
+        digest (str): Hash of the full extracted text.
+        chunks (int): Number of chunks of the page.
+        selected (int): Number of chunks in `text`.
+    """
+    text: str
+    digest: str
+    chunks: int
+    selected: int
+
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def chunk_blocks(blocks: List[str], chunk_tokens: int = PAGE_TEXT_CHUNK_TOKENS) -> List[str]:
+    """
+    Groups consecutive text blocks into chunks of about `chunk_tokens` tokens.
+
+    Blocks are never split unless a single block exceeds the chunk size, in which
+    case it is cut at sentence boundaries where possible.
+
+    Args:
+        blocks (List[str]): Text blocks in document order.
+        chunk_tokens (int): Target chunk size in tokens.
+
+    Returns:
+        List[str]: Chunks in document order.
+    """
+    max_chars = max(1, chunk_tokens) * CHARS_PER_TOKEN
+    pieces = []
+    for block in blocks:
+        while len(block) > max_chars:
+            cut = block.rfind(". ", 0, max_chars)
+            cut = cut + 1 if cut > max_chars // 2 else max_chars
+            pieces.append(block[:cut].strip())
+            block = block[cut:].strip()
+        if block:
+            pieces.append(block)
+
+    chunks, current = [], []
+    size = 0
+    for piece in pieces:
+        if current and size + len(piece) > max_chars:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over the chunks of one page.
+
+    Attributes:
+        chunks (List[str]): Indexed chunks in document order.
+        k1 (float): Term frequency saturation.
+        b (float): Length normalization.
+    """
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+        self.frequencies = [Counter(tokenize(chunk)) for chunk in chunks]
+        self.lengths = [sum(frequency.values()) for frequency in self.frequencies]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        document_counts = Counter(term for frequency in self.frequencies for term in frequency)
+        total = len(chunks)
+        self.idf = {
+            term: math.log(1 + (total - count + 0.5) / (count + 0.5))
+            for term, count in document_counts.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        """
+        Scores every chunk against the query.
+
+        Args:
+            query (str): Free-text query, e.g. the task.
+
+        Returns:
+            List[float]: One score per chunk, in document order.
+        """
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        results = []
+        for frequency, length in zip(self.frequencies, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            for term in terms:
+                count = frequency.get(term, 0)
+                if count:
+                    score += self.idf[term] * count * (self.k1 + 1) / (count + norm)
+            results.append(score)
+        return results
+
+
+# One index per page, rebuilt only when the page text changes
+_indexes: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def get_page_index(page, blocks: List[str], digest: str) -> BM25Index:
+    """
+    Returns the index of a page's text, reusing it while the text is unchanged.
+
+    Args:
+        page (Page): The Playwright page the text was read from.
+        blocks (List[str]): Content blocks of the page.
+        digest (str): Hash of the blocks.
+
+    Returns:
+        BM25Index: The index.
+    """
+    cached = _indexes.get(page)
+    if cached and cached[0] == digest:
+        metrics.increment("page_text.index_reused")
+        return cached[1]
+    index = BM25Index(chunk_blocks(blocks))
+    _indexes[page] = (digest, index)
+    return index
+
+
+def select_chunks(index: BM25Index, query: str, token_budget: int = PAGE_TEXT_TOKEN_BUDGET) -> List[int]:
+    """
+    Picks the chunks most relevant to the query that fit in the token budget.
+
+    Chunks without any query term are ranked after matching ones in document order,
+    so the leading text fills whatever budget relevant chunks leave over.
+
+    Args:
+        index (BM25Index): Index of the page.
+        query (str): Free-text query.
+        token_budget (int): Approximate token budget; 0 selects every chunk.
+
+    Returns:
+        List[int]: Positions of the selected chunks, in document order.
+    """
+    if not token_budget:
+        return list(range(len(index.chunks)))
+
+    scores = index.scores(query)
+    ranked = sorted(range(len(index.chunks)), key=lambda position: (-scores[position], position))
+    remaining = token_budget * CHARS_PER_TOKEN
+    selected = []
+    for position in ranked:
+        size = len(index.chunks[position]) + 2
+        if size <= remaining:
+            selected.append(position)
+            remaining -= size
+    return sorted(selected)
+
+
+async def get_relevant_text(page, query: Any, token_budget: int = PAGE_TEXT_TOKEN_BUDGET) -> PageText:
+    """
+    Reads the main content of a page and keeps the parts most relevant to the query.
+
+    Pages that fit in the budget are returned whole. Longer pages are split into
+    chunks, ranked with BM25 and the top chunks are returned in document order, with
+    "[...]" marking the gaps.
+
+    Args:
+        page (Page): The Playwright page to read.
+        query (Any): Free-text query, or the task as the state's list of messages.
+        token_budget (int): Approximate token budget; 0 disables it.
+
+    Returns:
+        PageText: The selected text and its statistics.
+    """
+    query = task_as_text(query)
+    phase_start = time.perf_counter()
+    blocks = await page.evaluate(CONTENT_BLOCKS_EXPRESSION, PAGE_TEXT_MIN_MAIN_CHARS) or []
+    metrics.observe("page_text.extract", time.perf_counter() - phase_start)
+
+    full_text = "\n".join(blocks)
+    digest = hashlib.sha1(full_text.encode()).hexdigest()
+    if not token_budget or len(full_text) <= token_budget * CHARS_PER_TOKEN:
+        return {"text": full_text, "digest": digest, "chunks": len(blocks), "selected": len(blocks)}
+
+    rank_start = time.perf_counter()
+    index = get_page_index(page, blocks, digest)
+    selected = select_chunks(index, query, token_budget)
+    metrics.observe("page_text.rank", time.perf_counter() - rank_start)
+
+    parts = []
+    previous: Optional[int] = -1
+    for position in selected:
+        if position != previous + 1:
+            parts.append("[...]")
+        parts.append(index.chunks[position])
+        previous = position
+    if previous != len(index.chunks) - 1:
+        parts.append("[...]")
+
+    logger.debug(f"[PAGE_TEXT] Selected {len(selected)} of {len(index.chunks)} chunks ({len(full_text)} characters)")
+    return {"text": "\n\n".join(parts), "digest": digest, "chunks": len(index.chunks), "selected": len(selected)}
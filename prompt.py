@@ -60,8 +60,10 @@ system_prompt_template = SystemMessagePromptTemplate(
                 "   - Update approach based on new understanding\n\n"
                 
                 "* Search Engine *\n"
-                "- Use https://duckduckgo.com/ as primary search engine\n"
-                "- Start with direct navigation to DuckDuckGo\n"
+                "- Use the Search tool for web searches instead of typing into a search box\n"
+                "- The results of a search are listed in the history; the task's first search may already be done\n"
+                "- Open a result with NavigateURL to its listed URL, or click it on the results page\n"
+                "- For comparison and research tasks, use ReadTopResults to read several results at once\n"
                 "- Analyze results thoroughly before trying alternatives\n"
                 "- Use go_back tool to return to search results\n"
                 "- Use Scroll tool for more results\n\n"
@@ -379,7 +381,7 @@ Only use what is given. Answer with precision and respect the boundaries of the
 human_prompt_template = HumanMessagePromptTemplate(
     prompt=[
         ImagePromptTemplate(
-            input_variables=["img"], template={"url": "data:image/png;base64,{img}"}
+            input_variables=["img_mime", "img"], template={"url": "data:{img_mime};base64,{img}"}
         ),
         PromptTemplate(input_variables=["bboxes"], template="{bboxes}"),
         PromptTemplate(input_variables=["task"], template="{task}"),
@@ -390,9 +392,28 @@ human_prompt_template = HumanMessagePromptTemplate(
     ]
 )
 
+# Text-only human message used when the page is observed as an outline instead of a screenshot
+text_human_prompt_template = HumanMessagePromptTemplate(
+    prompt=[
+        PromptTemplate(
+            input_variables=["outline"],
+            template=(
+                "No screenshot is available for this step. The visible page is given as a text outline "
+                "instead; [n] marks the element with Numerical Label n, usable with the same tools.\n"
+                "Page outline:\n{outline}"
+            ),
+        ),
+        PromptTemplate(input_variables=["task"], template="{task}"),
+        PromptTemplate(
+            input_variables=["history"],
+            template="History of actions (Needs to be updated right now): {history}",
+        ),
+    ]
+)
+
 # Construct the chat prompt template
 chat_prompt_template = ChatPromptTemplate(
-    input_variables=["bboxes", "img", "task", "history","profile_info","thoughts"],
+    input_variables=["bboxes", "img", "img_mime", "task", "history","profile_info","thoughts"],
     messages=[
         system_prompt_template,
         human_prompt_template,
@@ -400,7 +421,7 @@ chat_prompt_template = ChatPromptTemplate(
 )
 
 answer_prompt_template = ChatPromptTemplate(
-    input_variables=["bboxes", "img", "task", "history"],
+    input_variables=["bboxes", "img", "img_mime", "task", "history"],
         messages=[
         answer_node_template,
         human_prompt_template,
@@ -413,4 +434,54 @@ tools_prompt_template = ChatPromptTemplate(
         tool_prompt_template,
         human_prompt_template,
     ],
-)
\ No newline at end of file
+)
+
+text_chat_prompt_template = ChatPromptTemplate(
+    input_variables=["outline", "task", "history", "profile_info", "thoughts"],
+    messages=[
+        system_prompt_template,
+        text_human_prompt_template,
+    ],
+)
+
+text_answer_prompt_template = ChatPromptTemplate(
+    input_variables=["outline", "task", "history"],
+    messages=[
+        answer_node_template,
+        text_human_prompt_template,
+    ],
+)
+
+text_tools_prompt_template = ChatPromptTemplate(
+    input_variables=["VISITED_WEBSITES"],
+    messages=[
+        tool_prompt_template,
+        text_human_prompt_template,
+    ],
+)
+
+# Folds older memory entries into a running summary when a memory field exceeds its budget
+memory_summary_template = """
+You maintain the working memory of a web-browsing agent.
+
+You are given the current summary of the agent's {field} and the older entries that no
+longer fit in its memory. Update the summary so it also covers these entries.
+
+- Keep every fact, number, URL, name and finding that could matter for the task: {task}
+- Keep which actions were already tried and whether they worked, so they are not repeated
+- Drop repetition, reasoning scaffolding and anything irrelevant to the task
+- Write at most {max_words} words of plain text, no headings
+"""
+
+# Decides from a search results page alone whether the task can be answered without browsing
+preflight_template = """
+You decide whether a web search results page already answers a user's task.
+
+You are given the task, the text of the instant answer box (if any) and the top results
+with their snippets. Call the Preflight tool:
+- answerable=true only if the answer box or the snippets state the complete answer to the
+  task (e.g. a price, a conversion, a definition, a date), with nothing left to look up
+- answerable=false if any part of the answer is missing, ambiguous, possibly outdated for a
+  time-sensitive task, or would require opening a page, filling a form or logging in
+Give a one-sentence reason.
+"""
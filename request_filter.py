@@ -0,0 +1,194 @@
+import weakref
+from typing import Iterable, List, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Page, Request, Route
+
+from constants import (
+    REQUEST_FILTER_BLOCK_TYPES,
+    REQUEST_FILTER_IMAGES,
+    REQUEST_FILTER_BLOCK_TRACKERS,
+    REQUEST_FILTER_EXTRA_HOSTS,
+)
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+# Known ad, tracking and analytics hosts; subdomains are matched as well
+TRACKER_HOSTS = {
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "adsrvr.org",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "moatads.com",
+    "doubleverify.com",
+    "pubmatic.com",
+    "rubiconproject.com",
+    "casalemedia.com",
+    "hotjar.com",
+    "mixpanel.com",
+    "segment.io",
+    "cdn.segment.com",
+    "chartbeat.com",
+    "optimizely.com",
+    "nr-data.net",
+    "clarity.ms",
+    "bat.bing.com",
+    "mc.yandex.ru",
+}
+
+# Rough median transfer sizes per resource type, used to estimate bytes saved
+# for requests that were never downloaded
+ESTIMATED_BYTES = {
+    "image": 30_000,
+    "media": 500_000,
+    "font": 40_000,
+    "script": 20_000,
+    "stylesheet": 15_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+# Neutral grey box; sized by the page's own width/height attributes or CSS
+PLACEHOLDER_SVG = (
+    '<svg xmlns="http://www.w3.org/2000/svg" width="100%" height="100%" preserveAspectRatio="none">'
+    '<rect width="100%" height="100%" fill="#d4d4d8"/></svg>'
+)
+
+_filters: "weakref.WeakKeyDictionary[BrowserContext, RequestFilter]" = weakref.WeakKeyDictionary()
+
+
+class RequestFilter:
+    """
+    Request-interception layer installed on a browser context used by the agent.
+
+    Blocks configured resource types and known ad/analytics hosts, optionally replaces
+    images with placeholders, and keeps per-page counts of requests and bytes saved.
+
+    Placeholders keep the <img> element in place, so images sized by attributes or CSS
+    keep their layout; unsized images fall back to the browser's default object size.
+
+    Attributes:
+        block_types (set): Playwright resource types to abort.
+        images (str): "allow", "placeholder" or "block".
+        block_hosts (set): Hosts (and their subdomains) whose requests are aborted.
+    """
+
+    def __init__(
+        self,
+        block_types: Iterable[str] = REQUEST_FILTER_BLOCK_TYPES,
+        images: str = REQUEST_FILTER_IMAGES,
+        block_trackers: bool = REQUEST_FILTER_BLOCK_TRACKERS,
+        extra_hosts: Iterable[str] = REQUEST_FILTER_EXTRA_HOSTS,
+    ):
+        self.block_types = set(block_types)
+        self.images = images
+        self.block_hosts = set(extra_hosts) | (TRACKER_HOSTS if block_trackers else set())
+        self._pages: List[dict] = []
+
+    async def install(self, context: BrowserContext):
+        """
+        Routes every request of the context through this filter.
+
+        Args:
+            context (BrowserContext): The context to filter.
+        """
+        await context.route("**/*", self._handle)
+        _filters[context] = self
+
+    def page_stats(self) -> List[dict]:
+        """
+        Returns per-page request statistics, one entry per top-level navigation.
+
+        Returns:
+            List[dict]: Entries with url, requests, blocked, stubbed, by_type and
+            estimated_bytes_saved.
+        """
+        return [dict(entry, by_type=dict(entry["by_type"])) for entry in self._pages]
+
+    def last_page_stats(self) -> Optional[dict]:
+        stats = self.page_stats()
+        return stats[-1] if stats else None
+
+    def _is_blocked_host(self, host: str) -> bool:
+        labels = host.split(".")
+        return any(".".join(labels[i:]) in self.block_hosts for i in range(len(labels) - 1))
+
+    def _current_page(self, request: Request) -> dict:
+        try:
+            is_document = request.is_navigation_request() and request.frame.parent_frame is None
+        except Exception:
+            is_document = False
+
+        if is_document or not self._pages:
+            self._pages.append({
+                "url": request.url,
+                "requests": 0,
+                "blocked": 0,
+                "stubbed": 0,
+                "by_type": {},
+                "estimated_bytes_saved": 0,
+            })
+        return self._pages[-1]
+
+    def _record(self, page_stats: dict, resource_type: str, action: str):
+        page_stats[action] += 1
+        page_stats["by_type"][resource_type] = page_stats["by_type"].get(resource_type, 0) + 1
+        page_stats["estimated_bytes_saved"] += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+        metrics.increment(f"request_filter.{action}")
+        metrics.increment(
+            "request_filter.estimated_bytes_saved",
+            ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES),
+        )
+
+    async def _handle(self, route: Route, request: Request):
+        page_stats = self._current_page(request)
+        page_stats["requests"] += 1
+        resource_type = request.resource_type
+
+        try:
+            if resource_type == "document" and request.frame.parent_frame is None:
+                await route.continue_()
+            elif self._is_blocked_host(urlparse(request.url).hostname or ""):
+                self._record(page_stats, resource_type, "blocked")
+                await route.abort("blockedbyclient")
+            elif resource_type in self.block_types or (resource_type == "image" and self.images == "block"):
+                self._record(page_stats, resource_type, "blocked")
+                await route.abort("blockedbyclient")
+            elif resource_type == "image" and self.images == "placeholder":
+                self._record(page_stats, resource_type, "stubbed")
+                await route.fulfill(status=200, content_type="image/svg+xml", body=PLACEHOLDER_SVG)
+            else:
+                await route.continue_()
+        except Exception as e:
+            # The page may have navigated away or closed while the request was in flight
+            logger.debug(f"[FILTER] Could not handle request {request.url}: {e}")
+
+
+def get_request_filter(page: Page) -> Optional[RequestFilter]:
+    """
+    Returns the request filter installed on the page's context, if any.
+
+    Args:
+        page (Page): An agent page.
+
+    Returns:
+        Optional[RequestFilter]: The installed filter.
+    """
+    return _filters.get(page.context)
@@ -0,0 +1,117 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+# Scripts are resolved next to this module, not relative to the working directory
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+MARK_PAGE_SCRIPT_PATH = os.path.join(PACKAGE_DIR, "mark_page.js")
+
+
+class Runtime:
+    """
+    Process-level resources shared by all runs: the marking script and the compiled
+    graph. Node chains are cached by `nodes.build_chain` itself, so that
+    `nodes.use_model` can rebuild them; `warm` only builds them ahead of time.
+
+    Each resource is loaded lazily on first use, exactly once per process, so
+    importing the agent modules stays cheap and no run pays for setup that another
+    run already did. Load times are recorded as `runtime.load.<name>`.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._resources: Dict[str, Any] = {}
+
+    def _once(self, name: str, loader: Callable[[], Any]) -> Any:
+        if name in self._resources:
+            return self._resources[name]
+        with self._lock:
+            if name not in self._resources:
+                load_start = time.perf_counter()
+                self._resources[name] = loader()
+                elapsed = time.perf_counter() - load_start
+                metrics.observe(f"runtime.load.{name}", elapsed)
+                logger.debug(f"[RUNTIME] Loaded {name} in {elapsed:.4f} seconds")
+            return self._resources[name]
+
+    @property
+    def mark_page_script(self) -> str:
+        def load():
+            with open(MARK_PAGE_SCRIPT_PATH) as f:
+                return f.read()
+        return self._once("mark_page_script", load)
+
+    @property
+    def graph(self):
+        """
+        The compiled VisionGraph; it holds no per-run state and is shared by all runs.
+        """
+        def load():
+            from graph import VisionGraph
+            compiled = VisionGraph().compile_graph()
+            if compiled is None:
+                raise RuntimeError("VisionGraph failed to compile")
+            return compiled
+        return self._once("graph", load)
+
+    def warm(self) -> Dict[str, float]:
+        """
+        Loads every resource and builds the node chains now, e.g. when a worker boots,
+        instead of on the first run.
+
+        Returns:
+            Dict[str, float]: Seconds spent per resource (0 for already loaded ones).
+        """
+        timings = {}
+        for name in ("mark_page_script", "graph"):
+            warm_start = time.perf_counter()
+            getattr(self, name)
+            timings[name] = time.perf_counter() - warm_start
+
+        # Chains of every role and observation on their configured tier; escalation
+        # chains are built on first use
+        import nodes
+        warm_start = time.perf_counter()
+        for role in nodes.VALIDATORS:
+            for text in (False, True):
+                nodes.build_chain(role, text)
+        timings["chains"] = time.perf_counter() - warm_start
+        metrics.observe("runtime.load.chains", timings["chains"])
+        return timings
+
+    def stats(self) -> dict:
+        """
+        Reports which resources are loaded and how long loading them took.
+
+        Returns:
+            dict: Runtime statistics.
+        """
+        timings = metrics.snapshot()["timings"]
+        return {
+            "loaded": sorted(self._resources),
+            "load_time": {
+                name[len("runtime.load."):]: timing
+                for name, timing in timings.items()
+                if name.startswith("runtime.load.")
+            },
+        }
+
+
+_runtime = Runtime()
+
+
+def get_runtime() -> Runtime:
+    """
+    Returns the process-wide runtime.
+
+    Returns:
+        Runtime: The shared runtime.
+    """
+    return _runtime
@@ -0,0 +1,186 @@
+import base64
+import io
+import time
+from typing import Optional, TypedDict
+
+from playwright.async_api import Page
+
+from constants import (
+    SCREENSHOT_FORMAT,
+    SCREENSHOT_QUALITY,
+    SCREENSHOT_MAX_WIDTH,
+    SCREENSHOT_MAX_HEIGHT,
+    SCREENSHOT_SCALE,
+    SCREENSHOT_GRAYSCALE,
+    SCREENSHOT_CLIP_VIEWPORT,
+)
+from metrics import get_metrics
+from logger import get_logger
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is only needed for WebP, grayscale and downscaling
+    Image = None
+
+logger = get_logger()
+metrics = get_metrics()
+
+MIME_TYPES = {
+    "png": "image/png",
+    "jpeg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+# Formats Playwright can encode itself, without a decode/re-encode pass
+NATIVE_FORMATS = {"png", "jpeg"}
+
+
+class EncodedScreenshot(TypedDict):
+    """
+    A screenshot encoded for the vision prompt.
+
+    Attributes:
+        data (str): Base64-encoded image.
+        mime (str): MIME type of the image, used in the data URL.
+        bytes (int): Size of the encoded image before base64.
+        width (Optional[int]): Image width in pixels, when known.
+        height (Optional[int]): Image height in pixels, when known.
+    """
+    data: str
+    mime: str
+    bytes: int
+    width: Optional[int]
+    height: Optional[int]
+
+
+class ScreenshotEncoder:
+    """
+    Captures a page screenshot and encodes it for the vision prompt.
+
+    Playwright encodes PNG and JPEG directly. Pillow is only used when the
+    image has to be re-encoded: WebP output, grayscale, or downscaling an image
+    larger than the target dimensions. Without Pillow those options are skipped
+    and the native encoding is used instead.
+
+    Attributes:
+        format (str): "png", "jpeg" or "webp".
+        quality (int): JPEG/WebP quality (1-100).
+        max_width (int): Maximum image width; 0 disables downscaling.
+        max_height (int): Maximum image height; 0 disables downscaling.
+        scale (str): "css" for one pixel per CSS pixel, "device" for device pixels.
+        grayscale (bool): Whether to drop colour information.
+        clip_viewport (bool): Whether to clip the capture to the viewport size.
+    """
+
+    def __init__(
+        self,
+        format: str = SCREENSHOT_FORMAT,
+        quality: int = SCREENSHOT_QUALITY,
+        max_width: int = SCREENSHOT_MAX_WIDTH,
+        max_height: int = SCREENSHOT_MAX_HEIGHT,
+        scale: str = SCREENSHOT_SCALE,
+        grayscale: bool = SCREENSHOT_GRAYSCALE,
+        clip_viewport: bool = SCREENSHOT_CLIP_VIEWPORT,
+    ):
+        self.format = format.lower().replace("jpg", "jpeg")
+        if self.format not in MIME_TYPES:
+            raise ValueError(f"Unsupported screenshot format: {format}")
+        self.quality = max(1, min(100, quality))
+        self.max_width = max(0, max_width)
+        self.max_height = max(0, max_height)
+        self.scale = scale
+        self.grayscale = grayscale
+        self.clip_viewport = clip_viewport
+
+        if Image is None and (self.format not in NATIVE_FORMATS or self.grayscale):
+            logger.warning(
+                "[SCREENSHOT] Pillow is not installed; falling back to jpeg without "
+                "grayscale or downscaling"
+            )
+            self.format = "jpeg" if self.format not in NATIVE_FORMATS else self.format
+            self.grayscale = False
+
+    async def capture(self, page: Page) -> EncodedScreenshot:
+        """
+        Takes a screenshot of the page and encodes it.
+
+        Args:
+            page (Page): The page to capture.
+
+        Returns:
+            EncodedScreenshot: The encoded image and its metadata.
+        """
+        viewport = page.viewport_size
+        native_format = self.format if self.format in NATIVE_FORMATS else "png"
+        options = {"type": native_format, "scale": self.scale}
+        if native_format == "jpeg":
+            # Re-encoded images are decoded again, so only the final pass is lossy
+            options["quality"] = 100 if self._needs_reencode(viewport) else self.quality
+        if self.clip_viewport and viewport:
+            options["clip"] = {"x": 0, "y": 0, "width": viewport["width"], "height": viewport["height"]}
+
+        phase_start = time.perf_counter()
+        raw = await page.screenshot(**options)
+        metrics.observe("screenshot.capture", time.perf_counter() - phase_start)
+
+        width = height = None
+        if viewport and self.scale == "css":
+            width, height = viewport["width"], viewport["height"]
+
+        if self._needs_reencode(viewport):
+            phase_start = time.perf_counter()
+            raw, width, height = self._reencode(raw)
+            metrics.observe("screenshot.reencode", time.perf_counter() - phase_start)
+
+        metrics.observe("screenshot.bytes", len(raw))
+        return {
+            "data": base64.b64encode(raw).decode(),
+            "mime": MIME_TYPES[self.format],
+            "bytes": len(raw),
+            "width": width,
+            "height": height,
+        }
+
+    def _needs_reencode(self, viewport: Optional[dict]) -> bool:
+        if Image is None:
+            return False
+        if self.format not in NATIVE_FORMATS or self.grayscale:
+            return True
+        if not (self.max_width or self.max_height):
+            return False
+        if not viewport or self.scale != "css":
+            # Device pixel size is unknown until the image is decoded
+            return True
+        return (
+            bool(self.max_width) and viewport["width"] > self.max_width
+            or bool(self.max_height) and viewport["height"] > self.max_height
+        )
+
+    def _reencode(self, raw: bytes):
+        image = Image.open(io.BytesIO(raw))
+        image = image.convert("L" if self.grayscale else "RGB")
+        if self.max_width or self.max_height:
+            image.thumbnail(
+                (self.max_width or image.width, self.max_height or image.height),
+                Image.LANCZOS,
+            )
+
+        buffer = io.BytesIO()
+        if self.format == "png":
+            image.save(buffer, format="PNG", optimize=True)
+        else:
+            image.save(buffer, format=self.format.upper(), quality=self.quality)
+        return buffer.getvalue(), image.width, image.height
+
+
+_encoder: Optional[ScreenshotEncoder] = None
+
+
+def get_screenshot_encoder() -> ScreenshotEncoder:
+    """
+    Returns the process-wide screenshot encoder built from the configured constants.
+    """
+    global _encoder
+    if _encoder is None:
+        _encoder = ScreenshotEncoder()
+    return _encoder
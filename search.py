@@ -0,0 +1,220 @@
+import base64
+import re
+import time
+from typing import Dict, List, Optional, TypedDict
+from urllib.parse import parse_qs, quote_plus, urlparse
+
+from constants import SEARCH_ENGINE, SEARCH_MAX_RESULTS, SEARCH_SNIPPET_MAX_CHARS
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+
+class SearchEngine(TypedDict):
+    """
+    Results page of a search engine and the selectors of its result list.
+
+    Attributes:
+        url (str): Results URL with a `{query}` placeholder.
+        result (str): Selector of one organic result.
+        title (str): Selector of the result link within a result.
+        snippet (str): Selector of the result snippet within a result.
+        answer (str): Selector of the instant answer box, if the engine has one.
+    """
+    url: str
+    result: str
+    title: str
+    snippet: str
+    answer: str
+
+
+class SearchResult(TypedDict):
+    title: str
+    url: str
+    snippet: str
+
+
+class SearchOutcome(TypedDict):
+    """
+    Parsed results page.
+
+    Attributes:
+        query (str): The search query.
+        url (str): URL of the results page.
+        results (List[SearchResult]): Organic results in page order.
+        answer (str): Text of the instant answer box, or "".
+    """
+    query: str
+    url: str
+    results: List[SearchResult]
+    answer: str
+
+
+SEARCH_ENGINES: Dict[str, SearchEngine] = {
+    # The HTML endpoint renders results server-side, without the JavaScript app
+    "duckduckgo": {
+        "url": "https://html.duckduckgo.com/html/?q={query}",
+        "result": ".result:not(.result--ad)",
+        "title": ".result__a",
+        "snippet": ".result__snippet",
+        "answer": ".zci__body, .zci",
+    },
+    "bing": {
+        "url": "https://www.bing.com/search?q={query}",
+        "result": "#b_results > li.b_algo",
+        "title": "h2 a",
+        "snippet": ".b_caption p, .b_lineclamp2, .b_lineclamp3",
+        "answer": "#b_results > li.b_ans .b_focusTextLarge, #b_results > li.b_ans .b_focusTextMedium",
+    },
+}
+
+# Parses the result list in one round trip. When the engine's selectors match nothing
+# (markup changes, unknown engines), results are taken from heading links instead.
+SERP_EXPRESSION = """({engine, maxResults, maxSnippetChars}) => {
+    const fold = (text) => (text || "").replace(/\\s+/g, " ").trim();
+    const cap = (text) => text.length > maxSnippetChars ? text.slice(0, maxSnippetChars - 1).trimEnd() + "…" : text;
+    const BOILERPLATE = "nav, header, footer, aside, form, [role=navigation], [role=banner], [role=contentinfo]";
+
+    const results = [];
+    const seen = new Set();
+    const add = (link, container, snippetElement) => {
+        if (!link || !link.href || seen.has(link.href) || results.length >= maxResults) return;
+        const title = fold(link.innerText);
+        if (!title) return;
+        let snippet = fold(snippetElement ? snippetElement.innerText : "");
+        if (!snippet && container) snippet = fold(container.innerText.replace(link.innerText, ""));
+        seen.add(link.href);
+        results.push({title, url: link.href, snippet: cap(snippet)});
+    };
+
+    if (engine.result) {
+        for (const container of document.querySelectorAll(engine.result)) {
+            add(container.querySelector(engine.title), container, container.querySelector(engine.snippet));
+        }
+    }
+    if (!results.length) {
+        for (const link of document.querySelectorAll("h2 a[href], h3 a[href]")) {
+            if (link.closest(BOILERPLATE)) continue;
+            const container = link.closest("article, li, [data-testid=result], .result, .g") || link.parentElement.parentElement;
+            add(link, container, container && container.querySelector("p"));
+        }
+    }
+
+    const answerSelector = [engine.answer, "[data-testid=zci-answer]", ".answer"].filter(Boolean).join(", ");
+    const answerElement = document.querySelector(answerSelector);
+    return {results, answer: answerElement ? cap(fold(answerElement.innerText)) : ""};
+}"""
+
+_URL_IN_TASK = re.compile(r"https?://|\bwww\.", re.IGNORECASE)
+
+
+def register_engine(name: str, engine: SearchEngine):
+    """
+    Adds or replaces a search engine, e.g. a local results page for offline benchmarks.
+    """
+    SEARCH_ENGINES[name] = engine
+
+
+def search_url(query: str, engine: str = SEARCH_ENGINE) -> str:
+    return SEARCH_ENGINES[engine]["url"].format(query=quote_plus(query))
+
+
+def clean_result_url(url: str) -> str:
+    """
+    Unwraps the redirect links search engines put on their results.
+
+    Args:
+        url (str): Result link as found on the results page.
+
+    Returns:
+        str: The destination URL.
+    """
+    parsed = urlparse(url)
+    params = parse_qs(parsed.query)
+    host = parsed.netloc.lower()
+    if host.endswith("duckduckgo.com") and parsed.path.startswith("/l/") and "uddg" in params:
+        return params["uddg"][0]
+    if host.endswith("bing.com") and parsed.path.startswith("/ck/") and params.get("u", [""])[0].startswith("a1"):
+        encoded = params["u"][0][2:]
+        try:
+            return base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode()
+        except (ValueError, UnicodeDecodeError):
+            return url
+    if host.startswith("www.google.") and parsed.path == "/url" and "q" in params:
+        return params["q"][0]
+    return url
+
+
+def should_search(task: str) -> bool:
+    """
+    Whether a task is best started from a results page; tasks naming a URL are not.
+    """
+    return bool(task and task.strip()) and not _URL_IN_TASK.search(task)
+
+
+async def parse_serp(page, engine: str = SEARCH_ENGINE, max_results: int = SEARCH_MAX_RESULTS) -> dict:
+    """
+    Parses the results page open in `page` into structured results.
+
+    Args:
+        page (Page): Playwright page showing a results page.
+        engine (str): Key of the engine in SEARCH_ENGINES.
+        max_results (int): Maximum number of results.
+
+    Returns:
+        dict: "results" (title, url, snippet per result) and "answer".
+    """
+    parse_start = time.perf_counter()
+    parsed = await page.evaluate(SERP_EXPRESSION, {
+        "engine": SEARCH_ENGINES.get(engine, {}),
+        "maxResults": max_results,
+        "maxSnippetChars": SEARCH_SNIPPET_MAX_CHARS,
+    })
+    metrics.observe("search.parse", time.perf_counter() - parse_start)
+    for result in parsed["results"]:
+        result["url"] = clean_result_url(result["url"])
+    return parsed
+
+
+async def search(page, query: str, engine: str = SEARCH_ENGINE) -> SearchOutcome:
+    """
+    Opens the results page for a query and parses it.
+
+    Args:
+        page (Page): Playwright page to load the results page in.
+        query (str): The search query.
+        engine (str): Key of the engine in SEARCH_ENGINES.
+
+    Returns:
+        SearchOutcome: The parsed results page.
+    """
+    url = search_url(query, engine)
+    await page.goto(url, timeout=60000, wait_until="domcontentloaded")
+    parsed = await parse_serp(page, engine)
+    metrics.increment("search.queries")
+    logger.info(f"[SEARCH] {len(parsed['results'])} results for '{query}'")
+    return {"query": query, "url": page.url, "results": parsed["results"], "answer": parsed["answer"]}
+
+
+def format_search(outcome: Optional[SearchOutcome]) -> str:
+    """
+    Renders search results as a compact numbered list for the prompt.
+
+    Args:
+        outcome (Optional[SearchOutcome]): The parsed results page.
+
+    Returns:
+        str: The list, or "" without results.
+    """
+    if not outcome or not (outcome["results"] or outcome["answer"]):
+        return ""
+    lines = [f"Search results for '{outcome['query']}':"]
+    if outcome["answer"]:
+        lines.append(f"Answer box: {outcome['answer']}")
+    for number, result in enumerate(outcome["results"], 1):
+        lines.append(f"{number}. {result['title']} | {result['url']}")
+        if result["snippet"]:
+            lines.append(f"   {result['snippet']}")
+    return "\n".join(lines)
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Optional
+
+from constants import MAX_CONCURRENT_SESSIONS
+from main import WebVision, create_browser_pool
+from llm_runtime import in_flight_stats
+from nodes import preflight_stats, router
+from runtime import get_runtime
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+
+class AgentLoop:
+    """
+    One long-lived asyncio event loop per worker process, shared by all WebVision runs.
+
+    The loop runs in a daemon thread, so synchronous web handlers (Flask threads,
+    gunicorn gthread workers) submit runs to it and wait on the returned future while
+    many agent sessions progress concurrently on the same loop and browser pool.
+
+    Attributes:
+        max_sessions (int): Maximum number of agent sessions running at once.
+        browser_pool (BrowserPool): Browser pool owned by this loop.
+    """
+
+    def __init__(self, max_sessions: int = MAX_CONCURRENT_SESSIONS):
+        self.max_sessions = max(1, max_sessions)
+        self.browser_pool = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._ready = threading.Event()
+        self._active = 0
+        self._waiting = 0
+
+    def start(self):
+        """
+        Starts the event loop thread and the browser pool.
+        """
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="agent-loop", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+        # Graph, chains and scripts are loaded at boot rather than by the first query
+        warm_times = get_runtime().warm()
+        logger.debug(f"[LOOP] Runtime warmed: {warm_times}")
+
+        self.browser_pool = create_browser_pool()
+        asyncio.run_coroutine_threadsafe(self.browser_pool.start(), self._loop).result()
+        logger.debug(f"[LOOP] Agent loop started with max {self.max_sessions} concurrent sessions")
+
+    def stop(self):
+        """
+        Closes the browser pool and stops the event loop thread.
+        """
+        if not self._loop:
+            return
+        if self.browser_pool:
+            asyncio.run_coroutine_threadsafe(self.browser_pool.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop = None
+        logger.debug("[LOOP] Agent loop stopped")
+
+    def submit(self, task: str, session_id: str = "1234", customer_id: str = "123",
+               session_dao: Any = None, push_update: Any = None,
+               observation_mode: Optional[str] = None) -> Future:
+        """
+        Schedules a WebVision run on the shared loop.
+
+        Args:
+            task (str): The task description to be executed.
+            session_id (str): Unique session identifier.
+            customer_id (str): Unique customer identifier.
+            session_dao (Any): Data access object for managing session data.
+            push_update (Any): Mechanism to push updates.
+            observation_mode (Optional[str]): "vision" or "text"; defaults to OBSERVATION_MODE.
+
+        Returns:
+            Future: Resolves to the RunResult returned by WebVision.run.
+        """
+        if not self._loop:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(
+            self._run_session(task, session_id, customer_id, session_dao, push_update, observation_mode),
+            self._loop,
+        )
+
+    def responsive(self, timeout: float) -> bool:
+        """
+        Whether the event loop runs a scheduled callback within `timeout` seconds.
+
+        A loop wedged by a blocking call or a busy coroutine never gets to it, even
+        though other threads of the process (e.g. a heartbeat thread) keep running.
+
+        Args:
+            timeout (float): Seconds to wait for the loop.
+
+        Returns:
+            bool: False if the loop is stopped or did not respond in time.
+        """
+        if not self._loop or not self._loop.is_running():
+            return False
+        ran = threading.Event()
+        self._loop.call_soon_threadsafe(ran.set)
+        return ran.wait(timeout)
+
+    def stats(self) -> dict:
+        """
+        Reports session concurrency and browser pool statistics.
+
+        Returns:
+            dict: Loop statistics.
+        """
+        return {
+            "pid": os.getpid(),
+            "max_sessions": self.max_sessions,
+            "active_sessions": self._active,
+            "waiting_sessions": self._waiting,
+            "browser_pool": self.browser_pool.stats() if self.browser_pool else None,
+            "llm": in_flight_stats(),
+            "models": router.stats(),
+            "preflight": preflight_stats(),
+            "runtime": get_runtime().stats(),
+        }
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_sessions)
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _run_session(self, task, session_id, customer_id, session_dao, push_update, observation_mode):
+        wait_start = time.perf_counter()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        metrics.observe("sessions.queue_wait", time.perf_counter() - wait_start)
+
+        self._active += 1
+        try:
+            web_vision = WebVision(
+                session_id, customer_id, session_dao, push_update,
+                browser_pool=self.browser_pool,
+                observation_mode=observation_mode,
+            )
+            return await web_vision.run(task)
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+
+_agent_loop: Optional[AgentLoop] = None
+_agent_loop_pid: Optional[int] = None
+_agent_loop_lock = threading.Lock()
+
+
+def get_agent_loop() -> AgentLoop:
+    """
+    Returns the agent loop of the current process, starting it on first use.
+
+    The loop is created lazily and per PID so that pre-forking servers do not
+    share an event loop or browsers across worker processes.
+
+    Returns:
+        AgentLoop: The started agent loop.
+    """
+    global _agent_loop, _agent_loop_pid
+    with _agent_loop_lock:
+        if _agent_loop is None or _agent_loop_pid != os.getpid():
+            _agent_loop = AgentLoop()
+            _agent_loop.start()
+            _agent_loop_pid = os.getpid()
+        return _agent_loop
@@ -1,8 +0,0 @@
-final_response = None
-
-def set_response(r): 
-    global final_response 
-    final_response = r
-
-def get_response(): 
-    return final_response
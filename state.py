@@ -3,6 +3,7 @@ from typing_extensions import List, Optional, TypedDict
 
 from langchain_core.messages import BaseMessage, SystemMessage
 from playwright.async_api import Page
+from pydantic import BaseModel, Field
 import os, sys
 
 
@@ -36,6 +37,7 @@ class AgentState(TypedDict):
         page (Page): The current Playwright page instance the agent is interacting with.
         task (str): The specific task or instruction assigned to the agent.
         img (str): Image data associated with the task, if provided (e.g., from LangChain Hub).
+        img_mime (Optional[str]): MIME type of `img` (e.g., "image/jpeg"), used in the image data URL.
         bboxes (List[BBox]): List of bounding boxes detected within the image or document context.
         history (str): A cumulative log of all actions, thoughts, and outputs generated by the agent.
         profile (TargetProfile): Target-specific metadata or configuration required for task execution.
@@ -50,10 +52,29 @@ class AgentState(TypedDict):
         page_load_status (Optional[str]): Status of the page load (e.g., "success", "timeout", "failed").
         thoughts (Optional[str]): Agent's internal reasoning or decision-making notes at the current step.
         insights (Optional[str]): Key takeaways, patterns, or useful knowledge derived during task execution.
+        page_changed (Optional[bool]): False when the page looks the same as in the previous step
+            (screenshot, URL and marked elements), i.e. the last action had no visible effect.
+        changed_region (Optional[dict]): Region of the screenshot that changed since the previous step,
+            as fractions of the screenshot ("x", "y", "width", "height").
+        page_snapshot (Any): Compact snapshot of the page used for change detection in the next step.
+        insights_source (Optional[str]): Hash of the page text the last insight was generated from.
+        observation_mode (Optional[str]): Requested observation mode of the run ("vision" or "text").
+        observation (Optional[str]): Observation actually used in the current step; "text" steps
+            fall back to "vision" when the outline is insufficient.
+        outline (Optional[str]): Text outline of the page for "text" observations.
+        search (Optional[dict]): Latest parsed search results page: query, url, results (title, url,
+            snippet) and the instant answer text (see search.py).
+        direct_answer (Optional[bool]): Whether the pre-flight check found the task answered by the
+            search results page, so the run skipped the agent loop.
+        fanout_sources (Optional[List[dict]]): Search results ("url", "title") requested by
+            ReadTopResults, read in parallel at the end of the step's tool calls.
+        memory (Optional[dict]): Bounded memory behind history, thoughts and insights: per field,
+            a summary of older entries and the recent entries verbatim (see memory.py).
     """
     page: Page
     task: str
     img: str
+    img_mime: Optional[str]
     bboxes: List[BBox]
     history: str
     nonce: str
@@ -66,4 +87,49 @@ class AgentState(TypedDict):
     page_load_status: Optional[str] = None
     thoughts: Optional[str] = ""
     insights: Optional[str] = ""
-    VISITED_WEBSITES: Optional[str] = ""
\ No newline at end of file
+    VISITED_WEBSITES: Optional[str] = ""
+    page_changed: Optional[bool] = None
+    changed_region: Optional[dict] = None
+    page_snapshot: Any = None
+    insights_source: Optional[str] = None
+    observation_mode: Optional[str] = None
+    observation: Optional[str] = None
+    outline: Optional[str] = None
+    search: Optional[dict] = None
+    direct_answer: Optional[bool] = None
+    fanout_sources: Optional[List[dict]] = None
+    memory: Optional[dict] = None
+
+
+def task_as_text(task: Any) -> str:
+    """
+    Returns a task as plain text. Runs hold it as a list of messages (see `WebVision`),
+    helpers that rank or search by the task need its words.
+    """
+    if isinstance(task, list):
+        return " ".join(str(getattr(message, "content", message)) for message in task)
+    return str(task or "")
+
+
+class RunResult(BaseModel):
+    """
+    Result of a single WebVision run, owned by that run and never shared between runs.
+
+    Attributes:
+        nonce (str): Unique identifier of the run that produced this result.
+        task (str): The task that was executed.
+        answer (Optional[str]): Final answer produced by the agent, if any.
+        errors (Optional[str]): Errors reported by the agent or raised while running it.
+        steps (int): Number of graph steps taken.
+        visited_websites (Optional[str]): JSON log of websites visited during the run.
+        execution_time (float): Wall-clock duration of the run in seconds.
+        metadata (dict): Additional run information (timings, session identifiers).
+    """
+    nonce: str
+    task: str
+    answer: Optional[str] = None
+    errors: Optional[str] = None
+    steps: int = 0
+    visited_websites: Optional[str] = None
+    execution_time: float = 0.0
+    metadata: dict = Field(default_factory=dict)
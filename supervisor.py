@@ -0,0 +1,416 @@
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+from typing import Any, Dict, Optional
+
+from constants import (
+    WORKER_PROCESSES,
+    WORKER_START_METHOD,
+    WORKER_HEARTBEAT_INTERVAL,
+    WORKER_HEARTBEAT_TIMEOUT,
+    WORKER_STARTUP_TIMEOUT,
+    MAX_CONCURRENT_SESSIONS,
+)
+from metrics import get_metrics
+from logger import get_logger
+
+logger = get_logger()
+metrics = get_metrics()
+
+
+class WorkerCrashedError(RuntimeError):
+    """Raised for runs that were in flight on a worker process that died or hung."""
+
+
+def _worker_main(worker_id: int, conn, max_sessions: int, heartbeat_interval: float):
+    """
+    Entry point of a worker process: owns one AgentLoop (event loop, Playwright and
+    browser pool) and executes the runs dispatched to it over `conn`.
+
+    Messages received: ("run", request_id, payload), ("cancel", request_id, None), None to stop.
+    Messages sent: ("ready" | "heartbeat", None, stats), ("event", request_id, event),
+    ("result", request_id, (RunResult | None, error | None)).
+    """
+    from serving import AgentLoop
+
+    send_lock = threading.Lock()
+    stopped = threading.Event()
+
+    def send(message):
+        with send_lock:
+            conn.send(message)
+
+    agent_loop = AgentLoop(max_sessions)
+    agent_loop.start()
+    send(("ready", None, agent_loop.stats()))
+
+    def heartbeat():
+        # Heartbeats vouch for the agent loop, not just this thread: while the loop is
+        # wedged none are sent, so the supervisor's heartbeat timeout replaces the worker
+        while not stopped.wait(heartbeat_interval):
+            if not agent_loop.responsive(heartbeat_interval):
+                logger.warning(f"[SUPERVISOR] Worker {worker_id} event loop unresponsive, skipping heartbeat")
+                metrics.increment("worker.loop_unresponsive")
+                continue
+            try:
+                send(("heartbeat", None, agent_loop.stats()))
+            except (OSError, EOFError):
+                return
+
+    threading.Thread(target=heartbeat, name="worker-heartbeat", daemon=True).start()
+
+    futures: Dict[int, Future] = {}
+
+    def on_done(request_id: int, future: Future):
+        futures.pop(request_id, None)
+        if future.cancelled():
+            outcome = (None, "Run was cancelled")
+        elif future.exception() is not None:
+            outcome = (None, f"{type(future.exception()).__name__}: {future.exception()}")
+        else:
+            outcome = (future.result(), None)
+        try:
+            send(("result", request_id, outcome))
+        except (OSError, EOFError):
+            pass
+
+    try:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                break
+            if message is None:
+                break
+
+            kind, request_id, payload = message
+            if kind == "run":
+                push = lambda event, rid=request_id: send(("event", rid, event))
+                future = agent_loop.submit(
+                    payload["task"],
+                    payload.get("session_id", "1234"),
+                    payload.get("customer_id", "123"),
+                    None,
+                    push,
+                    payload.get("observation_mode"),
+                )
+                futures[request_id] = future
+                future.add_done_callback(lambda f, rid=request_id: on_done(rid, f))
+            elif kind == "cancel" and request_id in futures:
+                futures[request_id].cancel()
+    finally:
+        stopped.set()
+        agent_loop.stop()
+
+
+class _Worker:
+    """Parent-side handle of one worker process."""
+
+    def __init__(self, worker_id: int, process, conn):
+        self.worker_id = worker_id
+        self.process = process
+        self.conn = conn
+        self.send_lock = threading.Lock()
+        self.in_flight = set()
+        self.ready = False
+        self.started_at = time.monotonic()
+        self.last_heartbeat = time.monotonic()
+        self.stats: dict = {}
+        self.completed = 0
+
+
+class WorkerSupervisor:
+    """
+    Supervises N worker processes, each with its own Playwright instance and browser pool.
+
+    Runs are dispatched to the least-loaded healthy worker; progress events and results
+    are relayed back over per-worker pipes. Workers that exit or stop sending heartbeats
+    are restarted, and their in-flight runs fail with WorkerCrashedError.
+
+    Exposes the same `submit` / `stats` / `stop` interface as AgentLoop.
+
+    Attributes:
+        num_workers (int): Number of worker processes.
+        max_sessions (int): Concurrent agent sessions allowed per worker.
+        heartbeat_interval (float): Seconds between worker heartbeats.
+        heartbeat_timeout (float): Seconds without a heartbeat before a worker is restarted.
+    """
+
+    def __init__(
+        self,
+        num_workers: int = WORKER_PROCESSES,
+        max_sessions: int = MAX_CONCURRENT_SESSIONS,
+        heartbeat_interval: float = WORKER_HEARTBEAT_INTERVAL,
+        heartbeat_timeout: float = WORKER_HEARTBEAT_TIMEOUT,
+        start_method: str = WORKER_START_METHOD,
+    ):
+        self.num_workers = max(1, num_workers)
+        self.max_sessions = max_sessions
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self._mp = multiprocessing.get_context(start_method)
+        self._workers: Dict[int, _Worker] = {}
+        self._pending: Dict[int, tuple] = {}
+        self._lock = threading.RLock()
+        self._request_ids = itertools.count(1)
+        self._stopped = threading.Event()
+        self._threads = []
+        self._restarts = 0
+
+    def start(self):
+        """
+        Spawns the worker processes and the listener and health-check threads.
+        """
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+
+        for target, name in ((self._listen, "supervisor-listener"), (self._monitor, "supervisor-monitor")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.debug(f"[SUPERVISOR] Started {self.num_workers} worker process(es)")
+
+    def stop(self):
+        """
+        Asks every worker to shut down and waits for them to exit.
+        """
+        self._stopped.set()
+        with self._lock:
+            workers = list(self._workers.values())
+        for worker in workers:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(None)
+            except (OSError, EOFError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=30)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        logger.debug("[SUPERVISOR] All workers stopped")
+
+    def submit(self, task: str, session_id: str = "1234", customer_id: str = "123",
+               session_dao: Any = None, push_update: Any = None,
+               observation_mode: Optional[str] = None) -> Future:
+        """
+        Dispatches a run to the least-loaded healthy worker.
+
+        `session_dao` cannot cross process boundaries and is not forwarded; `push_update`
+        is called in this process for every event the worker relays.
+
+        Args:
+            task (str): The task description to be executed.
+            session_id (str): Unique session identifier.
+            customer_id (str): Unique customer identifier.
+            session_dao (Any): Unused, kept for interface compatibility with AgentLoop.
+            push_update (Any): Callback receiving progress events.
+            observation_mode (Optional[str]): "vision" or "text"; defaults to OBSERVATION_MODE.
+
+        Returns:
+            Future: Resolves to the RunResult produced by the worker.
+        """
+        future = Future()
+        request_id = next(self._request_ids)
+        payload = {
+            "task": task,
+            "session_id": session_id,
+            "customer_id": customer_id,
+            "observation_mode": observation_mode,
+        }
+
+        with self._lock:
+            worker = self._least_loaded()
+            if worker is None:
+                future.set_exception(RuntimeError("No healthy worker process available"))
+                return future
+            worker.in_flight.add(request_id)
+            self._pending[request_id] = (future, push_update, worker.worker_id)
+
+        try:
+            with worker.send_lock:
+                worker.conn.send(("run", request_id, payload))
+        except (OSError, EOFError) as e:
+            self._fail(request_id, WorkerCrashedError(f"Worker {worker.worker_id} unreachable: {e}"))
+            return future
+
+        metrics.increment(f"supervisor.dispatched.worker_{worker.worker_id}")
+        future.add_done_callback(lambda f: f.cancelled() and self._cancel(request_id))
+        return future
+
+    def stats(self) -> dict:
+        """
+        Reports per-worker health, load and the last stats each worker sent.
+
+        Returns:
+            dict: Supervisor statistics.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "workers": [
+                    {
+                        "worker_id": worker.worker_id,
+                        "pid": worker.process.pid,
+                        "alive": worker.process.is_alive(),
+                        "ready": worker.ready,
+                        "in_flight": len(worker.in_flight),
+                        "completed": worker.completed,
+                        "seconds_since_heartbeat": round(now - worker.last_heartbeat, 2),
+                        "uptime": round(now - worker.started_at, 2),
+                        "loop": worker.stats,
+                    }
+                    for worker in self._workers.values()
+                ],
+                "pending": len(self._pending),
+                "restarts": self._restarts,
+            }
+
+    def _spawn(self, worker_id: int):
+        parent_conn, child_conn = self._mp.Pipe(duplex=True)
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(worker_id, child_conn, self.max_sessions, self.heartbeat_interval),
+            name=f"webvision-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        with self._lock:
+            self._workers[worker_id] = _Worker(worker_id, process, parent_conn)
+        logger.debug(f"[SUPERVISOR] Spawned worker {worker_id} (pid {process.pid})")
+
+    def _least_loaded(self) -> Optional[_Worker]:
+        healthy = [w for w in self._workers.values() if w.ready and w.process.is_alive()]
+        if not healthy:
+            healthy = [w for w in self._workers.values() if w.process.is_alive()]
+        if not healthy:
+            return None
+        return min(healthy, key=lambda w: (len(w.in_flight), w.worker_id))
+
+    def _listen(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                conns = {worker.conn: worker for worker in self._workers.values()}
+            try:
+                ready = wait(list(conns), timeout=self.heartbeat_interval)
+            except (OSError, ValueError):
+                # A connection was closed by a concurrent restart; rebuild the set
+                continue
+            for conn in ready:
+                worker = conns[conn]
+                try:
+                    kind, request_id, payload = conn.recv()
+                except (EOFError, OSError):
+                    self._restart(worker, "connection closed")
+                    continue
+                self._handle(worker, kind, request_id, payload)
+
+    def _handle(self, worker: _Worker, kind: str, request_id: Optional[int], payload):
+        if kind in ("ready", "heartbeat"):
+            worker.ready = True
+            worker.last_heartbeat = time.monotonic()
+            worker.stats = payload
+            return
+
+        with self._lock:
+            pending = self._pending.get(request_id)
+        if pending is None:
+            return
+        future, push_update, _ = pending
+
+        if kind == "event":
+            if callable(push_update):
+                try:
+                    push_update(payload)
+                except Exception as e:
+                    logger.warning(f"[SUPERVISOR] push_update failed: {e}")
+        elif kind == "result":
+            result, error = payload
+            with self._lock:
+                self._pending.pop(request_id, None)
+                worker.in_flight.discard(request_id)
+                worker.completed += 1
+            if future.done():
+                return
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result(result)
+
+    def _monitor(self):
+        while not self._stopped.wait(self.heartbeat_interval):
+            now = time.monotonic()
+            with self._lock:
+                workers = list(self._workers.values())
+            for worker in workers:
+                if not worker.process.is_alive():
+                    self._restart(worker, f"exited with code {worker.process.exitcode}")
+                elif not worker.ready:
+                    if now - worker.started_at > WORKER_STARTUP_TIMEOUT:
+                        self._restart(worker, f"not ready after {WORKER_STARTUP_TIMEOUT:.0f} seconds")
+                elif now - worker.last_heartbeat > self.heartbeat_timeout:
+                    self._restart(worker, f"no heartbeat for {now - worker.last_heartbeat:.1f} seconds")
+
+    def _restart(self, worker: _Worker, reason: str):
+        with self._lock:
+            if self._stopped.is_set() or self._workers.get(worker.worker_id) is not worker:
+                return
+            self._restarts += 1
+            in_flight = list(worker.in_flight)
+            worker.in_flight.clear()
+
+        logger.error(f"[SUPERVISOR] Restarting worker {worker.worker_id}: {reason}")
+        metrics.increment("supervisor.restarts")
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=5)
+        worker.conn.close()
+
+        for request_id in in_flight:
+            self._fail(request_id, WorkerCrashedError(f"Worker {worker.worker_id} {reason}"))
+        self._spawn(worker.worker_id)
+
+    def _fail(self, request_id: int, error: Exception):
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+            for worker in self._workers.values():
+                worker.in_flight.discard(request_id)
+        if pending and not pending[0].done():
+            pending[0].set_exception(error)
+
+    def _cancel(self, request_id: int):
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+            worker = self._workers.get(pending[2]) if pending else None
+            if worker:
+                worker.in_flight.discard(request_id)
+        if worker:
+            try:
+                with worker.send_lock:
+                    worker.conn.send(("cancel", request_id, None))
+            except (OSError, EOFError):
+                pass
+
+
+_supervisor: Optional[WorkerSupervisor] = None
+_supervisor_lock = threading.Lock()
+
+
+def get_supervisor() -> WorkerSupervisor:
+    """
+    Returns the process-wide worker supervisor, starting it on first use.
+
+    Returns:
+        WorkerSupervisor: The started supervisor.
+    """
+    global _supervisor
+    with _supervisor_lock:
+        if _supervisor is None:
+            _supervisor = WorkerSupervisor()
+            _supervisor.start()
+        return _supervisor
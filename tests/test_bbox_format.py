@@ -0,0 +1,26 @@
+from langchain_core.messages import HumanMessage
+
+from bbox_format import TABLE_HEADER, format_bboxes
+
+BBOXES = [
+    {"x": 10, "y": 10, "type": "a", "text": "Home", "ariaLabel": ""},
+    {"x": 10, "y": 400, "type": "a", "text": "Cheap flights to Lisbon", "ariaLabel": ""},
+]
+
+
+def test_rows_are_ranked_by_a_plain_text_task():
+    table = format_bboxes(BBOXES, "Find flights to Lisbon").splitlines()
+    assert table[0] == TABLE_HEADER
+    assert table[1] == "1 | a | Cheap flights to Lisbon | 10,400"
+
+
+def test_rows_are_ranked_by_the_task_as_held_in_the_state():
+    # Runs keep the task as a list of messages (see WebVision)
+    task = [HumanMessage(content="Find flights to Lisbon")]
+    table = format_bboxes(BBOXES, task).splitlines()
+    assert table[1].startswith("1 |")
+
+
+def test_identical_elements_share_a_row():
+    bboxes = BBOXES + [{"x": 300, "y": 10, "type": "a", "text": "Home", "ariaLabel": ""}]
+    assert "0,2 | a | Home" in format_bboxes(bboxes, None)
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("playwright.async_api")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import parse_serp  # noqa: E402
+from constants import SEARCH_MAX_RESULTS  # noqa: E402
+
+WEATHER_SNIPPET = "Paris weather forecast with temperature, precipitation and wind for the next 10 days."
+
+
+@pytest.fixture(scope="module")
+def parsed():
+    return asyncio.run(parse_serp.main(parse_serp.FIXTURES))
+
+
+def test_duckduckgo_results(parsed):
+    page = parsed["serp_duckduckgo.html"]
+    # The ad is skipped and redirect links are unwrapped
+    assert [result["title"] for result in page["results"]] == [
+        "Paris, France weather forecast - 10 day",
+        "Hourly weather in Paris today",
+        "Paris climate and monthly averages",
+    ]
+    assert page["results"][0] == {
+        "title": "Paris, France weather forecast - 10 day",
+        "url": "http://127.0.0.1/article.html?result=0",
+        "snippet": WEATHER_SNIPPET,
+    }
+    assert page["answer"] == "Paris, France: Partly cloudy, 18°C. Wind 12 km/h W. Humidity 64%."
+
+
+def test_bing_results(parsed):
+    page = parsed["serp_bing.html"]
+    assert [result["url"] for result in page["results"]] == [
+        "http://127.0.0.1/article.html?result=0",
+        "http://127.0.0.1/article.html?result=1",
+        "http://127.0.0.1/article.html?result=2",
+    ]
+    assert page["results"][0]["title"] == "Paris, France weather forecast - 10 day"
+    assert page["results"][0]["snippet"] == WEATHER_SNIPPET
+    assert page["results"][1]["snippet"] == "Hour-by-hour weather for Paris: temperature, feels like, rain chance and wind."
+    assert page["answer"] == "18 °C Partly cloudy"
+
+
+def test_heading_link_fallback(parsed):
+    # No selectors for this page: results come from the heading links
+    page = parsed["serp.html"]
+    assert len(page["results"]) == SEARCH_MAX_RESULTS
+    first = page["results"][0]
+    assert first["title"] == "Weather forecast for Paris, France"
+    assert first["url"].endswith("/article.html?result=0")
+    assert first["snippet"] == (
+        "Weather forecast for Paris including temperature, precipitation and wind. Updated every hour "
+        "with data from local stations and satellite observations."
+    )
+    assert page["answer"] == "Paris, France Partly cloudy, 18°C. Wind 12 km/h from the west. Humidity 64%."
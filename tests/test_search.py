@@ -0,0 +1,44 @@
+import pytest
+
+from search import clean_result_url, search_url, should_search
+
+
+@pytest.mark.parametrize("url, expected", [
+    # DuckDuckGo HTML endpoint
+    (
+        "https://duckduckgo.com/l/?uddg=http%3A%2F%2F127.0.0.1%2Farticle.html%3Fresult%3D0&rut=1a2b",
+        "http://127.0.0.1/article.html?result=0",
+    ),
+    # Bing: "a1" followed by the URL-safe base64 of the destination, without padding
+    (
+        "https://www.bing.com/ck/a?!&&p=abc&u=a1aHR0cDovLzEyNy4wLjAuMS9hcnRpY2xlLmh0bWw_cmVzdWx0PTA&ntb=1",
+        "http://127.0.0.1/article.html?result=0",
+    ),
+    # Google
+    ("https://www.google.com/url?q=https://example.com/page&sa=U", "https://example.com/page"),
+    # Direct links are kept
+    ("http://127.0.0.1/article.html?result=1", "http://127.0.0.1/article.html?result=1"),
+    # Ads and other engine links are not redirects to unwrap
+    ("https://duckduckgo.com/y.js?ad_provider=example", "https://duckduckgo.com/y.js?ad_provider=example"),
+])
+def test_clean_result_url_unwraps_redirects(url, expected):
+    assert clean_result_url(url) == expected
+
+
+def test_clean_result_url_keeps_undecodable_bing_links():
+    url = "https://www.bing.com/ck/a?u=a1%FF%FE&ntb=1"
+    assert clean_result_url(url) == url
+
+
+def test_search_url_quotes_the_query():
+    assert search_url("weather in paris", "duckduckgo") == "https://html.duckduckgo.com/html/?q=weather+in+paris"
+
+
+@pytest.mark.parametrize("task, expected", [
+    ("What is the weather in Paris?", True),
+    ("Summarise https://example.com/article", False),
+    ("Open www.example.com and find the price", False),
+    ("   ", False),
+])
+def test_should_search(task, expected):
+    assert should_search(task) is expected
@@ -14,6 +14,9 @@ from langchain.tools import StructuredTool
 from playwright.async_api import async_playwright
 
 from state import AgentState, SystemMessage
+from request_filter import get_request_filter
+from search import search as run_search, format_search
+from fanout import top_result_urls
 
 from logger import get_logger
 
@@ -45,8 +48,11 @@ async def navigate_url(state: AgentState, url: str):
 
         await page.goto(url, timeout=60000, wait_until="domcontentloaded")
         logging.info(f"Successfully navigated to {url}")
-        # Call process_http_traffic function
-        
+
+        request_filter = get_request_filter(page)
+        if request_filter:
+            logging.info(f"Request filter stats for {url}: {request_filter.last_page_stats()}")
+
         return f"Navigated to {url}"
 
     except Exception as e:
@@ -60,6 +66,67 @@ class NavigateURL(BaseModel):
     state: Any
     url: str
 
+async def search(state: AgentState, query: str):
+    """
+    Opens the search results page for a query and stores the parsed results in the state.
+
+    Args:
+        state (AgentState): The current agent state.
+        query (str): The search query.
+
+    Returns:
+        str: The results as a numbered list, or an error message.
+    """
+    try:
+        page: Page = state.get("page")
+        if not page:
+            logging.error("Page object is missing in state.")
+            return "Error: Page object not found."
+
+        outcome = await run_search(page, query)
+        state["search"] = outcome
+        return format_search(outcome) or f"No results found for '{query}'"
+
+    except Exception as e:
+        logging.exception(f"Error searching for '{query}': {e}")
+        return f"Error: Could not search for '{query}'"
+
+
+class Search(BaseModel):
+    """Model for searching the web."""
+
+    state: Any
+    query: str
+
+
+async def read_top_results(state: AgentState, count: int = 4):
+    """
+    Requests the top unvisited search results to be read in parallel.
+
+    The pages are opened, read and summarized by the execution node right after the
+    tool calls of the step, so their insights are available on the next step.
+
+    Args:
+        state (AgentState): The current agent state.
+        count (int): Number of results to read.
+
+    Returns:
+        str: Confirmation message or error.
+    """
+    sources = top_result_urls(state, count)
+    if not sources:
+        return "Error: No unvisited search results to read. Use Search first."
+    state["fanout_sources"] = sources
+    return f"Reading {len(sources)} search results in parallel: {', '.join(source['url'] for source in sources)}"
+
+
+class ReadTopResults(BaseModel):
+    """Model for reading the top search results in parallel."""
+
+    state: Any
+    count: int = Field(default=4, description="Number of top results to read (at most 8).")
+
+
 async def scroll(state: AgentState, direction: int, target: int | str):
     page = state["page"]
     scroll_amount = direction * 500 if target.upper() == "WINDOW" else direction * 400
@@ -395,6 +462,20 @@ combined_tools, tool_executor = construct_structured_tools(
             "NavigateURL",
             "Navigate directly to a URL on the web",
         ],
+        [
+            search,
+            Search,
+            "Search",
+            "Search the web for a query. Opens the results page and lists the results (title, URL, snippet); \
+            prefer this over typing into a search box",
+        ],
+        [
+            read_top_results,
+            ReadTopResults,
+            "ReadTopResults",
+            "Read the top unvisited results of the last search in parallel and collect an insight from each. \
+            Use for comparison and research tasks instead of opening results one by one",
+        ],
         [
             mark_task_complete,
             MarkTaskComplete,
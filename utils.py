@@ -1,117 +1,177 @@
-import base64
-import asyncio
-import os, sys
+import functools
+import inspect
+import sys
 import json
+import re
+import time
 from langchain_core.runnables import chain as chain_decorator
 from tools import tool_executor
 from langgraph.prebuilt import ToolInvocation
 from langchain_core.messages import ToolMessage
 
+from typing import Tuple
 
 
 
+from screenshot import get_screenshot_encoder
+from runtime import get_runtime
+from constants import MARK_PAGE_MAX_TEXT_CHARS, OUTLINE_MAX_CHARS
+from metrics import get_metrics
 from logger import get_logger
 
 
 logger = get_logger()
+metrics = get_metrics()
 
-current_dir = os.getcwd()
+# JavaScript calls made once the runtime is installed: "vision" draws the labels for the
+# screenshot, "text" numbers the same elements without drawing and outlines the page
+MARK_CALLS = {
+    "vision": f"""{{ bboxes: window.markPage({{ maxTextChars: {MARK_PAGE_MAX_TEXT_CHARS} }}),
+        stats: window.markPageStats() }}""",
+    "text": f"""{{ bboxes: window.markPage({{ maxTextChars: {MARK_PAGE_MAX_TEXT_CHARS}, draw: false }}),
+        stats: window.markPageStats(), outline: window.outlinePage({{ maxChars: {OUTLINE_MAX_CHARS} }}) }}""",
+}
 
-# Build the path to the mark_page.js script
-script_path = os.path.join(current_dir, "mark_page.js")
 
-# Open and read the script
-with open(script_path) as f:
-    mark_page_script = f.read()
-
-screenshot_list = []
+@functools.lru_cache(maxsize=None)
+def mark_expressions(mode: str) -> Tuple[str, str]:
+    """
+    Returns the two marking expressions of a mode, built once from the marking script.
 
-async def mark_page(page) -> dict:
+    The first marks the page if the runtime is installed (the usual case: registered as
+    an init script on every pooled context), otherwise returns null so the caller
+    installs it. The second installs the runtime and marks the page in the same round trip.
+    """
+    script = get_runtime().mark_page_script
+    # Version guard shared with mark_page.js; the runtime is installed at most once per page
+    version = re.search(r'MARK_PAGE_VERSION = "([^"]+)"', script).group(1)
+    call = MARK_CALLS[mode]
+    check = f"""() => window.__webvisionMarkPageVersion === "{version}" ? {call} : null"""
+    install = f"""() => {{
+{script}
+return {call};
+}}"""
+    return check, install
+
+
+async def mark_page(page, mode: str = "vision") -> dict:
     """
-    Injects a script into the page, executes `markPage()` to retrieve bounding boxes, 
-    takes a screenshot and ensures cleanup by executing `unmarkPage()`.
+    Executes `markPage()` to retrieve bounding boxes and observes the marked page.
+
+    In "vision" mode the labeled page is captured as a screenshot. In "text" mode no
+    labels are drawn and no screenshot is taken; a text outline of the visible page,
+    with the elements numbered as in `bboxes`, is returned instead.
+
+    The marking runtime is expected to be registered once per context; it is only
+    evaluated here for pages that lack it. The runtime keeps an index of interactive
+    elements between calls and only rescans the parts of the page that changed. Marks
+    are removed by the page itself on the agent's next input (or when the page text is read),
+    so no separate unmark round trip is made.
 
     Args:
         page (Page): The Playwright page object to interact with.
-        session_manager (SessionManager): Manages session ID.
+        mode (str): "vision" or "text".
 
     Returns:
         dict: A dictionary containing:
-            - "img": Base64-encoded screenshot (or None on failure).
+            - "img": Base64-encoded screenshot (or None on failure or in text mode).
+            - "img_mime": MIME type of the encoded screenshot.
+            - "outline": Text outline of the page (text mode only, else None).
             - "bboxes": List of bounding boxes returned by `markPage()`.
+            - "timings": Seconds spent in each phase ("mark", "screenshot").
     """
+    timings = {}
 
-    # session_id = SID
-    # logger.debug(f"Session ID: {session_id}")
-    
-    try:
-        logger.debug("Injecting mark_page_script as an init script...")
-        await page.add_init_script(mark_page_script)
-
-        logger.debug("Waiting for page to load...")
-        await page.wait_for_load_state("domcontentloaded")
-        await page.wait_for_load_state("load")
-
-        logger.debug("Executing mark_page_script...")
-        await page.evaluate(f"""(function() {{ {mark_page_script} }})()""")
+    if page.is_closed():
+        logger.error("Page is closed. Stopping markPage execution.")
+        return {"img": None, "img_mime": None, "outline": None, "bboxes": [], "timings": timings}
 
-        logger.debug("Script loaded successfully.")
-    except asyncio.TimeoutError:
-        logger.error("Script evaluation timed out.")
-    except Exception as e:
-        logger.error(f"Error executing mark_page_script: {e}", exc_info=True)
-
-    # Attempt to execute `markPage()` multiple times in case of failure
+    phase_start = time.perf_counter()
     bboxes = []
-    for attempt in range(10):
+    mark_stats = None
+    outline = None
+    for attempt in range(2):
         try:
-            if page.is_closed():
-                logger.error("Page is closed. Stopping markPage execution.")
-                return {"img": None, "bboxes": []}
-
-            logger.debug(f"Attempt {attempt+1}: Evaluating 'markPage()'...")
-            bboxes = await page.evaluate("markPage()")
-            if bboxes:
-                break  # Success, exit loop
+            check_expression, install_expression = mark_expressions(mode)
+            marked = await page.evaluate(check_expression)
+            if marked is None:
+                logger.debug("Marking runtime missing on page, installing it")
+                marked = await page.evaluate(install_expression)
+            bboxes, mark_stats, outline = marked["bboxes"], marked["stats"], marked.get("outline")
+            break
         except Exception as e:
+            # Typically a navigation destroyed the execution context mid-evaluation
             logger.error(f"Error executing 'markPage()' (attempt {attempt+1}): {e}", exc_info=True)
-            await asyncio.sleep(0.5)  # Small delay before retrying
-    else:
-        logger.debug("Failed to execute 'markPage()' after 10 attempts.")
-
-    # Attempt to take a screenshot
-    logger.debug("Taking screenshot...")
+            bboxes = []
+            try:
+                await page.wait_for_load_state("domcontentloaded")
+            except Exception:
+                break
+    timings["mark"] = time.perf_counter() - phase_start
+    if mark_stats:
+        # "full" scans happen on the first mark of a page, after resizes and after large
+        # DOM rewrites; "incremental" and "viewport" passes only rescan changed regions
+        metrics.increment(f"mark_page.scan.{mark_stats['mode']}")
+        logger.debug(f"markPage stats: {mark_stats}")
+
+    # Attempt to take a screenshot, encoded once per step and reused by every model call
     encoded_screenshot = None
-    
-    try:
-        screenshot = await page.screenshot()
-        encoded_screenshot = base64.b64encode(screenshot).decode()
-        logger.info(f"Base64-encoded screenshot length: {len(encoded_screenshot)} characters")
-        
+    img_mime = None
+    if mode == "text":
+        logger.debug(f"Page outline: {len(outline or '')} characters")
+    else:
+        try:
+            phase_start = time.perf_counter()
+            screenshot = await get_screenshot_encoder().capture(page)
+            timings["screenshot"] = time.perf_counter() - phase_start
+            encoded_screenshot, img_mime = screenshot["data"], screenshot["mime"]
+            logger.info(
+                f"Encoded screenshot: {img_mime}, {screenshot['width']}x{screenshot['height']}, "
+                f"{screenshot['bytes']} bytes ({len(encoded_screenshot)} base64 characters)"
+            )
+        except Exception as e:
+            logger.error(f"Error taking screenshot: {e}", exc_info=True)
 
-    
-    except Exception as e:
-        logger.error(f"Error taking screenshot or uploading to S3: {e}", exc_info=True)
-        screenshot = None
+    for phase, seconds in timings.items():
+        metrics.observe(f"mark_page.{phase}", seconds)
+    logger.debug(
+        "mark_page timings: " + ", ".join(f"{phase}={seconds:.4f}s" for phase, seconds in timings.items())
+        + f" ({len(bboxes or [])} boxes)"
+    )
 
-    # Attempt to execute `unmarkPage()` for cleanup
-    logger.debug("Executing 'unmarkPage()' to clean up marks...")
-    if not page.is_closed():
-        for attempt in range(3):
-            try:
-                await page.wait_for_load_state("load")
-                await page.evaluate('window.unmarkPage && window.unmarkPage();')
-                logger.debug("Successfully executed 'unmarkPage()'.")
-                break
-            except Exception as e:
-                logger.error(f"Error executing 'unmarkPage()' (attempt {attempt+1}): {e}")
-                await asyncio.sleep(0.5)
-    
     return {
         "img": encoded_screenshot,
-        "bboxes": bboxes,
+        "img_mime": img_mime,
+        "outline": outline,
+        "bboxes": bboxes or [],
+        "timings": timings,
     }
 
+
+async def push_update(state, event: str, **payload):
+    """
+    Sends a progress event through the run's `push_update` callback, if one is set.
+
+    The callback may be synchronous or a coroutine function. Failures in the callback
+    are logged and never interrupt the agent run.
+
+    Args:
+        state (Dict[str, Any]): The current agent state.
+        event (str): Event name (e.g. "browser", "action", "insight", "answer_token", "answer").
+        **payload: JSON-serializable event data.
+    """
+    callback = state.get("push_update")
+    if not callable(callback):
+        return
+
+    message = {"event": event, "nonce": state.get("nonce"), "step": state.get("steps"), **payload}
+    try:
+        result = callback(message)
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.warning(f"push_update callback failed for event '{event}': {e}")
+
 async def process_tools(response, state):
     """
     Processes tool calls from the response and updates the state accordingly.
@@ -155,7 +215,9 @@ async def process_tools(response, state):
                     id=tool_call["id"],
                 )
 
+                tool_start = time.perf_counter()
                 tool_response = await tool_executor.invoke(action)
+                metrics.observe(f"tools.{action.tool}", time.perf_counter() - tool_start)
 
                 function_message = ToolMessage(
                     content=str(tool_response),